@@ -0,0 +1,75 @@
+"""
+Cost of a hot path ``printf`` call as seen by the serial threads.
+
+    python benchmarks/log_overhead.py [-n 100000]
+
+1. debug off, the level check only
+2. debug on, synchronous handler writing to a slow stream
+3. debug on, the default queued handler writing to the same slow stream
+"""
+from __future__ import print_function
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyuarm import log  # noqa: E402
+
+
+class SlowStream(object):
+    """
+    A terminal which needs ``delay`` seconds per write.
+    """
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, data):
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def setup(level, queued, delay):
+    log.close_logger()
+    logger = logging.getLogger('pyuarm.benchmark')
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = logging.StreamHandler(SlowStream(delay))
+    handler.setFormatter(logging.Formatter('%(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(log._async_handler(handler) if queued else handler)
+    log.pylogger = logger
+    return logger
+
+
+def run(n):
+    line = '$12 OK X150.00 Y0.00 Z150.00'
+    start = time.time()
+    for _ in range(n):
+        log.printf("MSG Received: {}", log.DEBUG, line)
+    return (time.time() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100000, help='printf calls per case')
+    parser.add_argument('--delay', type=float, default=0.0001, help='seconds per write of the slow stream')
+    args = parser.parse_args()
+    cases = [('debug off', logging.INFO, False),
+             ('debug on, synchronous', logging.DEBUG, False),
+             ('debug on, queued', logging.DEBUG, True)]
+    for name, level, queued in cases:
+        logger = setup(level, queued, args.delay)
+        n = args.n if level != logging.DEBUG or queued else max(args.n // 100, 1)
+        per_call = run(n)
+        log.close_logger()
+        for h in list(logger.handlers):
+            logger.removeHandler(h)
+        print('{:<24} {:>10.2f} us/call'.format(name, per_call * 1e6))
+
+
+if __name__ == '__main__':
+    main()
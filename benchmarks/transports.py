@@ -0,0 +1,108 @@
+"""
+Round trip time and pipelined throughput of ``UArm`` over each transport, all backed by the firmware emulator.
+
+    python benchmarks/transports.py [-n 500] [--delay 0] [--url /dev/ttyUSB0 ...]
+
+1. emu://, in process
+2. socket://, TCP to an emulator behind a local server, like ser2net, TCP_NODELAY on
+3. uarmd://, through the ``uarmcli serve`` daemon serving an emulated arm
+4. every ``--url`` given, eg. a real arm or an rfc2217:// server
+"""
+from __future__ import print_function
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyuarm.uarm import UArm  # noqa: E402
+from pyuarm.emulator import Emulator  # noqa: E402
+from pyuarm.server import UArmServer  # noqa: E402
+from pyuarm import latency  # noqa: E402
+
+
+def serve_emulator(delay):
+    """
+    Serve one emulator per TCP connection on a free local port.
+    :return: port
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(4)
+
+    def session(conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        emulator = Emulator(lambda line: conn.sendall(line.encode() + b'\r\n'), delay)
+        emulator.start()
+        buf = b''
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                break
+            buf += data
+            while b'\n' in buf:
+                line, buf = buf.split(b'\n', 1)
+                emulator.feed(line.decode())
+        emulator.stop()
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            t = threading.Thread(target=session, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    t = threading.Thread(target=accept)
+    t.daemon = True
+    t.start()
+    return server.getsockname()[1]
+
+
+def run(url, count):
+    arm = UArm(port_name=url)
+    arm.connect()
+    if not arm.connection_state:
+        return None
+    try:
+        return latency.measure_rtt(arm, count), latency.measure_throughput(arm, count)
+    finally:
+        arm.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=500, help='queries per measurement')
+    parser.add_argument('--delay', type=float, default=0.0, help='emulator seconds per command')
+    parser.add_argument('--url', action='append', default=[], help='extra port name or URL to measure')
+    args = parser.parse_args()
+
+    emu_url = 'emu://?delay={}'.format(args.delay)
+    tcp_url = 'socket://127.0.0.1:{}'.format(serve_emulator(args.delay))
+    daemon_arm = UArm(port_name=emu_url)
+    daemon_arm.connect()
+    daemon = UArmServer([daemon_arm], os.path.join(tempfile.gettempdir(), 'uarmd-benchmark.sock'))
+    daemon.start()
+
+    cases = [('emu', emu_url), ('socket', tcp_url), ('uarmd', 'uarmd://' + daemon.path)]
+    cases += [(url, url) for url in args.url]
+    results = [(name, run(url, args.n)) for name, url in cases]
+    daemon.stop()
+    daemon_arm.disconnect()
+
+    print('{:<16} {:>9} {:>9} {:>9} {:>12}'.format('transport', 'p50 ms', 'p99 ms', 'lost', 'queries/s'))
+    for name, result in results:
+        if result is None:
+            print('{:<16} not connected'.format(name))
+            continue
+        rtt, throughput = result
+        print('{:<16} {:>9.3f} {:>9.3f} {:>9} {:>12.0f}'.format(
+            name, rtt['rtt']['p50'] * 1000, rtt['rtt']['p99'] * 1000, rtt['lost'] + throughput['lost'],
+            throughput['count'] / throughput['seconds']))
+
+
+if __name__ == '__main__':
+    main()
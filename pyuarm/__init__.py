@@ -3,7 +3,8 @@ if sys.version > '3':
     PY3 = True
 else:
     PY3 = False
-from .uarm import UArm, UArmConnectException
+from .uarm import UArm, UArmConnectException, UArmUnsupportedException
+from .server import UArmClient, UArmServer
 from .config import ua_dir, home_dir
 from .util import get_uarm
 from .version import __version__
@@ -0,0 +1,125 @@
+"""
+pyuarm.capability
+Commands and reply formats supported by each firmware line.
+``UArm.connect`` asks the firmware version (``P203``) once, and ``UArm.submit`` fails fast on commands
+the connected firmware does not implement, instead of waiting for a reply which never comes.
+Firmware 2.2 introduced the G-code protocol of ``pyuarm.protocol`` and is the only line listed. A newer minor
+of a known major version is checked against the newest known line before it. Any other version, older lines
+and unknown major versions included, is not checked, every command is sent and answered by the firmware itself.
+Replies to queries are checked against ``REPLY_FIELDS``, see ``is_complete``.
+"""
+import re
+from . import protocol
+
+
+def _code(cmd):
+    return cmd.split(' ')[0]
+
+
+# Number of values after ``OK`` in the reply of each query, eg. ``$1 OK X0.00 Y150.00 Z150.00``
+REPLY_FIELDS = {
+    _code(protocol.GET_FIRMWARE_VERSION): 1,
+    _code(protocol.GET_HARDWARE_VERSION): 1,
+    _code(protocol.GET_COOR): 3,
+    _code(protocol.GET_POLAR): 3,
+    _code(protocol.GET_SERVO_ANGLE): 4,
+    _code(protocol.GET_IS_MOVE): 1,
+    _code(protocol.GET_TIP_SENSOR): 1,
+    _code(protocol.GET_PUMP): 1,
+    _code(protocol.GET_GRIPPER): 1,
+    _code(protocol.GET_SERVO_STATUS): 1,
+    _code(protocol.GET_SIMULATION): 1,
+    _code(protocol.GET_EEPROM): 1,
+    _code(protocol.GET_ANALOG): 1,
+    _code(protocol.GET_DIGITAL): 1,
+}
+
+FIRMWARE_2_2 = frozenset(_code(c) for c in (
+    protocol.SET_POSITION, protocol.SET_POSITION_RELATIVE, protocol.SET_SERVO_ANGLE, protocol.STOP_MOVING,
+    protocol.SET_PUMP, protocol.GET_PUMP, protocol.SET_GRIPPER, protocol.SET_BUZZER, protocol.SET_POLAR,
+    protocol.ATTACH_SERVO, protocol.DETACH_SERVO, protocol.GET_SIMULATION, protocol.GET_FIRMWARE_VERSION,
+    protocol.GET_HARDWARE_VERSION, protocol.GET_COOR, protocol.GET_SERVO_STATUS, protocol.GET_SERVO_ANGLE,
+    protocol.GET_IS_MOVE, protocol.GET_TIP_SENSOR, protocol.GET_POLAR, protocol.GET_GRIPPER, protocol.GET_EEPROM,
+    protocol.SET_EEPROM, protocol.GET_ANALOG, protocol.GET_DIGITAL, protocol.SET_REPORT_POSITION))
+
+# firmware line (major.minor) to supported command codes
+FIRMWARE_COMMANDS = {
+    '2.2': FIRMWARE_2_2,
+}
+
+
+class Capabilities(object):
+    def __init__(self, firmware_version, commands=None):
+        """
+        :param firmware_version: String firmware version, eg. ``2.2.1``
+        :param commands: set of supported command codes, None if unknown, then every command is allowed
+        """
+        self.firmware_version = firmware_version
+        self.commands = commands
+
+    def __repr__(self):
+        return '<Capabilities {} {}>'.format(self.firmware_version,
+                                             'unknown' if self.commands is None else len(self.commands))
+
+    @property
+    def known(self):
+        return self.commands is not None
+
+    def supports(self, code):
+        """
+        :param code: command code, eg. ``G0``
+        :return: True if supported or unknown
+        """
+        return self.commands is None or code in self.commands
+
+    @staticmethod
+    def reply_fields(code):
+        """
+        :return: number of values in the reply of a query, None if unknown
+        """
+        return reply_fields(code)
+
+
+def reply_fields(code):
+    """
+    :param code: command code, eg. ``P220``
+    :return: number of values after ``OK`` in the reply of a query, None if unknown
+    """
+    return REPLY_FIELDS.get(code)
+
+
+def is_complete(code, response):
+    """
+    Check that an ``OK`` reply carries every value of its query, a line cut short by noise does not.
+    :param code: command code, eg. ``P220``
+    :param response: list of reply values after the id, eg. ``['OK', 'X0.00', 'Y150.00', 'Z150.00']``
+    :return: False if an ``OK`` reply has fewer values than ``REPLY_FIELDS``, True otherwise
+    """
+    fields = reply_fields(code)
+    if fields is None or len(response) == 0 or response[0] != protocol.OK:
+        return True
+    return len(response) - 1 >= fields
+
+
+def _line(firmware_version):
+    match = re.match(r'(\d+)\.(\d+)', firmware_version)
+    return None if match is None else (int(match.group(1)), int(match.group(2)))
+
+
+def lookup(firmware_version):
+    """
+    Get the capabilities of a firmware version.
+    :param firmware_version: String, eg. ``2.2.1``, None if the version could not be read
+    :return: Capabilities, unknown (nothing is rejected) if the version could not be read or parsed,
+    or has no known line before it in its major version
+    """
+    if firmware_version is None:
+        return Capabilities(None)
+    line = _line(firmware_version)
+    if line is None:
+        return Capabilities(firmware_version)
+    known = sorted((_line(v), v) for v in FIRMWARE_COMMANDS)
+    older = [v for l, v in known if l[0] == line[0] and l <= line]
+    if older:
+        return Capabilities(firmware_version, FIRMWARE_COMMANDS[older[-1]])
+    return Capabilities(firmware_version)
@@ -0,0 +1,171 @@
+"""
+pyuarm.emulator
+In process uArm firmware emulator, opened with ``UArm(port_name='emu://')``, see ``pyuarm.urlhandler``.
+It answers every command of firmware 2.2 with plausible values, keeps the commanded position and sends
+``@3`` position reports, which is enough to run applications, tools and benchmarks without an arm.
+URL options: ``emu://?delay=0.002`` seconds of processing per command.
+The commands processed are kept in ``history``, and ``drop_replies`` loses the next replies, for tests.
+"""
+import math
+import threading
+import time
+from collections import deque
+from . import protocol
+from . import PY3
+
+if PY3:
+    from queue import Queue
+else:
+    from Queue import Queue
+
+FIRMWARE_VERSION = '2.2.1'
+HARDWARE_VERSION = '3.2.1'
+UNKNOWN_COMMAND = 'E20'
+HISTORY_SIZE = 1024
+
+
+def _code(cmd):
+    return cmd.split(' ')[0]
+
+
+# commands answered with a plain OK
+ACTIONS = tuple(_code(c) for c in (
+    protocol.SET_SERVO_ANGLE, protocol.STOP_MOVING, protocol.ATTACH_SERVO, protocol.DETACH_SERVO,
+    protocol.SET_BUZZER, protocol.SET_EEPROM, protocol.SET_PUMP, protocol.SET_GRIPPER))
+
+
+def _params(cmd):
+    """
+    :return: dict of parameter letter to String value, eg. ``{'X': '150'}``
+    """
+    return dict((p[0], p[1:]) for p in cmd.split(' ')[1:] if p)
+
+
+class Emulator(object):
+    def __init__(self, output, delay=0.0):
+        """
+        :param output: callable taking one reply line, without line terminator
+        :param delay: seconds of processing per command
+        """
+        self.output = output
+        self.delay = delay
+        self.position = [0.0, 150.0, 150.0]
+        self.report_interval = 0
+        self.received = 0
+        self.history = deque(maxlen=HISTORY_SIZE)  # last commands processed, without id, oldest first
+        self.drop_replies = 0  # number of next ``$id`` replies which are not sent, like replies lost on the line
+        self.rx_buffer_size = protocol.RX_BUFFER_SIZE
+        self.buffered = 0  # bytes received and not read by the command loop yet, like the firmware buffer
+        self.buffered_max = 0
+        self.overflows = 0  # lines which arrived while the receive buffer had no room, a real arm loses bytes
+        self.__buffer_lock = threading.Lock()
+        self.__inbox = Queue()
+        self.__running = False
+        self.__thread = None
+        self.__report_thread = None
+        self.__report_event = threading.Event()
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__process)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+        self.__report_thread = threading.Thread(target=self.__report_process)
+        self.__report_thread.setDaemon(True)
+        self.__report_thread.start()
+        self.output(protocol.READY)
+
+    def stop(self):
+        self.__running = False
+        self.__inbox.put(None)
+        self.__report_event.set()
+
+    def feed(self, line):
+        """
+        Queue one received line, processed in order by the emulator thread like the firmware does.
+        :param line: String line, without the ``\\n``
+        """
+        size = len(line) + 1
+        with self.__buffer_lock:
+            if self.buffered + size > self.rx_buffer_size:
+                self.overflows += 1
+            self.buffered += size
+            self.buffered_max = max(self.buffered_max, self.buffered)
+        self.__inbox.put(line)
+
+    def __process(self):
+        while self.__running:
+            line = self.__inbox.get()
+            if line is None:
+                break
+            size = len(line) + 1
+            line = line.strip()
+            reply = None
+            msg_id = None
+            if line:
+                self.received += 1
+                if line.startswith('#'):
+                    head, _, line = line.partition(' ')
+                    msg_id = head[1:]
+                self.history.append(line)
+                if self.delay:
+                    time.sleep(self.delay)
+                reply = self.handle(line)
+            # the line leaves the buffer once it is executed, just before its reply, like the host counts it
+            with self.__buffer_lock:
+                self.buffered -= size
+            if msg_id is not None:
+                if self.drop_replies > 0:
+                    self.drop_replies -= 1
+                    continue
+                self.output('${} {}'.format(msg_id, reply))
+
+    def __report_process(self):
+        while self.__running:
+            self.__report_event.clear()
+            interval = self.report_interval
+            if interval > 0:
+                self.output('{} X{:.2f} Y{:.2f} Z{:.2f}'.format(protocol.REPORT_POSITION_PREFIX, *self.position))
+            self.__report_event.wait(interval if interval > 0 else None)
+
+    def handle(self, cmd):
+        """
+        Execute one command.
+        :param cmd: String Serial Command without id
+        :return: String reply, without id
+        """
+        code = _code(cmd)
+        params = _params(cmd)
+        x, y, z = self.position
+        try:
+            if code == _code(protocol.GET_COOR):
+                return 'OK X{:.2f} Y{:.2f} Z{:.2f}'.format(x, y, z)
+            elif code == _code(protocol.GET_POLAR):
+                return 'OK S{:.2f} R{:.2f} H{:.2f}'.format(math.hypot(x, y), math.degrees(math.atan2(y, x)), z)
+            elif code == _code(protocol.GET_SERVO_ANGLE):
+                return 'OK B90.00 L90.00 R90.00 H90.00'
+            elif code == _code(protocol.GET_FIRMWARE_VERSION):
+                return 'OK V{}'.format(FIRMWARE_VERSION)
+            elif code == _code(protocol.GET_HARDWARE_VERSION):
+                return 'OK V{}'.format(HARDWARE_VERSION)
+            elif code in (_code(protocol.SET_POSITION), _code(protocol.SET_POSITION_RELATIVE)):
+                offset = self.position if code == _code(protocol.SET_POSITION_RELATIVE) else [0.0, 0.0, 0.0]
+                self.position = [offset[0] + float(params['X']), offset[1] + float(params['Y']),
+                                 offset[2] + float(params['Z'])]
+            elif code == _code(protocol.SET_POLAR):
+                s, r = float(params['S']), math.radians(float(params['R']))
+                self.position = [s * math.cos(r), s * math.sin(r), float(params['H'])]
+            elif code == _code(protocol.SET_REPORT_POSITION):
+                self.report_interval = float(params['V'])
+                self.__report_event.set()
+            elif code in (_code(protocol.GET_IS_MOVE), _code(protocol.GET_TIP_SENSOR), _code(protocol.GET_PUMP),
+                          _code(protocol.GET_GRIPPER), _code(protocol.GET_EEPROM), _code(protocol.GET_ANALOG),
+                          _code(protocol.GET_DIGITAL)):
+                return 'OK V0'
+            elif code in (_code(protocol.GET_SERVO_STATUS), _code(protocol.GET_SIMULATION)):
+                return 'OK V1'
+            elif code not in ACTIONS:
+                return UNKNOWN_COMMAND
+        except (KeyError, ValueError):
+            return UNKNOWN_COMMAND
+        return protocol.OK
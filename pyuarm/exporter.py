@@ -0,0 +1,210 @@
+"""
+pyuarm.exporter
+Serve ``UArm.metrics`` of one or more arms in OpenMetrics text format, for Prometheus scraping.
+The exporter runs in a background thread, over a local HTTP port or a Unix domain socket.
+Every series is labelled with the arm ``port`` and ``serial`` number.
+
+.. raw:python
+>>> exporter = MetricsExporter([uarm1, uarm2], port=9770)
+>>> exporter.start()
+"""
+from __future__ import print_function
+import os
+import threading
+from . import PY3
+from .log import printf, ERROR
+from .server import remove_stale_socket
+
+if PY3:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+else:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+QUANTILES = (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return '{' + ','.join('{}="{}"'.format(k, _escape(v)) for k, v in labels) + '}'
+
+
+def arm_labels(arm):
+    """
+    :param arm: UArm instance
+    :return: list of (name, value) label pairs identifying the arm
+    """
+    port = arm.port_name or ''
+    serial_number = ''
+    if arm.port is not None and getattr(arm.port, 'serial_number', None):
+        serial_number = arm.port.serial_number
+    return [('port', port), ('serial', serial_number)]
+
+
+def render(arms):
+    """
+    Render the metrics of all arms in OpenMetrics text format.
+    :param arms: list of UArm instances
+    :return: String, ends with ``# EOF``
+    """
+    families = {}
+    order = []
+
+    def add(name, kind, help_text, labels, value, suffix=''):
+        if name not in families:
+            families[name] = (kind, help_text, [])
+            order.append(name)
+        if value is not None:
+            families[name][2].append('{}{}{} {}'.format(name, suffix, _labels(labels), value))
+
+    for arm in arms:
+        labels = arm_labels(arm)
+        try:
+            m = arm.metrics()
+        except Exception as e:
+            printf("Exporter {} - {}".format(type(e).__name__, e), ERROR)
+            continue
+        add('uarm_up', 'gauge', 'Serial connection state', labels, 1 if arm.connection_state else 0)
+        add('uarm_bytes_in', 'counter', 'Bytes received', labels, m['bytes_in'], '_total')
+        add('uarm_bytes_out', 'counter', 'Bytes sent', labels, m['bytes_out'], '_total')
+        add('uarm_writes', 'counter', 'Write calls on the port, after coalescing', labels, m['writes'], '_total')
+        add('uarm_unmatched_replies', 'counter', 'Replies without a waiting command', labels,
+            m['unmatched_replies'], '_total')
+        add('uarm_malformed_lines', 'counter', 'Received lines which could not be parsed', labels,
+            m['malformed_lines'], '_total')
+        add('uarm_coalesced', 'counter', 'Queries served by an identical query in flight', labels,
+            m['coalesced'], '_total')
+        add('uarm_queue_depth', 'gauge', 'Commands waiting in the send queue', labels, m['queue_depth'])
+        add('uarm_queue_depth_max', 'gauge', 'Highest send queue depth', labels, m['queue_depth_max'])
+        add('uarm_in_flight', 'gauge', 'Commands waiting for a reply', labels, m['in_flight'])
+        for code in sorted(m['commands']):
+            c = m['commands'][code]
+            cmd_labels = labels + [('command', code)]
+            add('uarm_commands_sent', 'counter', 'Commands sent', cmd_labels, c['sent'], '_total')
+            add('uarm_command_timeouts', 'counter', 'Commands without a reply before the deadline', cmd_labels,
+                c['timeouts'], '_total')
+            add('uarm_command_retries', 'counter', 'Queries resent after a lost reply', cmd_labels,
+                c['retries'], '_total')
+            add('uarm_command_errors', 'counter', 'Commands answered with an error', cmd_labels, c['errors'], '_total')
+            estimate = m.get('timeout_estimates', {}).get(code)
+            if estimate is not None:
+                add('uarm_command_timeout_seconds', 'gauge', 'Adaptive reply deadline', cmd_labels, estimate['rto'])
+            rtt = c['rtt']
+            if rtt['count'] > 0:
+                for quantile, key in QUANTILES:
+                    add('uarm_command_rtt_seconds', 'summary', 'Command round trip time',
+                        cmd_labels + [('quantile', quantile)], rtt[key])
+                add('uarm_command_rtt_seconds', 'summary', 'Command round trip time', cmd_labels,
+                    rtt['count'], '_count')
+                add('uarm_command_rtt_seconds', 'summary', 'Command round trip time', cmd_labels,
+                    rtt['mean'] * rtt['count'], '_sum')
+    lines = []
+    for name in order:
+        kind, help_text, samples = families[name]
+        lines.append('# TYPE {} {}'.format(name, kind))
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.extend(samples)
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render(self.server.arms).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # unix socket clients have no (host, port) address
+        return 'local'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _TCPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = UnixStreamServer.get_request(self)
+        return request, ('local', 0)
+
+
+class MetricsExporter(object):
+    def __init__(self, arms, port=9770, host='127.0.0.1', unix_socket=None):
+        """
+        :param arms: UArm instance or list of UArm instances, arms can be added later with ``add``
+        :param port: local HTTP port, ignored if ``unix_socket`` is given
+        :param host: bind address, default only local clients
+        :param unix_socket: path of a Unix domain socket to serve on instead of TCP
+        """
+        if not isinstance(arms, (list, tuple)):
+            arms = [arms]
+        self.arms = list(arms)
+        self.port = port
+        self.host = host
+        self.unix_socket = unix_socket
+        self.__server = None
+        self.__thread = None
+        self.__inode = None
+
+    def add(self, arm):
+        if arm not in self.arms:
+            self.arms.append(arm)
+
+    def remove(self, arm):
+        if arm in self.arms:
+            self.arms.remove(arm)
+
+    def start(self):
+        """
+        Start serving in a daemon thread.
+        :raise IOError: if another exporter is serving on ``unix_socket``, or the path is not a socket
+        """
+        if self.unix_socket is not None:
+            remove_stale_socket(self.unix_socket)
+            self.__server = _UnixServer(self.unix_socket, _Handler)
+            self.__inode = os.stat(self.unix_socket).st_ino
+        else:
+            self.__server = _TCPServer((self.host, self.port), _Handler)
+            self.port = self.__server.server_address[1]
+        self.__server.arms = self.arms
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+        printf("Metrics exporter serving on {}".format(self.unix_socket or '{}:{}'.format(self.host, self.port)))
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+            # the path may already belong to an exporter started after us
+            try:
+                if self.unix_socket is not None and os.lstat(self.unix_socket).st_ino == self.__inode:
+                    os.remove(self.unix_socket)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
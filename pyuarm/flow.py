@@ -0,0 +1,104 @@
+"""
+pyuarm.flow
+Character-counting flow control for the firmware receive buffer.
+``RxWindow`` counts the bytes of every line written to uArm and not answered yet, whichever path wrote it:
+the send thread, ``send_msg``, G-code streams and emergency commands. A line is accounted under its ``#id``
+and released by its ``$id`` reply, or after its lifetime, the deadline of the command, if the reply is lost.
+The last ``reserve`` bytes are only used by urgent lines, so a stop or detach fits even behind a full queue.
+"""
+import threading
+import time
+from . import protocol
+
+POLL_INTERVAL = 0.05  # seconds between deadline checks while waiting for space
+
+
+class RxWindow(object):
+    def __init__(self, size=protocol.RX_BUFFER_SIZE, reserve=protocol.EMERGENCY_RESERVE):
+        """
+        :param size: firmware receive buffer size in bytes
+        :param reserve: bytes kept free for urgent lines
+        """
+        self.size = size
+        self.reserve = reserve
+        self.__entries = {}
+        self.__used = 0
+        self.__cond = threading.Condition()
+
+    def __repr__(self):
+        return '<RxWindow {}/{} bytes, {} lines>'.format(self.__used, self.size, len(self.__entries))
+
+    @property
+    def used(self):
+        """
+        :return: Integer, bytes written and not answered yet
+        """
+        return self.__used
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def acquire(self, msg_id, size, lifetime, limit=None, timeout=None, abort=None, urgent=False):
+        """
+        Wait until ``size`` more bytes fit, then account them to ``msg_id``.
+        | A line always fits an empty window, so a line longer than the window is still sent, alone.
+        :param msg_id: Integer serial id of the line
+        :param size: bytes of the line, including the terminator
+        :param lifetime: seconds after the accounting the bytes are released if no reply came
+        :param limit: window size for this call, if None, ``size`` of the window, the reserve is never used
+        :param timeout: seconds to wait, 0 only checks, None waits as long as needed
+        :param abort: callable, stop waiting once it returns True
+        :param urgent: if True, the line may use the reserve, for emergency commands, ``limit`` is ignored
+        :return: True if accounted, False if it did not fit in time or was aborted
+        """
+        if urgent:
+            limit = self.size
+        else:
+            limit = min(self.size if limit is None else limit, self.size - self.reserve)
+        end = None if timeout is None else time.time() + timeout
+        with self.__cond:
+            while self.__used and self.__used + size > limit:
+                now = time.time()
+                if self.__release_expired(now):
+                    continue
+                if (end is not None and now >= end) or (abort is not None and abort()):
+                    return False
+                wait = POLL_INTERVAL if end is None else min(POLL_INTERVAL, end - now)
+                self.__cond.wait(wait)
+            self.__add(msg_id, size, time.time() + lifetime)
+        return True
+
+    def __add(self, msg_id, size, expiry):
+        previous = self.__entries.pop(msg_id, None)
+        if previous is not None:
+            self.__used -= previous[0]
+        self.__entries[msg_id] = (size, expiry)
+        self.__used += size
+
+    def release(self, msg_id):
+        """
+        Free the bytes of a line, called when its reply arrives or its future expires.
+        :return: True if the line was accounted
+        """
+        with self.__cond:
+            entry = self.__entries.pop(msg_id, None)
+            if entry is None:
+                return False
+            self.__used -= entry[0]
+            self.__cond.notify_all()
+        return True
+
+    def __release_expired(self, now):
+        expired = [msg_id for msg_id, entry in self.__entries.items() if now >= entry[1]]
+        for msg_id in expired:
+            self.__used -= self.__entries.pop(msg_id)[0]
+        return len(expired) > 0
+
+    def clear(self):
+        """
+        Forget every line, the firmware buffer is empty after a reconnect.
+        """
+        with self.__cond:
+            self.__entries.clear()
+            self.__used = 0
+            self.__cond.notify_all()
@@ -0,0 +1,179 @@
+"""
+pyuarm.future
+Future handle returned by ``UArm.submit``.
+A future is finished by the ``$id`` reply of its command, by cancellation, or by its deadline.
+The deadline starts when the command is written to the port, not when it is queued, see ``start``.
+Like the rest of pyuarm, ``result()`` returns None for every failure instead of raising.
+"""
+import threading
+import time
+from .log import printf, ERROR
+
+PENDING = 'PENDING'
+CANCELLED = 'CANCELLED'
+EXPIRED = 'EXPIRED'
+FINISHED = 'FINISHED'
+
+
+class UArmFuture(object):
+    def __init__(self, msg_id=None, msg=None, deadline=None, timeout=None):
+        """
+        :param msg_id: Integer serial id of the command
+        :param msg: String Serial Command
+        :param deadline: absolute ``time.time()`` after which the command is given up, None means no deadline
+        :param timeout: seconds from the write to the deadline, the deadline is set by ``start``
+        """
+        self.msg_id = msg_id
+        self.msg = msg
+        self.deadline = deadline
+        self.timeout = timeout
+        self._state = PENDING
+        self._result = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    def __repr__(self):
+        return '<UArmFuture #{} {} {}>'.format(self.msg_id, self.msg, self._state)
+
+    def done(self):
+        """
+        :return: True if the future is finished, cancelled or expired
+        """
+        return self._state != PENDING
+
+    def cancelled(self):
+        return self._state == CANCELLED
+
+    def expired(self):
+        """
+        :return: True if the deadline passed before any reply arrived
+        """
+        return self._state == EXPIRED
+
+    def start(self, now=None):
+        """
+        Start the deadline clock, called when the command is written.
+        :param now: ``time.time()`` of the write, default now
+        """
+        with self._lock:
+            if self.deadline is None and self.timeout is not None:
+                self.deadline = (time.time() if now is None else now) + self.timeout
+                self._cond.notify_all()
+
+    def cancel(self):
+        """
+        Cancel the future, only possible before it is done.
+        | A command which is not sent yet will be skipped by the send thread.
+        :return: True if cancelled
+        """
+        return self._finish(CANCELLED, None)
+
+    def expire(self):
+        """
+        Mark the future as expired, only possible before it is done.
+        :return: True if expired
+        """
+        return self._finish(EXPIRED, None)
+
+    def set_result(self, result):
+        """
+        Finish the future with a result.
+        :return: True if the result is taken, False if the future was already done
+        """
+        return self._finish(FINISHED, result)
+
+    def _finish(self, state, result):
+        with self._lock:
+            if self._state != PENDING:
+                return False
+            self._state = state
+            self._result = result
+            callbacks = self._callbacks
+            self._callbacks = []
+            self._cond.notify_all()
+        for fn in callbacks:
+            self._invoke(fn)
+        return True
+
+    def _invoke(self, fn):
+        try:
+            fn(self)
+        except Exception as e:
+            printf("Future callback {} - {}".format(type(e).__name__, e), ERROR)
+
+    def add_done_callback(self, fn):
+        """
+        Call ``fn(future)`` when the future is done, immediately if it is done already.
+        :param fn: callable with one argument
+        """
+        with self._lock:
+            if self._state == PENDING:
+                self._callbacks.append(fn)
+                return
+        self._invoke(fn)
+
+    def wait(self, timeout=None):
+        """
+        Block until the future is done or ``timeout`` seconds passed.
+        :return: True if done
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._state == PENDING:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return self.done()
+
+    def result(self, timeout=None):
+        """
+        Block until the future is done.
+        | A command still queued has no deadline yet, then this waits until it is written and its deadline passes.
+        :param timeout: seconds to wait, if None wait until the deadline. Once the deadline passes, the future expires.
+        :return: the result, None if cancelled, expired or not done within ``timeout``
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._state == PENDING:
+                limit = end
+                if self.deadline is not None and (limit is None or self.deadline < limit):
+                    limit = self.deadline
+                remaining = None if limit is None else limit - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        if not self.done() and self.deadline is not None and time.time() >= self.deadline:
+            self.expire()
+        return self._result
+
+    def then(self, fn):
+        """
+        Create a derived future, finished with ``fn(result)`` once this future finishes.
+        | Cancel and expire are passed through, cancelling the derived future cancels this one.
+        | The derived future has no deadline of its own, it finishes when this one does.
+        :param fn: callable converting the result
+        :return: UArmFuture
+        """
+        future = UArmFuture(self.msg_id, self.msg)
+
+        def chain(parent):
+            if parent.cancelled():
+                future.cancel()
+            elif parent.expired():
+                future.expire()
+            else:
+                try:
+                    future.set_result(fn(parent._result))
+                except Exception as e:
+                    printf("{} - {} - {}".format(type(e).__name__, getattr(fn, '__name__', fn), e), ERROR)
+                    future.set_result(None)
+
+        def cancel_parent(child):
+            if child.cancelled():
+                self.cancel()
+
+        future.add_done_callback(cancel_parent)
+        self.add_done_callback(chain)
+        return future
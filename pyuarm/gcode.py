@@ -0,0 +1,43 @@
+"""
+pyuarm.gcode
+Lazy G-code reader used by ``UArm.stream_gcode`` and ``uarmcli gcode``.
+Lines are yielded one by one, so large files never have to be loaded into memory.
+"""
+import io
+
+
+def clean_line(line):
+    """
+    Strip comments and surrounding whitespace from one G-code line.
+    Both ``; comment`` and ``(comment)`` styles are removed.
+    :param line: String, raw G-code line
+    :return: String, the command part, empty if nothing is left
+    """
+    line = line.split(';', 1)[0]
+    while '(' in line:
+        start = line.index('(')
+        end = line.find(')', start)
+        if end == -1:
+            line = line[:start]
+        else:
+            line = line[:start] + line[end + 1:]
+    return ' '.join(line.split())
+
+
+def read_gcode(source):
+    """
+    Yield the commands of a G-code file lazily, skipping blank and comment only lines.
+    :param source: file path, opened file object or any iterable of lines
+    :return: generator of String commands
+    """
+    if isinstance(source, str):
+        with io.open(source, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = clean_line(line)
+                if line:
+                    yield line
+    else:
+        for line in source:
+            line = clean_line(line)
+            if line:
+                yield line
@@ -0,0 +1,124 @@
+"""
+pyuarm.hotplug
+Reconnect a uArm automatically when its USB cable is plugged out and in again, enabled with
+``UArm.enable_hotplug``.
+The monitor looks for the same serial number reappearing, through ``/dev/serial/by-id`` without a port
+scan where possible, and calls ``UArm.reconnect``, which keeps the send queue and restores the attach
+state and report interval.
+On Linux the monitor sleeps on inotify events of ``/dev``, so a new device node wakes it up at once,
+elsewhere it polls every ``interval`` seconds.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import threading
+import time
+from .log import printf, ERROR
+from .tools.list_uarms import discover_uarms
+
+DEV_DIR = '/dev'
+BY_ID_DIR = '/dev/serial/by-id'
+IN_CREATE = 0x00000100
+IN_ATTRIB = 0x00000004
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+
+def _inotify(path):
+    """
+    :return: inotify file descriptor watching ``path``, None if inotify is not available
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, path.encode(), IN_CREATE | IN_ATTRIB) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def find_device(serial_number, device=None):
+    """
+    Find the device name of a uArm by its USB serial number.
+    :param serial_number: String, eg. ``A600CRJU``, if None, look for ``device`` itself
+    :param device: last known device name
+    :return: device name, None if not plugged in
+    """
+    if serial_number and os.path.isdir(BY_ID_DIR):
+        tag = '_{}-'.format(serial_number)
+        for name in os.listdir(BY_ID_DIR):
+            if tag in name:
+                return os.path.realpath(os.path.join(BY_ID_DIR, name))
+    for p in discover_uarms():
+        if (serial_number and p.serial_number == serial_number) or (not serial_number and p.device == device):
+            return p.device
+    return None
+
+
+class HotplugMonitor(object):
+    def __init__(self, arm, interval=0.05):
+        """
+        :param arm: UArm instance, connected
+        :param interval: seconds between link checks
+        """
+        self.arm = arm
+        self.interval = interval
+        self.serial_number = getattr(arm.port, 'serial_number', None)
+        self.reconnects = 0
+        self.last_downtime = None
+        self.__running = False
+        self.__thread = None
+        self.__fd = None
+
+    def start(self):
+        self.__fd = _inotify(DEV_DIR)
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(2 * self.interval + 1)
+        self.__thread = None
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
+
+    def __wait(self):
+        if self.__fd is None:
+            time.sleep(self.interval)
+            return
+        readable, _, _ = select.select([self.__fd], [], [], self.interval)
+        if readable:
+            try:
+                os.read(self.__fd, 4096)
+            except OSError:
+                pass
+
+    def __run(self):
+        lost_at = None
+        while self.__running:
+            if self.arm.connection_state:
+                lost_at = None
+                self.__wait()
+                continue
+            if lost_at is None:
+                lost_at = time.time()
+                printf("uArm link lost, waiting for {}".format(self.serial_number or self.arm.port_name))
+            try:
+                device = find_device(self.serial_number, self.arm.port_name)
+                if device is not None and self.__running and self.arm.reconnect(device):
+                    self.reconnects += 1
+                    self.last_downtime = time.time() - lost_at
+                    printf("uArm reconnected on {} after {:.3f}s".format(device, self.last_downtime))
+                    continue
+            except Exception as e:
+                printf("Hotplug {} - {}".format(type(e).__name__, e), ERROR)
+            self.__wait()
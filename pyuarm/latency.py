@@ -0,0 +1,241 @@
+"""
+pyuarm.latency
+Serial link latency helpers, used by ``uarmcli diag``.
+uArms talk through FTDI adapters (USB VID:PID 0403:6001). The Linux ``ftdi_sio`` driver holds received
+bytes for up to ``latency_timer`` ms (default 16) before passing them on, which usually dominates the
+round trip time of a query. The ``ASYNC_LOW_LATENCY`` flag of the tty has the same effect on the
+kernel side, recent kernels also lower the FTDI timer to 1 ms when the flag is set.
+"""
+from __future__ import division
+import array
+import errno
+import os
+import time
+from . import protocol
+from .metrics import Histogram
+
+BAUDRATE = 115200
+BYTES_PER_SEC = BAUDRATE / 10.0  # 8N1, 10 bits per byte
+FTDI_DEFAULT_LATENCY_TIMER = 16
+USB_SERIAL_SYSFS = '/sys/bus/usb-serial/devices'
+
+# linux/serial.h
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 1 << 13
+SERIAL_FLAGS_INDEX = 4  # type, line, port, irq, flags
+
+
+def latency_timer_path(device):
+    """
+    :param device: device name, eg. ``/dev/ttyUSB0``
+    :return: sysfs path of the FTDI latency timer
+    """
+    return os.path.join(USB_SERIAL_SYSFS, os.path.basename(os.path.realpath(device)), 'latency_timer')
+
+
+def read_latency_timer(device):
+    """
+    :return: Integer ms, None if the device has no latency timer, eg. not an FTDI adapter or not Linux
+    """
+    try:
+        with open(latency_timer_path(device)) as f:
+            return int(f.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_latency_timer(device, ms):
+    """
+    :param ms: Integer ms, 1 - 255
+    :raise IOError: if not permitted, root is usually needed
+    """
+    with open(latency_timer_path(device), 'w') as f:
+        f.write(str(int(ms)))
+
+
+def _serial_struct(fd):
+    import fcntl
+    buf = array.array('i', [0] * 32)
+    fcntl.ioctl(fd, TIOCGSERIAL, buf)
+    return buf
+
+
+def set_low_latency(device, on=True):
+    """
+    Set or clear ``ASYNC_LOW_LATENCY`` through ``TIOCSSERIAL``.
+    :param device: device name, eg. ``/dev/ttyUSB0``
+    :return: previous state, None if the driver does not support ``TIOCGSERIAL``
+    :raise OSError: if not permitted
+    """
+    import fcntl
+    fd = os.open(device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        try:
+            buf = _serial_struct(fd)
+        except (IOError, OSError) as e:
+            if e.errno in (errno.ENOTTY, errno.EINVAL):
+                return None
+            raise
+        previous = bool(buf[SERIAL_FLAGS_INDEX] & ASYNC_LOW_LATENCY)
+        if previous != on:
+            if on:
+                buf[SERIAL_FLAGS_INDEX] |= ASYNC_LOW_LATENCY
+            else:
+                buf[SERIAL_FLAGS_INDEX] &= ~ASYNC_LOW_LATENCY
+            fcntl.ioctl(fd, TIOCSSERIAL, buf)
+        return previous
+    finally:
+        os.close(fd)
+
+
+def enable_low_latency(device, latency_timer=1):
+    """
+    Set ``ASYNC_LOW_LATENCY`` and lower the FTDI latency timer, as far as permitted.
+    :param device: device name, eg. ``/dev/ttyUSB0``
+    :param latency_timer: target latency timer in ms
+    :return: (saved, warnings), saved is the dict of original settings for ``restore_low_latency``,
+             warnings is a list of String, one per setting which could not be changed
+    """
+    saved = {'low_latency': None, 'latency_timer': None}
+    warnings = []
+    try:
+        saved['low_latency'] = set_low_latency(device, True)
+        if saved['low_latency'] is None:
+            warnings.append("{} does not support ASYNC_LOW_LATENCY".format(device))
+    except (IOError, OSError) as e:
+        warnings.append("Could not set ASYNC_LOW_LATENCY on {}: {}".format(device, e.strerror))
+    timer = read_latency_timer(device)
+    if timer is not None and timer > latency_timer:
+        try:
+            write_latency_timer(device, latency_timer)
+            saved['latency_timer'] = timer
+        except (IOError, OSError) as e:
+            warnings.append("Could not lower the latency_timer of {} from {} ms: {}, run: "
+                            "echo {} | sudo tee {}".format(device, timer, e.strerror, latency_timer,
+                                                           latency_timer_path(device)))
+    return saved, warnings
+
+
+def restore_low_latency(device, saved):
+    """
+    Undo ``enable_low_latency``, errors are ignored, eg. when the device is gone.
+    :param saved: dict returned by ``enable_low_latency``
+    """
+    if saved.get('low_latency') is False:
+        try:
+            set_low_latency(device, False)
+        except (IOError, OSError):
+            pass
+    if saved.get('latency_timer') is not None:
+        try:
+            write_latency_timer(device, saved['latency_timer'])
+        except (IOError, OSError):
+            pass
+
+
+def get_low_latency(device):
+    """
+    :param device: device name, eg. ``/dev/ttyUSB0``
+    :return: True if ``ASYNC_LOW_LATENCY`` is set, None if the driver does not support ``TIOCGSERIAL``
+    """
+    try:
+        fd = os.open(device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        return bool(_serial_struct(fd)[SERIAL_FLAGS_INDEX] & ASYNC_LOW_LATENCY)
+    except (IOError, OSError, ImportError):
+        return None
+    finally:
+        os.close(fd)
+
+
+def measure_rtt(arm, count=100, cmd=protocol.GET_COOR):
+    """
+    Send ``count`` queries one after another and measure the round trip of each.
+    :param arm: UArm instance, connected
+    :return: dict, ``rtt`` histogram snapshot in seconds and ``lost`` replies
+    """
+    histogram = Histogram()
+    lost = 0
+    for _ in range(count):
+        start = time.time()
+        response = arm.submit(cmd).result()
+        if response is None:
+            lost += 1
+        else:
+            histogram.record(time.time() - start)
+    return {'count': count, 'lost': lost, 'rtt': histogram.snapshot()}
+
+
+def measure_throughput(arm, count=200, cmd=protocol.GET_COOR):
+    """
+    Send ``count`` queries at once, pipelined by the send thread, and measure the bytes moved.
+    :param arm: UArm instance, connected
+    :return: dict of ``bytes_in``, ``bytes_out``, ``seconds``, ``bytes_per_sec`` and ``utilization``,
+             the busiest direction relative to the baud rate
+    """
+    before = arm.metrics()
+    start = time.time()
+    futures = [arm.submit(cmd) for _ in range(count)]
+    lost = sum(1 for f in futures if f.result() is None)
+    seconds = time.time() - start
+    after = arm.metrics()
+    bytes_in = after['bytes_in'] - before['bytes_in']
+    bytes_out = after['bytes_out'] - before['bytes_out']
+    rate = max(bytes_in, bytes_out) / seconds if seconds > 0 else 0
+    return {'count': count, 'lost': lost, 'bytes_in': bytes_in, 'bytes_out': bytes_out, 'seconds': seconds,
+            'bytes_per_sec': rate, 'utilization': rate / BYTES_PER_SEC}
+
+
+def recommendations(report):
+    """
+    :param report: dict from ``diagnose``
+    :return: list of String advices, empty if nothing to improve
+    """
+    advices = []
+    device = report['device']
+    timer = report['latency_timer']
+    if timer is not None and timer > 1:
+        advices.append("FTDI latency_timer is {} ms, lower it to 1 ms: echo 1 | sudo tee {}".format(
+            timer, latency_timer_path(device)))
+    if report['low_latency'] is False:
+        advices.append("ASYNC_LOW_LATENCY is off, enable it with UArm(low_latency=True) or: "
+                       "setserial {} low_latency".format(device))
+    p50 = report['rtt']['rtt']['p50']
+    if p50 is not None and timer is not None and p50 * 1000 >= timer / 2.0:
+        advices.append("Median round trip {:.1f} ms is dominated by the latency timer".format(p50 * 1000))
+    lost = report['rtt']['lost'] + report['throughput']['lost']
+    if lost > 0:
+        advices.append("{} replies lost, check the USB cable, hub and power supply".format(lost))
+    if report['malformed_lines'] > 0:
+        advices.append("{} malformed lines received, check the baud rate and cable noise".format(
+            report['malformed_lines']))
+    if report['throughput']['utilization'] < 0.5:
+        advices.append("Pipelined throughput uses {:.0%} of {} baud, batch commands with UArm.batch or "
+                       "submit_many".format(report['throughput']['utilization'], BAUDRATE))
+    return advices
+
+
+def diagnose(arm, count=100):
+    """
+    Run all link checks.
+    :param arm: UArm instance, connected
+    :param count: number of queries of each measurement
+    :return: dict report, JSON serializable
+    """
+    device = arm.port.device if arm.port is not None else arm.port_name
+    malformed = arm.metrics()['malformed_lines']
+    report = {
+        'device': device,
+        'serial_number': getattr(arm.port, 'serial_number', None),
+        'firmware_version': arm.firmware_version,
+        'latency_timer': read_latency_timer(device),
+        'low_latency': get_low_latency(device),
+        'rtt': measure_rtt(arm, count),
+        'throughput': measure_throughput(arm, count),
+    }
+    report['malformed_lines'] = arm.metrics()['malformed_lines'] - malformed
+    report['recommendations'] = recommendations(report)
+    return report
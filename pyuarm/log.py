@@ -1,14 +1,79 @@
 from __future__ import print_function
-from logging import DEBUG, ERROR, INFO
+from logging import DEBUG, ERROR, INFO, WARNING
+import atexit
 import sys
 from . import PY3
 import logging
 from .version import __version__
 
+try:
+    from logging.handlers import QueueHandler, QueueListener
+    if PY3:
+        import queue
+    else:
+        import Queue as queue
+except ImportError:
+    # Python 2 has no QueueHandler, handlers are called synchronously
+    QueueHandler = None
+
 # ################################### Log ################################
 STREAM = 55
 pylogger = None
 stream_logger = None
+listeners = []
+
+
+class LazyMessage(object):
+    """
+    ``fmt.format(*args)``, formatted by the handler only if the record is emitted.
+    Arguments should be immutable, they are formatted later in the listener thread.
+    """
+    __slots__ = ('fmt', 'args')
+
+    def __init__(self, fmt, args):
+        self.fmt = fmt
+        self.args = args
+
+    def __str__(self):
+        return self.fmt.format(*self.args)
+
+
+if QueueHandler is not None:
+    class _QueueHandler(QueueHandler):
+        def prepare(self, record):
+            # formatting is left to the listener thread
+            return record
+
+
+def _async_handler(handler):
+    """
+    Move ``handler`` behind a queue, so a slow terminal or file never blocks the caller.
+    :param handler: logging.Handler
+    :return: handler to add to the logger, ``handler`` itself if queues are not supported
+    """
+    if QueueHandler is None:
+        return handler
+    q = queue.Queue(-1)
+    listener = QueueListener(q, handler, respect_handler_level=True)
+    listener.start()
+    listeners.append(listener)
+    return _QueueHandler(q)
+
+
+def stop_listeners(close=False):
+    """
+    Emit all queued records and stop the listener threads.
+    :param close: if True, also close the handlers behind the queues
+    """
+    while listeners:
+        listener = listeners.pop()
+        listener.stop()
+        if close:
+            for handler in listener.handlers:
+                handler.close()
+
+
+atexit.register(stop_listeners)
 
 
 def get_logger_level():
@@ -28,7 +93,7 @@ def set_default_logger(debug=False):
         ch = logging.StreamHandler()
         ch.setFormatter(formatter)
         ch.setLevel(logging_level)
-        logger.addHandler(ch)
+        logger.addHandler(_async_handler(ch))
         init_logger(logger)
 
 
@@ -54,37 +119,37 @@ def set_stream_logger():
         if PY3:
             sch.terminator = ""
         sch.setLevel(logging.DEBUG)
-        stream_logger.addHandler(sch)
+        stream_logger.addHandler(_async_handler(sch))
 
 
 def close_logger():
-    if pylogger is not None:
-        handlers = pylogger.handlers
-        for p in handlers:
-            p.close()
-            pylogger.removeHandler(p)
-    if stream_logger is not None:
-        handlers = stream_logger.handlers
-        for p in handlers:
-            p.close()
-            stream_logger.removeHandler(p)
-
-
-def printf(msg, type=INFO):
+    """
+    Flush and stop the listener threads, then close and remove the handlers of the pyuarm loggers,
+    including the stream and file handlers behind the queues.
+    """
+    stop_listeners(close=True)
+    for logger in (pylogger, stream_logger):
+        if logger is not None:
+            for p in list(logger.handlers):
+                p.close()
+                logger.removeHandler(p)
+
+
+def printf(msg, type=INFO, *args):
     """
     global print log function
-    :param msg:
-    :param type:
+    The level is checked before any work, with ``args`` the message is only formatted if it is emitted,
+    so hot paths should use ``printf("Send {}", DEBUG, msg)`` rather than formatting themselves.
+    :param msg: message, or ``str.format`` template if ``args`` are given
+    :param type: INFO, DEBUG, WARNING, ERROR or STREAM
+    :param args: format arguments
     :return:
     """
     if pylogger is None:
         set_default_logger()
-    if type == INFO:
-        pylogger.info(msg)
-    elif type == DEBUG:
-        pylogger.debug(msg)
-    elif type == ERROR:
-        pylogger.error(msg)
+    if type in (INFO, DEBUG, WARNING, ERROR):
+        if pylogger.isEnabledFor(type):
+            pylogger.log(type, LazyMessage(msg, args) if args else msg)
     elif type == STREAM:
         if pylogger.level == DEBUG:
             if PY3:
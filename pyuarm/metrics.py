@@ -0,0 +1,233 @@
+"""
+pyuarm.metrics
+Low overhead link metrics for ``UArm.metrics``.
+``Histogram`` is a log-linear (HDR style) histogram: every power of two is split in ``SUB_BUCKETS``
+buckets, so any recorded value is known within about 6% while memory stays small and constant.
+``RTOEstimator`` learns per-command reply deadlines from the round trip times, like TCP's RTO (RFC 6298).
+"""
+from __future__ import division
+import threading
+import time
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+UNIT = 1e-6  # values are stored as integer microseconds
+
+RTO_ALPHA = 1 / 8.0
+RTO_BETA = 1 / 4.0
+RTO_K = 4
+MIN_RTO = 0.05
+MAX_RTO = 10
+
+
+class Histogram(object):
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.__buckets = {}
+
+    @staticmethod
+    def bucket(value):
+        """
+        :param value: Integer value
+        :return: (shift, mantissa), the bucket covers ``mantissa << shift`` to ``(mantissa + 1) << shift``
+        """
+        shift = value.bit_length() - SUB_BITS - 1
+        if shift <= 0:
+            return 0, value
+        return shift, value >> shift
+
+    def record(self, seconds):
+        """
+        Record one value in seconds, negative values are recorded as 0.
+        """
+        value = max(int(seconds / UNIT), 0)
+        key = self.bucket(value)
+        self.__buckets[key] = self.__buckets.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """
+        :param p: percentile, 0 - 100
+        :return: Float seconds, the middle of the bucket holding the percentile, None if empty
+        """
+        if self.count == 0:
+            return None
+        rank = max(p / 100.0 * self.count, 1)
+        seen = 0
+        for shift, mantissa in sorted(self.__buckets):
+            seen += self.__buckets[(shift, mantissa)]
+            if seen >= rank:
+                low = mantissa << shift
+                high = (mantissa + 1) << shift
+                return min(max((low + high - 1) / 2.0, self.min), self.max) * UNIT
+        return self.max * UNIT
+
+    def snapshot(self):
+        """
+        :return: dict of ``count``, ``min``, ``max``, ``mean``, ``p50``, ``p90``, ``p99`` in seconds
+        """
+        if self.count == 0:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'p50': None, 'p90': None, 'p99': None}
+        return {'count': self.count, 'min': self.min * UNIT, 'max': self.max * UNIT,
+                'mean': self.total / self.count * UNIT, 'p50': self.percentile(50),
+                'p90': self.percentile(90), 'p99': self.percentile(99)}
+
+
+class CommandStats(object):
+    def __init__(self):
+        self.sent = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.retries = 0
+        self.rtt = Histogram()
+
+    def snapshot(self):
+        return {'sent': self.sent, 'timeouts': self.timeouts, 'errors': self.errors, 'retries': self.retries,
+                'rtt': self.rtt.snapshot()}
+
+
+class LinkMetrics(object):
+    def __init__(self):
+        self.start_time = time.time()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.writes = 0
+        self.unmatched_replies = 0
+        self.malformed_lines = 0
+        self.queue_depth_max = 0
+        self.commands = {}
+        self.report_interval = Histogram()
+        self.__last_report = None
+        self.__lock = threading.Lock()
+
+    def __command(self, code):
+        stats = self.commands.get(code)
+        if stats is None:
+            stats = self.commands[code] = CommandStats()
+        return stats
+
+    def sent(self, code):
+        with self.__lock:
+            self.__command(code).sent += 1
+
+    def replied(self, code, rtt, ok=True):
+        with self.__lock:
+            stats = self.__command(code)
+            stats.rtt.record(rtt)
+            if not ok:
+                stats.errors += 1
+
+    def timeout(self, code):
+        with self.__lock:
+            self.__command(code).timeouts += 1
+
+    def retry(self, code):
+        with self.__lock:
+            self.__command(code).retries += 1
+
+    def unmatched(self):
+        with self.__lock:
+            self.unmatched_replies += 1
+
+    def malformed(self):
+        with self.__lock:
+            self.malformed_lines += 1
+
+    def queued(self, depth):
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def report(self, now):
+        with self.__lock:
+            if self.__last_report is not None:
+                self.report_interval.record(now - self.__last_report)
+            self.__last_report = now
+
+    def snapshot(self):
+        """
+        :return: dict of all counters, histograms are dicts of seconds, see ``Histogram.snapshot``
+        """
+        with self.__lock:
+            commands = dict((code, stats.snapshot()) for code, stats in self.commands.items())
+            return {
+                'uptime': time.time() - self.start_time,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'writes': self.writes,
+                'unmatched_replies': self.unmatched_replies,
+                'malformed_lines': self.malformed_lines,
+                'queue_depth_max': self.queue_depth_max,
+                'timeouts': sum(c['timeouts'] for c in commands.values()),
+                'retries': sum(c['retries'] for c in commands.values()),
+                'commands': commands,
+                'report_interval': self.report_interval.snapshot(),
+            }
+
+
+class RTOEstimator(object):
+    def __init__(self, floor=MIN_RTO, ceiling=MAX_RTO):
+        """
+        :param floor: lowest deadline in seconds, covers the USB latency timer and scheduling jitter
+        :param ceiling: highest deadline in seconds
+        """
+        self.floor = floor
+        self.ceiling = ceiling
+        self.srtt = None  # smoothed round trip time over all commands
+        self.__estimates = {}
+        self.__lock = threading.Lock()
+
+    def __bound(self, rto):
+        return min(max(rto, self.floor), self.ceiling)
+
+    def update(self, code, rtt):
+        """
+        Feed one round trip time sample of a command.
+        :param code: command code, eg. ``P220``
+        :param rtt: seconds from the serial write to the reply
+        """
+        with self.__lock:
+            e = self.__estimates.get(code)
+            if e is None:
+                e = self.__estimates[code] = {'srtt': rtt, 'rttvar': rtt / 2.0, 'samples': 0}
+            else:
+                e['rttvar'] = (1 - RTO_BETA) * e['rttvar'] + RTO_BETA * abs(e['srtt'] - rtt)
+                e['srtt'] = (1 - RTO_ALPHA) * e['srtt'] + RTO_ALPHA * rtt
+            e['samples'] += 1
+            e['rto'] = self.__bound(e['srtt'] + RTO_K * e['rttvar'])
+            self.srtt = rtt if self.srtt is None else (1 - RTO_ALPHA) * self.srtt + RTO_ALPHA * rtt
+
+    def backoff(self, code):
+        """
+        Double the deadline of a command after a timeout, until the next sample arrives.
+        """
+        with self.__lock:
+            e = self.__estimates.get(code)
+            if e is not None:
+                e['rto'] = self.__bound(e['rto'] * 2)
+
+    def rto(self, code):
+        """
+        :return: Float seconds, None if the command was never answered
+        """
+        e = self.__estimates.get(code)
+        return e['rto'] if e is not None else None
+
+    def snapshot(self):
+        """
+        :return: dict of command code to dict of ``srtt``, ``rttvar``, ``rto`` in seconds and ``samples``
+        """
+        with self.__lock:
+            return dict((code, dict(e)) for code, e in self.__estimates.items())
+
+    def reset(self):
+        with self.__lock:
+            self.__estimates.clear()
+            self.srtt = None
@@ -0,0 +1,191 @@
+"""
+pyuarm.planning
+Host side motion planner for polyline paths.
+1. Corner blending, sharp corners are replaced by a short curve within ``tolerance``
+2. Junction speed, how fast the arm may pass each corner (junction deviation model)
+3. Lookahead, backward/forward passes so every segment can still stop in time
+4. Speed profile, trapezoidal or S-curve timing of every segment
+
+The result is a list of ``PlannedSegment`` with the predicted finish time of each segment,
+which ``UArm.follow_path`` turns into a stream of ``protocol.SET_POSITION`` commands.
+Units are mm, mm/s and mm/s^2.
+
+Limitation: firmware 2.2 has no command to pass a junction at speed, it plans every ``G0`` from rest.
+Each sample of a blended corner is its own ``G0``, so the arm still slows down at every sample, in smaller
+steps than at the sharp corner. The planned speeds only set the feed rate of each command, and ``finish_time``
+is the time of the ideal motion, a lower bound of the real one.
+"""
+from __future__ import division
+import math
+from collections import namedtuple
+from . import protocol
+
+DEFAULT_ACCELERATION = 1000.0
+DEFAULT_TOLERANCE = 1.0
+DEFAULT_LOOKAHEAD = 16
+PROFILE_TRAPEZOID = 'trapezoid'
+PROFILE_S_CURVE = 's-curve'
+
+PlannedSegment = namedtuple('PlannedSegment', ['start', 'end', 'length', 'entry_speed', 'peak_speed',
+                                               'exit_speed', 'duration', 'finish_time'])
+
+
+def _sub(a, b):
+    return [a[0] - b[0], a[1] - b[1], a[2] - b[2]]
+
+
+def _norm(v):
+    return math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+
+
+def _unit(a, b):
+    d = _sub(b, a)
+    n = _norm(d)
+    return [d[0] / n, d[1] / n, d[2] / n], n
+
+
+def _dedup(points):
+    result = []
+    for p in points:
+        p = [float(p[0]), float(p[1]), float(p[2])]
+        if not result or _norm(_sub(p, result[-1])) > 1e-6:
+            result.append(p)
+    return result
+
+
+def blend_corners(points, tolerance=DEFAULT_TOLERANCE, steps=4):
+    """
+    Round the corners of a polyline.
+    | Every interior corner is replaced by a quadratic Bezier curve whose distance to the corner is at most
+    | ``tolerance``, sampled with ``steps`` segments. The curve never uses more than half of a neighbour segment.
+    :param points: list of [x, y, z]
+    :param tolerance: maximum distance from the original corner in mm, 0 disables blending
+    :param steps: number of segments per blended corner
+    :return: list of [x, y, z]
+    """
+    points = _dedup(points)
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    result = [points[0]]
+    for i in range(1, len(points) - 1):
+        prev, corner, nxt = points[i - 1], points[i], points[i + 1]
+        u1, l1 = _unit(prev, corner)
+        u2, l2 = _unit(corner, nxt)
+        turn = _norm(_sub(u2, u1))
+        if turn < 1e-6:
+            continue  # collinear, the corner disappears
+        # the Bezier midpoint lies d * |u2 - u1| / 4 away from the corner
+        d = min(4.0 * tolerance / turn, l1 / 2.0, l2 / 2.0)
+        p_in = [corner[k] - u1[k] * d for k in range(3)]
+        p_out = [corner[k] + u2[k] * d for k in range(3)]
+        for s in range(steps + 1):
+            t = s / steps
+            result.append([(1 - t) ** 2 * p_in[k] + 2 * (1 - t) * t * corner[k] + t ** 2 * p_out[k]
+                           for k in range(3)])
+    result.append(points[-1])
+    return _dedup(result)
+
+
+def junction_speed(u1, u2, acceleration, deviation):
+    """
+    Maximum speed to pass the junction between two unit directions (junction deviation model).
+    :return: Float speed, 0 for a full reversal, infinite for a straight line
+    """
+    cos_theta = -(u1[0] * u2[0] + u1[1] * u2[1] + u1[2] * u2[2])
+    if cos_theta > 0.999999:
+        return 0.0
+    sin_half = math.sqrt(max(0.5 * (1.0 - cos_theta), 0.0))
+    if sin_half > 0.999999:
+        return float('inf')
+    return math.sqrt(acceleration * deviation * sin_half / (1.0 - sin_half))
+
+
+def segment_timing(length, entry_speed, exit_speed, speed, acceleration):
+    """
+    Timing of one segment with a trapezoidal speed profile.
+    :return: (peak speed, duration in seconds)
+    """
+    peak = math.sqrt(acceleration * length + (entry_speed ** 2 + exit_speed ** 2) / 2.0)
+    peak = max(min(peak, speed), entry_speed, exit_speed)
+    accel_dist = max(peak ** 2 - entry_speed ** 2, 0.0) / (2.0 * acceleration)
+    decel_dist = max(peak ** 2 - exit_speed ** 2, 0.0) / (2.0 * acceleration)
+    cruise_dist = max(length - accel_dist - decel_dist, 0.0)
+    duration = (peak - entry_speed) / acceleration + (peak - exit_speed) / acceleration
+    if peak > 0:
+        duration += cruise_dist / peak
+    return peak, duration
+
+
+def plan(points, speed=100, acceleration=DEFAULT_ACCELERATION, tolerance=DEFAULT_TOLERANCE,
+         lookahead=DEFAULT_LOOKAHEAD, profile=PROFILE_TRAPEZOID):
+    """
+    Plan a polyline path.
+    | The path starts and ends at rest. Corners are blended first, then the speed of every junction is limited
+    | by the junction deviation model, by what the next ``lookahead`` segments can still brake for, and by what
+    | the previous segments can accelerate to.
+    | The S-curve profile is approximated with half of the acceleration, which is the mean acceleration of a
+    | jerk limited ramp reaching ``acceleration``.
+    :param points: list of [x, y, z], the first one is the current position
+    :param speed: maximum speed in mm/s
+    :param acceleration: maximum acceleration in mm/s^2
+    :param tolerance: corner tolerance in mm, also used as junction deviation
+    :param lookahead: number of segments the planner looks ahead
+    :param profile: ``PROFILE_TRAPEZOID`` or ``PROFILE_S_CURVE``
+    :return: list of PlannedSegment
+    """
+    if profile == PROFILE_S_CURVE:
+        acceleration = acceleration / 2.0
+    elif profile != PROFILE_TRAPEZOID:
+        raise ValueError("Unknown profile: {}".format(profile))
+    points = blend_corners(points, tolerance)
+    count = len(points) - 1
+    if count < 1:
+        return []
+    units = []
+    lengths = []
+    for i in range(count):
+        u, n = _unit(points[i], points[i + 1])
+        units.append(u)
+        lengths.append(n)
+    deviation = max(tolerance, 0.01)
+    # limits[i] is the speed limit at the start of segment i, limits[count] is the end of the path
+    limits = [0.0] + [min(speed, junction_speed(units[i - 1], units[i], acceleration, deviation))
+                      for i in range(1, count)] + [0.0]
+    # lookahead window, the planner must be able to stop at the end of the segments it can see
+    window = 0.0
+    for i in range(count - 1, -1, -1):
+        window += lengths[i]
+        if i + lookahead < count:
+            window -= lengths[i + lookahead]
+        limits[i] = min(limits[i], math.sqrt(2.0 * acceleration * window))
+    # backward pass, brake in time
+    for i in range(count - 1, -1, -1):
+        limits[i] = min(limits[i], math.sqrt(limits[i + 1] ** 2 + 2.0 * acceleration * lengths[i]))
+    # forward pass, accelerate within reach
+    for i in range(count):
+        limits[i + 1] = min(limits[i + 1], math.sqrt(limits[i] ** 2 + 2.0 * acceleration * lengths[i]))
+    segments = []
+    finish_time = 0.0
+    for i in range(count):
+        peak, duration = segment_timing(lengths[i], limits[i], limits[i + 1], speed, acceleration)
+        finish_time += duration
+        segments.append(PlannedSegment(start=points[i], end=points[i + 1], length=lengths[i],
+                                       entry_speed=limits[i], peak_speed=peak, exit_speed=limits[i + 1],
+                                       duration=duration, finish_time=finish_time))
+    return segments
+
+
+def to_commands(segments):
+    """
+    Convert planned segments to ``protocol.SET_POSITION`` commands.
+    | Each command uses the mean speed of its segment. The firmware starts and ends every command at rest,
+    | so the arm takes longer than the predicted timing, see the limitation above.
+    :param segments: list of PlannedSegment
+    :return: list of String Serial Commands
+    """
+    commands = []
+    for seg in segments:
+        mean_speed = seg.length / seg.duration if seg.duration > 0 else seg.peak_speed
+        commands.append(protocol.SET_POSITION.format(str(round(seg.end[0], 2)), str(round(seg.end[1], 2)),
+                                                     str(round(seg.end[2], 2)), str(round(mean_speed, 2))))
+    return commands
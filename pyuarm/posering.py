@@ -0,0 +1,203 @@
+"""
+pyuarm.posering
+Publish the ``@3`` position reports of a uArm in shared memory, enabled with ``UArm.enable_position_ring``.
+Other processes attach by the serial number of the arm and read the latest sample and recent history
+straight from the shared buffer, without sockets and without locks.
+
+The segment is a ring of ``capacity`` slots after a small header. Each slot is guarded by its own sequence
+number (a seqlock): the writer makes it odd while it writes the slot and sets it to ``2 * (n + 1)`` when
+sample ``n`` is complete, then publishes ``n + 1`` in the header. A reader retries if the sequence changed
+while it read the slot, or skips the slot if it was overwritten meanwhile.
+``multiprocessing.shared_memory`` is required, Python 3.8 or newer.
+
+.. raw:python
+>>> reader = PositionReader('A600CRJU')
+>>> reader.latest()
+(1514764800.123, 0.0, 150.0, 150.0)
+"""
+import struct
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+MAGIC = b'UAPR'
+VERSION = 1
+DEFAULT_CAPACITY = 1024
+HEADER = struct.Struct('<4sIII')  # magic, version, capacity, reserved
+HEAD = struct.Struct('<Q')  # samples written so far
+HEAD_OFFSET = HEADER.size
+SLOT = struct.Struct('<Qdddd')  # sequence, timestamp, x, y, z
+SLOTS_OFFSET = HEAD_OFFSET + HEAD.size
+SEQ = struct.Struct('<Q')
+SAMPLE = struct.Struct('<dddd')
+READ_RETRIES = 16
+
+
+def _require_shared_memory():
+    if shared_memory is None:
+        raise ImportError("multiprocessing.shared_memory is required for pyuarm.posering, Python 3.8 or newer")
+
+
+def segment_name(serial_number):
+    """
+    :param serial_number: String, USB serial number of the arm, eg. ``A600CRJU``
+    :return: shared memory segment name
+    """
+    return 'uarm-pos-{}'.format(serial_number)
+
+
+def _attach(name):
+    try:
+        # Python 3.13+, readers must not unlink the segment when they exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except (ImportError, AttributeError):
+            pass
+        return shm
+
+
+class PositionRing(object):
+    def __init__(self, name, capacity=DEFAULT_CAPACITY):
+        """
+        Writer side, create the segment, a stale segment of the same name is replaced.
+        :param name: segment name, see ``segment_name``
+        :param capacity: number of samples kept
+        """
+        _require_shared_memory()
+        self.name = name
+        self.capacity = capacity
+        self.__count = 0
+        size = SLOTS_OFFSET + capacity * SLOT.size
+        try:
+            self.__shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.__shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        buf = self.__shm.buf
+        buf[:size] = b'\0' * size
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, capacity, 0)
+
+    @property
+    def count(self):
+        """
+        :return: Integer, samples published so far
+        """
+        return self.__count
+
+    def publish(self, position, timestamp=None):
+        """
+        Write one sample, only one thread may publish.
+        :param position: [x, y, z]
+        :param timestamp: ``time.time()`` of the report, default now
+        """
+        n = self.__count
+        buf = self.__shm.buf
+        offset = SLOTS_OFFSET + (n % self.capacity) * SLOT.size
+        SEQ.pack_into(buf, offset, 2 * n + 1)
+        SAMPLE.pack_into(buf, offset + SEQ.size, time.time() if timestamp is None else timestamp,
+                         position[0], position[1], position[2])
+        SEQ.pack_into(buf, offset, 2 * n + 2)
+        self.__count = n + 1
+        HEAD.pack_into(buf, HEAD_OFFSET, n + 1)
+
+    def close(self):
+        """
+        Close and remove the segment, attached readers keep their mapping.
+        """
+        if self.__shm is not None:
+            self.__shm.close()
+            try:
+                self.__shm.unlink()
+            except OSError:
+                pass
+            self.__shm = None
+
+
+class PositionReader(object):
+    def __init__(self, serial_number=None, name=None):
+        """
+        Reader side, attach to the ring of an arm.
+        :param serial_number: String, USB serial number of the arm
+        :param name: segment name, used instead of ``serial_number``
+        :raise IOError: if the arm does not publish its position, see ``UArm.enable_position_ring``
+        """
+        _require_shared_memory()
+        self.name = name or segment_name(serial_number)
+        self.__shm = _attach(self.name)
+        magic, version, self.capacity, _ = HEADER.unpack_from(self.__shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise IOError("{} is not a uArm position ring".format(self.name))
+
+    @property
+    def count(self):
+        """
+        :return: Integer, samples published so far, use it to detect new samples
+        """
+        return HEAD.unpack_from(self.__shm.buf, HEAD_OFFSET)[0]
+
+    def __read(self, n):
+        """
+        :return: (timestamp, x, y, z) of sample ``n``, None if it was overwritten
+        """
+        buf = self.__shm.buf
+        offset = SLOTS_OFFSET + (n % self.capacity) * SLOT.size
+        expected = 2 * n + 2
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq > expected:
+                return None
+            if seq != expected:
+                continue
+            sample = SAMPLE.unpack_from(buf, offset + SEQ.size)
+            if SEQ.unpack_from(buf, offset)[0] == expected:
+                return sample
+        return None
+
+    def latest(self):
+        """
+        :return: (timestamp, x, y, z) of the newest sample, None if nothing was published yet
+        """
+        for _ in range(READ_RETRIES):
+            count = self.count
+            if count == 0:
+                return None
+            sample = self.__read(count - 1)
+            if sample is not None:
+                return sample
+        return None
+
+    def history(self, count=None):
+        """
+        :param count: number of samples, default the whole ring
+        :return: list of (timestamp, x, y, z), oldest first
+        """
+        head = self.count
+        if count is None or count > self.capacity:
+            count = self.capacity
+        samples = []
+        for n in range(max(0, head - count), head):
+            sample = self.__read(n)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def close(self):
+        if self.__shm is not None:
+            self.__shm.close()
+            self.__shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
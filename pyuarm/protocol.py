@@ -21,6 +21,15 @@ OFFSET_STRETCH_START_ADDRESS = 20
 
 SERIAL_NUMBER_ADDRESS = 100
 
+## FIRMWARE SERIAL RECEIVE BUFFER (bytes)
+RX_BUFFER_SIZE = 64
+# kept free by bulk and control commands, room for one stop or detach line, "#65535 M2202 N3\r\n"
+EMERGENCY_RESERVE = 17
+
+## WRITE COALESCING, back-to-back writes are collected for WRITE_WINDOW seconds or up to WRITE_BUDGET bytes
+WRITE_WINDOW = 0.0005
+WRITE_BUDGET = 256
+
 ## EEPROM DATA TYPE INDEX
 EEPROM_DATA_TYPE_BYTE = 1
 EEPROM_DATA_TYPE_INTEGER = 2
@@ -59,6 +68,19 @@ SET_EEPROM              = "M212 N0 A{} T{} V{}"
 GET_ANALOG              = "P241 N{}"
 GET_DIGITAL             = "P240 N{}"
 
+# Query commands do not change the uArm state, safe to share or resend
+QUERY_COMMANDS          = tuple(c.split(' ')[0] for c in (
+    GET_PUMP, GET_SIMULATION, GET_FIRMWARE_VERSION, GET_HARDWARE_VERSION, GET_COOR, GET_SERVO_STATUS,
+    GET_SERVO_ANGLE, GET_IS_MOVE, GET_TIP_SENSOR, GET_POLAR, GET_GRIPPER, GET_EEPROM, GET_ANALOG, GET_DIGITAL))
+
+# Send Priority Lanes, lower value is sent first
+PRIORITY_EMERGENCY      = 0
+PRIORITY_CONTROL        = 1
+PRIORITY_BULK           = 2
+EMERGENCY_COMMANDS      = (STOP_MOVING.split(' ')[0], DETACH_SERVO.split(' ')[0])
+BULK_COMMANDS           = (SET_POSITION.split(' ')[0], SET_POSITION_RELATIVE.split(' ')[0],
+                           SET_POLAR.split(' ')[0], SET_SERVO_ANGLE.split(' ')[0])
+
 # Report Command
 SET_REPORT_POSITION     = "M120 V{}"
 REPORT_POSITION_PREFIX  = "@3"
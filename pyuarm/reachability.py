@@ -0,0 +1,174 @@
+"""
+pyuarm.reachability
+Offline reachability map of the uArm workspace.
+The workspace grid is swept once with pipelined ``protocol.GET_SIMULATION`` queries and stored as a
+compressed boolean volume per hardware version. Jobs are then validated with ``is_reachable``
+without any serial traffic.
+numpy is required for this module.
+"""
+from __future__ import division
+import os
+from .config import ua_dir
+from .log import printf, ERROR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_BOUNDS = ((-350, 350), (0, 350), (-150, 250))
+DEFAULT_STEP = 10
+SWEEP_CHUNK = 256
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for pyuarm.reachability, please install numpy")
+
+
+def default_map_path(hardware_version):
+    """
+    :param hardware_version: String hardware version, eg. ``3.2.1``, None if unknown
+    :return: path of the map file in the uArm assistant folder, ``reachability.npz`` if the version is unknown
+    """
+    if not hardware_version:
+        return os.path.join(ua_dir, "reachability.npz")
+    return os.path.join(ua_dir, "reachability-{}.npz".format(hardware_version))
+
+
+class ReachabilityMap(object):
+    def __init__(self, volume, origin, step, hardware_version=None, missing=0):
+        """
+        :param volume: boolean array of shape (nx, ny, nz), True if the grid point is reachable
+        :param origin: (x, y, z) of the grid point ``volume[0, 0, 0]``, unit mm
+        :param step: grid spacing, unit mm
+        :param hardware_version: String hardware version the map was built on
+        :param missing: number of grid points the arm did not answer for, they are marked unreachable
+        """
+        _require_numpy()
+        self.volume = np.asarray(volume, dtype=bool)
+        self.origin = np.asarray(origin, dtype=float)
+        self.step = float(step)
+        self.hardware_version = hardware_version
+        self.missing = missing
+        self.__values = self.volume.astype(np.float32)
+
+    @classmethod
+    def grid(cls, bounds=DEFAULT_BOUNDS, step=DEFAULT_STEP):
+        """
+        Grid axes for the given bounds.
+        :param bounds: ((x_min, x_max), (y_min, y_max), (z_min, z_max)), unit mm
+        :param step: grid spacing, unit mm
+        :return: (xs, ys, zs) arrays
+        """
+        _require_numpy()
+        return tuple(np.arange(lo, hi + step / 2.0, step, dtype=float) for lo, hi in bounds)
+
+    def save(self, path=None, force=False):
+        """
+        Save the map as a compressed ``.npz`` file.
+        :param path: if None, save to ``default_map_path(hardware_version)``
+        :param force: if True, save even if some points are missing
+        :return: path of the saved file
+        :raise ValueError: if ``missing`` is not 0, an incomplete map would reject reachable positions for good
+        """
+        if self.missing and not force:
+            raise ValueError("{} grid points are unknown, sweep again".format(self.missing))
+        if path is None:
+            path = default_map_path(self.hardware_version)
+        np.savez_compressed(path, volume=np.packbits(self.volume.ravel()), shape=self.volume.shape,
+                            origin=self.origin, step=self.step,
+                            hardware_version=str(self.hardware_version or ''))
+        return path
+
+    @classmethod
+    def load(cls, path=None, hardware_version=None):
+        """
+        Load a map saved by ``save``.
+        :param path: map file, if None, use ``default_map_path(hardware_version)``
+        :param hardware_version: String hardware version, used when path is None
+        :return: ReachabilityMap
+        """
+        _require_numpy()
+        if path is None:
+            path = default_map_path(hardware_version)
+        data = np.load(path)
+        shape = tuple(int(v) for v in data['shape'])
+        count = shape[0] * shape[1] * shape[2]
+        volume = np.unpackbits(data['volume'])[:count].reshape(shape).astype(bool)
+        return cls(volume, data['origin'], float(data['step']), str(data['hardware_version']) or None)
+
+    def reachability(self, points):
+        """
+        Trilinear interpolation of the volume, points outside the grid are 0.
+        :param points: array like of shape (N, 3) or (3,)
+        :return: Float array of shape (N,), 0 unreachable to 1 reachable
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        idx = (points - self.origin) / self.step
+        shape = np.array(self.volume.shape)
+        inside = np.all((idx >= 0) & (idx <= shape - 1), axis=1)
+        idx = np.clip(idx, 0, shape - 1)
+        lo = np.minimum(np.floor(idx).astype(int), np.maximum(shape - 2, 0))
+        frac = idx - lo
+        hi = np.minimum(lo + 1, shape - 1)
+        result = np.zeros(len(points))
+        for dx in (0, 1):
+            wx = frac[:, 0] if dx else 1 - frac[:, 0]
+            ix = hi[:, 0] if dx else lo[:, 0]
+            for dy in (0, 1):
+                wy = frac[:, 1] if dy else 1 - frac[:, 1]
+                iy = hi[:, 1] if dy else lo[:, 1]
+                for dz in (0, 1):
+                    wz = frac[:, 2] if dz else 1 - frac[:, 2]
+                    iz = hi[:, 2] if dz else lo[:, 2]
+                    result += wx * wy * wz * self.__values[ix, iy, iz]
+        result[~inside] = 0.0
+        return result
+
+    def is_reachable(self, points, threshold=0.5):
+        """
+        Check whether points are reachable.
+        :param points: array like of shape (N, 3) or (3,)
+        :param threshold: interpolated reachability above which a point counts as reachable
+        :return: Boolean array of shape (N,)
+        """
+        return self.reachability(points) >= threshold
+
+
+def sweep(arm, bounds=DEFAULT_BOUNDS, step=DEFAULT_STEP, progress=None):
+    """
+    Build a ReachabilityMap by querying every grid point with ``protocol.GET_SIMULATION``.
+    | Queries are submitted in chunks of ``SWEEP_CHUNK`` and pipelined by the send thread.
+    | Points without a response are asked again one by one, with the retries of ``UArm.send_and_receive``.
+    | Points still without a response count as unreachable and are counted in ``missing`` of the map.
+    :param arm: connected UArm instance
+    :param bounds: ((x_min, x_max), (y_min, y_max), (z_min, z_max)), unit mm
+    :param step: grid spacing, unit mm
+    :param progress: callable ``progress(done, total)``
+    :return: ReachabilityMap
+    """
+    xs, ys, zs = ReachabilityMap.grid(bounds, step)
+    volume = np.zeros((len(xs), len(ys), len(zs)), dtype=bool)
+    indexes = [(i, j, k) for i in range(len(xs)) for j in range(len(ys)) for k in range(len(zs))]
+    total = len(indexes)
+    lost = []
+    for start in range(0, total, SWEEP_CHUNK):
+        chunk = indexes[start:start + SWEEP_CHUNK]
+        futures = [arm.get_simulation_async(xs[i], ys[j], zs[k]) for i, j, k in chunk]
+        for (i, j, k), future in zip(chunk, futures):
+            result = future.result()
+            if result is None:
+                lost.append((i, j, k))
+            volume[i, j, k] = bool(result)
+        if progress is not None:
+            progress(start + len(chunk), total)
+    missing = 0
+    for i, j, k in lost:
+        result = arm.get_simulation(xs[i], ys[j], zs[k])
+        if result is None:
+            missing += 1
+        volume[i, j, k] = bool(result)
+    if missing > 0:
+        printf("{} of {} points got no response".format(missing, total), ERROR)
+    return ReachabilityMap(volume, (xs[0], ys[0], zs[0]), step, arm.hardware_version, missing)
@@ -0,0 +1,376 @@
+"""
+pyuarm.server
+Share uArms between processes. ``uarmcli serve`` owns the serial ports and serves them over a Unix domain
+socket, clients use ``UArmClient``, which has the whole ``UArm`` API.
+The socket speaks the serial line protocol itself:
+
+- ``#id cmd`` is sent to the arm under a new id, the reply comes back as ``$id ...`` with the client id.
+  Any number of commands can be in flight, the arm send thread keeps the firmware buffer full.
+  ``$id E_UNSUPPORTED`` and ``$id E_DISCONNECTED`` are answered by the daemon itself,
+  no reply is sent if the arm does not answer before its deadline.
+- ``M120 V{interval}`` subscribes the client to ``@3`` position reports. The arm reports at the shortest
+  interval any client asked for, each client gets them at its own interval.
+- ``!hello [arm]`` selects the arm by serial number or port and is answered with ``@1``,
+  ``!arms`` lists the arms as ``!arms <serial>@<port> ...``.
+
+.. raw:python
+The default socket is ``$XDG_RUNTIME_DIR/uarmd.sock``, or ``uarmd-<uid>/uarmd.sock`` in the temp directory,
+a directory only its owner can enter. The socket itself is readable and writable by its owner only.
+
+.. raw:python
+>>> server = UArmServer([uarm1, uarm2])
+>>> server.start()
+>>> client = UArmClient(arm='A600CRJU')
+>>> client.connect()
+"""
+from __future__ import print_function
+import errno
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+from . import PY3
+from . import protocol
+from .log import printf, DEBUG, ERROR
+from .uarm import UArm, UArmConnectException, UArmUnsupportedException
+
+if PY3:
+    from socketserver import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+    from queue import Queue, Full, Empty
+else:
+    from SocketServer import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+    from Queue import Queue, Full, Empty
+
+SOCKET_MODE = 0o600
+DIRECTORY_MODE = 0o700
+
+
+def _private_directory():
+    return os.path.join(tempfile.gettempdir(), 'uarmd-{}'.format(os.getuid() if hasattr(os, 'getuid') else 0))
+
+
+def default_socket():
+    """
+    :return: daemon socket path, in ``$XDG_RUNTIME_DIR`` if set, else in a private directory of the temp directory
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'uarmd.sock')
+    return os.path.join(_private_directory(), 'uarmd.sock')
+
+
+DEFAULT_SOCKET = default_socket()
+OUTBOX_SIZE = 4096  # lines waiting for a slow client before reports are dropped
+REPORT_CODE = protocol.SET_REPORT_POSITION.split(' ')[0]
+
+
+def client_url(path=DEFAULT_SOCKET, arm=None):
+    """
+    :param path: daemon socket path
+    :param arm: serial number or port of the arm, if None, the first arm of the daemon
+    :return: String ``uarmd://`` URL, usable as ``UArm`` port name
+    """
+    return 'uarmd://{}{}'.format(path, '?arm={}'.format(arm) if arm else '')
+
+
+class _Client(StreamRequestHandler):
+    def setup(self):
+        StreamRequestHandler.setup(self)
+        self.arm = None
+        self.report_interval = None
+        self.last_report = 0
+        self.dropped = 0
+        self.outbox = Queue(OUTBOX_SIZE)
+        self.writer = threading.Thread(target=self.__write_process)
+        self.writer.setDaemon(True)
+        self.writer.start()
+
+    def send(self, line):
+        """
+        Queue a line for the client, never blocks, the arm threads call this.
+        """
+        try:
+            self.outbox.put_nowait(line)
+        except Full:
+            self.dropped += 1
+
+    def __write_process(self):
+        while True:
+            lines = [self.outbox.get()]
+            try:
+                while len(lines) < 256:
+                    lines.append(self.outbox.get_nowait())
+            except Empty:
+                pass
+            running = None not in lines
+            lines = [l for l in lines if l is not None]
+            try:
+                if lines:
+                    self.wfile.write(''.join(l + '\r\n' for l in lines).encode('utf-8'))
+            except (IOError, OSError):
+                break
+            if not running:
+                break
+
+    def handle(self):
+        self.server.owner.attach(self)
+        for raw in self.rfile:
+            line = raw.decode('utf-8', 'replace').strip()
+            if not line:
+                continue
+            try:
+                self.server.owner.dispatch(self, line)
+            except Exception as e:
+                printf("Server {} - {} - {}".format(type(e).__name__, line, e), ERROR)
+
+    def finish(self):
+        self.server.owner.detach(self)
+        try:
+            self.outbox.put(None, timeout=1)
+        except Full:
+            pass
+        self.writer.join(1)
+        StreamRequestHandler.finish(self)
+
+
+class _UnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = UnixStreamServer.get_request(self)
+        return request, ('local', 0)
+
+
+def _prepare_directory(path):
+    """
+    Create the directory of the socket, the private default directory must belong to us and be closed to others.
+    :raise IOError: if the private directory was created by another user or is open to others
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, DIRECTORY_MODE)
+    if directory != _private_directory():
+        return
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise IOError("{} must be a directory owned by the current user with mode 0700".format(directory))
+
+
+def remove_stale_socket(path):
+    """
+    Remove the socket of a server which is gone, a path still answered by a server is left alone.
+    :raise IOError: if a server is serving on the path or the path is not a socket
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except OSError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise IOError("{} exists and is not a socket".format(path))
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(1)
+        probe.connect(path)
+    except socket.error as e:
+        if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+            raise IOError("{} is in use: {}".format(path, e))
+        if e.errno == errno.ECONNREFUSED:
+            os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise IOError("another process is serving on {}".format(path))
+
+
+class UArmServer(object):
+    def __init__(self, arms, path=DEFAULT_SOCKET):
+        """
+        :param arms: UArm instance or list of UArm instances, connected
+        :param path: Unix domain socket path
+        """
+        if not isinstance(arms, (list, tuple)):
+            arms = [arms]
+        self.arms = list(arms)
+        self.path = path
+        self.clients = []
+        self.__lock = threading.Lock()
+        self.__listeners = {}
+        self.__report_intervals = {}
+        self.__server = None
+        self.__thread = None
+        self.__inode = None
+
+    def find_arm(self, name=None):
+        """
+        :param name: serial number, port name or device, if None, the first arm
+        :return: UArm, None if not found
+        """
+        for arm in self.arms:
+            if name is None or name in (arm.port_name, getattr(arm.port, 'device', None),
+                                        getattr(arm.port, 'serial_number', None)):
+                return arm
+        return None
+
+    def attach(self, client):
+        with self.__lock:
+            self.clients.append(client)
+        printf("Server client connected, {} clients", DEBUG, len(self.clients))
+
+    def detach(self, client):
+        with self.__lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        if client.arm is not None:
+            self.__update_report_interval(client.arm)
+        printf("Server client disconnected, {} clients", DEBUG, len(self.clients))
+
+    def dispatch(self, client, line):
+        """
+        Handle one line from a client.
+        """
+        if line.startswith('!'):
+            self.__control(client, line[1:].split())
+            return
+        if client.arm is None:
+            client.arm = self.find_arm()
+        msg_id = None
+        if line.startswith('#'):
+            head, _, line = line.partition(' ')
+            msg_id = head[1:]
+        if line.split(' ')[0] == REPORT_CODE:
+            self.__subscribe(client, line)
+            if msg_id is not None:
+                client.send('${} {}'.format(msg_id, protocol.OK))
+            return
+        try:
+            if client.arm is None:
+                raise UArmConnectException(3)
+            future = client.arm.submit(line)
+        except UArmUnsupportedException:
+            if msg_id is not None:
+                client.send('${} E_UNSUPPORTED'.format(msg_id))
+            return
+        except UArmConnectException:
+            if msg_id is not None:
+                client.send('${} E_DISCONNECTED'.format(msg_id))
+            return
+        if msg_id is not None:
+            future.add_done_callback(lambda f: self.__reply(client, msg_id, f))
+
+    @staticmethod
+    def __reply(client, msg_id, future):
+        response = future.result(0)
+        if response is not None:
+            client.send(' '.join(['${}'.format(msg_id)] + response))
+
+    def __control(self, client, args):
+        if not args:
+            return
+        if args[0] == 'hello':
+            arm = self.find_arm(args[1] if len(args) > 1 else None)
+            if arm is None:
+                client.send('!error no arm {}'.format(args[1] if len(args) > 1 else ''))
+                return
+            previous, client.arm = client.arm, arm
+            if previous is not None and previous is not arm:
+                self.__update_report_interval(previous)
+            client.send(protocol.READY)
+        elif args[0] == 'arms':
+            client.send(' '.join(['!arms'] + ['{}@{}'.format(getattr(arm.port, 'serial_number', None) or '-',
+                                                              arm.port_name) for arm in self.arms]))
+        else:
+            client.send('!error unknown {}'.format(args[0]))
+
+    def __subscribe(self, client, cmd):
+        try:
+            interval = float(cmd.split(' ')[1][1:])
+        except (ValueError, IndexError):
+            interval = 0
+        client.report_interval = interval if interval > 0 else None
+        if client.arm is not None:
+            self.__update_report_interval(client.arm)
+
+    def __update_report_interval(self, arm):
+        """
+        Let the arm report at the shortest interval of its clients, stop the reports if nobody listens.
+        """
+        with self.__lock:
+            intervals = [c.report_interval for c in self.clients if c.arm is arm and c.report_interval]
+            interval = min(intervals) if intervals else 0
+            if self.__report_intervals.get(arm, 0) == interval:
+                return
+            self.__report_intervals[arm] = interval
+        if arm.connection_state:
+            arm.set_report_position(interval)
+
+    def __on_report(self, arm, position):
+        now = time.time()
+        line = '{} X{:.2f} Y{:.2f} Z{:.2f}'.format(protocol.REPORT_POSITION_PREFIX, *position)
+        for client in self.clients:
+            # reports come at the shortest interval, thin them out for slower subscribers
+            if client.arm is arm and client.report_interval and \
+                    now - client.last_report >= client.report_interval * 0.9:
+                client.last_report = now
+                client.send(line)
+
+    def start(self):
+        """
+        Start serving in a daemon thread.
+        :raise IOError: if another server is serving on the path, or the path cannot be used safely
+        """
+        _prepare_directory(self.path)
+        remove_stale_socket(self.path)
+        # no moment where other users could connect, before the chmod
+        umask = os.umask(0o177)
+        try:
+            self.__server = _UnixServer(self.path, _Client)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, SOCKET_MODE)
+        self.__inode = os.stat(self.path).st_ino
+        self.__server.owner = self
+        for arm in self.arms:
+            listener = self.__listeners[arm] = lambda position, arm=arm: self.__on_report(arm, position)
+            arm.add_report_listener(listener)
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+        printf("uArm server serving {} arms on {}".format(len(self.arms), self.path))
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+            for arm, listener in self.__listeners.items():
+                arm.remove_report_listener(listener)
+            self.__listeners = {}
+            # the path may already belong to a server started after us
+            try:
+                if os.lstat(self.path).st_ino == self.__inode:
+                    os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class UArmClient(UArm):
+    def __init__(self, path=DEFAULT_SOCKET, arm=None, timeout=2, debug=False, logger=None):
+        """
+        uArm shared by a ``uarmcli serve`` daemon, with the same API as ``UArm``.
+        :param path: daemon socket path
+        :param arm: serial number or port of the arm, if None, the first arm of the daemon
+        """
+        UArm.__init__(self, port_name=client_url(path, arm), timeout=timeout, debug=debug, logger=logger)
+        # the daemon keeps the firmware buffer full, let commands pipeline up to it
+        self.rx_buffer_size = 4096
+        # round trips include the queue of other clients, the daemon applies the adaptive deadlines
+        self.adaptive_timeout = False
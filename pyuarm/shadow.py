@@ -0,0 +1,122 @@
+"""
+pyuarm.shadow
+Client side copy of the uArm state, enabled with ``UArm.enable_shadow``.
+1. Reads, replies of ``get_*`` queries are kept for ``max_age`` seconds and served from cache
+2. Commands, the last commanded pump, gripper, wrist and attach states are kept until they change,
+   so writes which would not change anything can be skipped
+"""
+import threading
+import time
+
+
+class UArmShadow(object):
+    def __init__(self, max_age=0.1):
+        """
+        :param max_age: freshness window of cached reads in seconds
+        """
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.suppressed = 0
+        self.commanded_position = None
+        self.__reads = {}
+        self.__commanded = {}
+        self.__lock = threading.Lock()
+
+    # ---------------------------------------- Reads ----------------------------------------#
+
+    def get(self, key):
+        """
+        Get a cached read if it is fresh.
+        :param key: name of the read, eg. ``position``
+        :return: cached value, None if unknown or older than ``max_age``
+        """
+        with self.__lock:
+            entry = self.__reads.get(key)
+            if entry is not None and time.time() - entry[1] <= self.max_age:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Store a read, None values are ignored.
+        """
+        if value is not None:
+            with self.__lock:
+                self.__reads[key] = (value, time.time())
+
+    def invalidate(self, *keys):
+        """
+        Drop cached reads, all of them if no key is given.
+        """
+        with self.__lock:
+            if keys:
+                for key in keys:
+                    self.__reads.pop(key, None)
+            else:
+                self.__reads.clear()
+
+    # ---------------------------------------- Commands ----------------------------------------#
+
+    def is_commanded(self, key, value):
+        """
+        Check whether a write would be a no-op, counts ``suppressed`` if so.
+        :param key: name of the actuator, eg. ``pump``, ``gripper``, ``wrist``, ``attach0``
+        :param value: the value about to be written
+        :return: True if the actuator is known to be in this state already
+        """
+        with self.__lock:
+            if key in self.__commanded and self.__commanded[key] == value:
+                self.suppressed += 1
+                return True
+            return False
+
+    def command(self, key, value):
+        """
+        Record a write, a value of None forgets the state.
+        """
+        with self.__lock:
+            if value is None:
+                self.__commanded.pop(key, None)
+            else:
+                self.__commanded[key] = value
+
+    def commanded(self, key):
+        """
+        :return: last commanded value, None if unknown
+        """
+        return self.__commanded.get(key)
+
+    def move(self, position, relative=False):
+        """
+        Record a commanded move, cached pose reads are dropped until the next read.
+        :param position: [x, y, z] target, or offset if ``relative``, None if the pose is unknown afterwards
+        :param relative: True if ``position`` is relative to the last commanded pose
+        """
+        with self.__lock:
+            if position is None:
+                self.commanded_position = None
+            elif relative:
+                if self.commanded_position is not None:
+                    self.commanded_position = [a + b for a, b in zip(self.commanded_position, position)]
+            else:
+                self.commanded_position = list(position)
+            self.__reads.pop('position', None)
+            self.__reads.pop('servo_angle', None)
+
+    def reset(self):
+        """
+        Forget everything, eg. after a stop or an unknown command stream.
+        """
+        with self.__lock:
+            self.__reads.clear()
+            self.__commanded.clear()
+            self.commanded_position = None
+
+    def stats(self):
+        """
+        :return: dict of ``hits``, ``misses`` and ``suppressed`` counters
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'suppressed': self.suppressed}
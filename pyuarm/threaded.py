@@ -1,7 +1,11 @@
 from serial.threaded import Packetizer
 import serial
 import threading
+import time
 import sys
+from .protocol import WRITE_WINDOW, WRITE_BUDGET
+
+FLUSHER_IDLE_TIMEOUT = 1  # seconds the idle flusher sleeps before it checks the reader loop is alive
 
 class UArmLineReader(Packetizer):
     """
@@ -24,13 +28,21 @@ class UArmLineReader(Packetizer):
         """Process one line - to be overridden by subclassing"""
         raise NotImplementedError('please implement functionality in handle_line')
 
-    def write_line(self, text):
+    def write_line(self, text, urgent=False):
         """
         Write text to the transport. ``text`` is a Unicode string and the encoding
         is applied before sending ans also the newline is append.
+        :param urgent: if True, skip write coalescing, see ``UArmReaderThread.write``
         """
         # + is not the best choice but bytes does not support % or .format in py3 and we want a single write call
-        self.transport.write(text.encode(self.ENCODING, self.UNICODE_HANDLING) + self.TERMINATOR)
+        self.transport.write(text.encode(self.ENCODING, self.UNICODE_HANDLING) + self.TERMINATOR, urgent)
+
+    def write_lines(self, lines, urgent=False):
+        """
+        Write several lines to the transport in a single write call.
+        """
+        self.transport.write(b''.join(text.encode(self.ENCODING, self.UNICODE_HANDLING) + self.TERMINATOR
+                                      for text in lines), urgent)
 
     def get_connect_status(self):
         return self.connected_status
@@ -41,6 +53,7 @@ class UArmSerial(UArmLineReader):
     def __init__(self, data):
         super(UArmSerial, self).__init__()
         self.data = data
+        self.notify = None  # called after every line, see ``UArmReaderThread.line_event``
 
     def connection_made(self, transport):
         super(UArmSerial, self).connection_made(transport)
@@ -49,6 +62,8 @@ class UArmSerial(UArmLineReader):
 
     def handle_line(self, data):
         self.data.append(data)
+        if self.notify is not None:
+            self.notify()
         # sys.stdout.write('line received: {}\n'.format(repr(data)))
 
     def connection_lost(self, exc):
@@ -85,10 +100,35 @@ class UArmReaderThread(threading.Thread):
         self._connection_made = threading.Event()
         self.protocol = None
         self.data = data
+        self.metrics = None
+        self.line_event = None  # threading.Event set on every received line, lets the consumer wait, not poll
+        self.write_window = WRITE_WINDOW
+        self._write_cond = threading.Condition(self._lock)
+        self._write_buf = bytearray(WRITE_BUDGET)
+        self._write_len = 0
+        self._write_due = 0
+        self._last_write = 0
+        self._flusher = None
+
+    @property
+    def write_budget(self):
+        return len(self._write_buf)
+
+    @write_budget.setter
+    def write_budget(self, size):
+        with self._lock:
+            self._flush()
+            self._write_buf = bytearray(size)
 
     def stop(self):
         """Stop the reader thread"""
         self.alive = False
+        with self._write_cond:
+            try:
+                self._flush()
+            except (serial.SerialException, OSError, ValueError):
+                self._write_len = 0
+            self._write_cond.notify()
         if hasattr(self.serial, 'cancel_read'):
             self.serial.cancel_read()
         self.join(2)
@@ -98,10 +138,13 @@ class UArmReaderThread(threading.Thread):
         if not hasattr(self.serial, 'cancel_read'):
             self.serial.timeout = 1
         self.protocol = self.protocol_factory(self.data)
+        if self.line_event is not None:
+            self.protocol.notify = self.line_event.set
         try:
             self.protocol.connection_made(self)
         except Exception as e:
             self.alive = False
+            self._wake_flusher()
             self.protocol.connection_lost(e)
             self._connection_made.set()
             return
@@ -118,6 +161,8 @@ class UArmReaderThread(threading.Thread):
                 break
             else:
                 if data:
+                    if self.metrics is not None:
+                        self.metrics.bytes_in += len(data)
                     # make a separated try-except for called used code
                     try:
                         self.protocol.data_received(data)
@@ -125,21 +170,93 @@ class UArmReaderThread(threading.Thread):
                         error = e
                         break
         self.alive = False
+        self._wake_flusher()
         self.protocol.connection_lost(error)
         self.protocol = None
 
-    def write(self, data):
-        """Thread safe writing (uses lock)"""
+    def write(self, data, urgent=False):
+        """
+        Thread safe writing (uses lock).
+        | A write right after another, within ``write_window`` seconds, is collected in a preallocated buffer
+        | of ``write_budget`` bytes and written together with the ones that follow it, once the window ends or
+        | the buffer is full. A write after an idle period goes out at once, so single commands get no delay.
+        :param urgent: if True, write at once, after anything collected before, to keep the order
+        """
+        with self._lock:
+            now = time.time()
+            if urgent or not self.write_window or (not self._write_len and
+                                                   now - self._last_write >= self.write_window):
+                self._flush()
+                self._write(data)
+            else:
+                if self._write_len + len(data) > len(self._write_buf):
+                    self._flush()
+                if len(data) > len(self._write_buf):
+                    self._write(data)
+                else:
+                    if not self._write_len:
+                        self._write_due = now + self.write_window
+                    self._write_buf[self._write_len:self._write_len + len(data)] = data
+                    self._write_len += len(data)
+                    if self._flusher is None:
+                        self._flusher = threading.Thread(target=self._flush_process)
+                        self._flusher.daemon = True
+                        self._flusher.start()
+                    self._write_cond.notify()
+            self._last_write = now
+        if self.metrics is not None:
+            self.metrics.bytes_out += len(data)
+
+    def _write(self, data):
+        self.serial.write(data)
+        if self.metrics is not None:
+            self.metrics.writes += 1
+
+    def _flush(self):
+        """Write the collected data, call with the lock held"""
+        if self._write_len:
+            data = memoryview(self._write_buf)[:self._write_len]
+            self._write_len = 0
+            self._write(data)
+
+    def _wake_flusher(self):
+        """Let the flusher thread see that the reader loop ended"""
+        with self._write_cond:
+            self._write_cond.notify()
+
+    def _flush_process(self):
+        """Write the collected data when its window ends"""
+        with self._write_cond:
+            while self.alive:
+                if not self._write_len:
+                    # bounded, the flusher also ends if the reader loop dies without waking it
+                    self._write_cond.wait(FLUSHER_IDLE_TIMEOUT)
+                    continue
+                delay = self._write_due - time.time()
+                if delay > 0:
+                    self._write_cond.wait(delay)
+                    continue
+                try:
+                    self._flush()
+                except (serial.SerialException, OSError, ValueError):
+                    # the port is gone, the reader loop ends the connection
+                    self._write_len = 0
+            self._flusher = None
+
+    def flush(self):
+        """Write the collected data now"""
         with self._lock:
-            self.serial.write(data)
+            self._flush()
 
     def close(self):
         """Close the serial port and exit reader thread (uses lock)"""
         # use the lock to let other threads finish writing
         with self._lock:
-            # first stop reading, so that closing can be done on idle port
-            self.stop()
-            self.serial.close()
+            self._flush()
+        # first stop reading, so that closing can be done on idle port, without the lock,
+        # the reader loop takes it to wake the flusher on its way out
+        self.stop()
+        self.serial.close()
 
     def connect(self):
         """
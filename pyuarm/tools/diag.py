@@ -0,0 +1,94 @@
+"""
+pyuarm.tools.diag
+Check the serial link of a uArm: round trip times, throughput, FTDI latency timer, low latency flag
+and malformed lines, with recommendations. See ``pyuarm.latency``.
+"""
+
+
+from __future__ import print_function
+import json
+
+from ..uarm import UArm
+from ..log import printf, ERROR
+from .. import latency
+from .list_uarms import get_uarm_port_cli
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.2f}'.format(seconds * 1000)
+
+
+def print_report(report):
+    rtt = report['rtt']['rtt']
+    throughput = report['throughput']
+    print("Device:            {}".format(report['device']))
+    print("Serial number:     {}".format(report['serial_number']))
+    print("Firmware:          {}".format(report['firmware_version']))
+    print("latency_timer:     {}".format('unknown' if report['latency_timer'] is None
+                                         else '{} ms'.format(report['latency_timer'])))
+    print("ASYNC_LOW_LATENCY: {}".format('unknown' if report['low_latency'] is None
+                                         else 'on' if report['low_latency'] else 'off'))
+    print("RTT (ms):          min {} p50 {} p90 {} p99 {} max {}, {} of {} lost".format(
+        _ms(rtt['min']), _ms(rtt['p50']), _ms(rtt['p90']), _ms(rtt['p99']), _ms(rtt['max']),
+        report['rtt']['lost'], report['rtt']['count']))
+    print("Throughput:        {:.0f} B/s, {:.0%} of {} baud".format(
+        throughput['bytes_per_sec'], throughput['utilization'], latency.BAUDRATE))
+    print("Malformed lines:   {}".format(report['malformed_lines']))
+    if report['recommendations']:
+        print("Recommendations:")
+        for advice in report['recommendations']:
+            print("  - {}".format(advice))
+    else:
+        print("No problems found.")
+
+
+def main(args):
+    """
+    ::
+
+        $ uarmcli diag -n 100
+        Device:            /dev/ttyUSB0
+        Serial number:     A600CRJU
+        Firmware:          2.2.1
+        latency_timer:     16 ms
+        ASYNC_LOW_LATENCY: off
+        RTT (ms):          min 15.02 p50 16.13 p90 17.00 p99 31.50 max 32.04, 0 of 100 lost
+        Throughput:        2310 B/s, 20% of 115200 baud
+        Malformed lines:   0
+        Recommendations:
+          - FTDI latency_timer is 16 ms, lower it to 1 ms: echo 1 | sudo tee /sys/bus/usb-serial/devices/ttyUSB0/latency_timer
+          ...
+
+    """
+    if args.port:
+        port_name = args.port
+    else:
+        port_name = get_uarm_port_cli()
+
+    uarm = UArm(port_name=port_name, debug=args.debug)
+    uarm.connect()
+    if not uarm.connection_state:
+        printf("uArm is not connected", ERROR)
+        return
+    try:
+        report = latency.diagnose(uarm, count=args.count)
+    finally:
+        uarm.disconnect()
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+def add_arguments(parser):
+    parser.add_argument("-p", "--port", help="specify port number")
+    parser.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    parser.add_argument("-n", "--count", help="queries per measurement", type=int, default=100)
+    parser.add_argument("--json", help="print the report as JSON", action="store_true")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    main(parser.parse_args())
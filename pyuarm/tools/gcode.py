@@ -0,0 +1,54 @@
+"""
+pyuarm.tools.gcode
+Stream a G-code file to uArm with character-counting flow control.
+The file is read lazily, so it can be larger than the available memory.
+"""
+
+
+from __future__ import print_function
+
+from ..uarm import UArm
+from ..log import printf, ERROR
+from .. import protocol
+from .list_uarms import get_uarm_port_cli
+
+
+def main(args):
+    """
+    ::
+
+        $ uarmcli gcode path.gcode
+        pyuarm - INFO - pyuarm version: 2.4.0.12
+        pyuarm - INFO - Connecting from port - /dev/cu.usbserial-A600CRJU...
+        pyuarm - INFO - Streamed 1520 lines in 41.32s, 36.79 lines/sec, stall time 38.95s
+        pyuarm - INFO - Errors: 0, Timeouts: 0
+
+    """
+    if args.port:
+        port_name = args.port
+    else:
+        port_name = get_uarm_port_cli()
+
+    uarm = UArm(port_name=port_name, debug=args.debug)
+    uarm.connect()
+    if not uarm.connection_state:
+        printf("uArm is not connected", ERROR)
+        return
+    try:
+        stats = uarm.stream_gcode(args.file, rx_buffer_size=args.rx_buffer)
+        printf("Streamed {} lines in {:.2f}s, {:.2f} lines/sec, stall time {:.2f}s".format(
+            stats['lines'], stats['elapsed'], stats['lines_per_sec'], stats['stall_time']))
+        printf("Errors: {}, Timeouts: {}".format(stats['errors'], stats['timeouts']))
+    finally:
+        uarm.disconnect()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="G-code file path")
+    parser.add_argument("-p", "--port", help="specify port number")
+    parser.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    parser.add_argument("--rx-buffer", help="firmware receive buffer size in bytes", type=int,
+                        default=protocol.RX_BUFFER_SIZE)
+    main(parser.parse_args())
@@ -1,14 +1,101 @@
+from __future__ import print_function
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
 from serial.tools import list_ports
 
+try:
+    from serial.tools.list_ports_linux import SysFS
+except ImportError:
+    SysFS = None
+
 UARM_HWID_KEYWORD = "USB VID:PID=0403:6001"
+UARM_VID = '0403'
+UARM_PID = '6001'
+SYSFS_TTY = '/sys/class/tty'
+DEV_DIR = '/dev'
+
+UArmPort = namedtuple('UArmPort', ['device', 'serial_number', 'location'])
+UArmPort.__doc__ = """
+uArm serial port found by ``discover_uarms``, ``location`` is the USB bus path, eg. ``1-1.2:1.0``.
+"""
+
+_cache = {'key': None, 'ports': None}
+_cache_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _sysfs_ports():
+    """
+    Read the uArm ports straight from ``/sys/class/tty``, only ``ttyUSB`` devices are looked at.
+    """
+    ports = []
+    for name in sorted(os.listdir(SYSFS_TTY)):
+        if not name.startswith('ttyUSB'):
+            continue
+        interface = os.path.dirname(os.path.realpath(os.path.join(SYSFS_TTY, name, 'device')))
+        usb_device = os.path.dirname(interface)
+        if _read(os.path.join(usb_device, 'idVendor')) != UARM_VID or \
+                _read(os.path.join(usb_device, 'idProduct')) != UARM_PID:
+            continue
+        ports.append(UArmPort(os.path.join(DEV_DIR, name), _read(os.path.join(usb_device, 'serial')),
+                              os.path.basename(interface)))
+    return ports
+
+
+def _comports():
+    return [UArmPort(p.device, p.serial_number, p.location) for p in list_ports.comports()
+            if p.hwid[0:len(UARM_HWID_KEYWORD)] == UARM_HWID_KEYWORD]
+
+
+def _cache_key():
+    """
+    Device nodes are added to and removed from ``/dev``, which changes its mtime.
+    :return: key of the current device set, None if it can not be watched
+    """
+    try:
+        st = os.stat(DEV_DIR)
+    except OSError:
+        return None
+    return getattr(st, 'st_mtime_ns', st.st_mtime), st.st_nlink
+
+
+def invalidate_cache():
+    with _cache_lock:
+        _cache['key'] = None
+        _cache['ports'] = None
+
+
+def discover_uarms(refresh=False):
+    """
+    Find the uArm serial ports (USB VID:PID 0403:6001).
+    | On Linux the ports are read from sysfs, elsewhere from ``serial.tools.list_ports``.
+    | The result is cached until a device is added or removed, or ``refresh`` is set.
+    :param refresh: if True, scan again
+    :return: list of UArmPort
+    """
+    key = _cache_key()
+    with _cache_lock:
+        if not refresh and key is not None and _cache['key'] == key:
+            return list(_cache['ports'])
+    ports = _sysfs_ports() if sys.platform.startswith('linux') and os.path.isdir(SYSFS_TTY) else _comports()
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['ports'] = ports
+    return list(ports)
 
 
 def uarm_ports():
-    uarm_ports = []
-    for i in list_ports.comports():
-        if i.hwid[0:len(UARM_HWID_KEYWORD)] == UARM_HWID_KEYWORD:
-            uarm_ports.append(i[0])
-    return uarm_ports
+    return [p.device for p in discover_uarms()]
 
 
 def check_port_plug_in(serial_id):
@@ -20,7 +107,6 @@ def check_port_plug_in(serial_id):
 
 
 def get_uarm_port_cli():
-    uarm_list = uarm_ports()
     ports = uarm_ports()
     if len(ports) > 1:
         i = 1
@@ -31,19 +117,43 @@ def get_uarm_port_cli():
         uarm_port = ports[int(port_index) - 1]
         return uarm_port
     elif len(ports) == 1:
-        return uarm_list[0]
+        return ports[0]
     elif len(ports) == 0:
         return None
 
 
+def _sysfs_port_info(port_name):
+    """
+    :return: ``serial.tools.list_ports`` entry of one USB serial device read from sysfs, None if not a USB device
+    """
+    if SysFS is None or not os.path.isdir(SYSFS_TTY):
+        return None
+    name = os.path.basename(os.path.realpath(port_name))
+    if not os.path.exists(os.path.join(SYSFS_TTY, name, 'device')):
+        return None
+    try:
+        info = SysFS(port_name)
+    except (IOError, OSError, TypeError, ValueError):
+        return None
+    return info if info.subsystem in ('usb', 'usb-serial') else None
+
+
 def get_port_property(port_name):
+    """
+    :param port_name: device name
+    :return: ``serial.tools.list_ports`` entry of the device, None if not found. On Linux, USB devices are read
+    from sysfs directly, without a scan of all ports
+    """
+    info = _sysfs_port_info(port_name)
+    if info is not None:
+        return info
     for p in list_ports.comports():
         if p.device == port_name:
             return p
     return None
 
 
-def main():
+def main(args=None):
     """
     ::
 
@@ -51,12 +161,22 @@ def main():
         /dev/cu.usbserial-A600CVS9
         1 ports found
 
+        $ python -m pyuarm.tools.list_uarms --json
+        [{"device": "/dev/ttyUSB0", "serial_number": "A600CVS9", "location": "1-1.2:1.0"}]
+
     """
-    ports = uarm_ports()
+    ports = discover_uarms()
+    if args is not None and getattr(args, 'json', False):
+        print(json.dumps([p._asdict() for p in ports]))
+        return
     for p in ports:
-        print(p)
+        print(p.device)
     print("{0} ports found".format(len(ports)))
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", help="print the ports as JSON records", action="store_true")
+    main(parser.parse_args())
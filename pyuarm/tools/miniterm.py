@@ -40,9 +40,17 @@ class UArmCmd(Cmd):
 
     arm = None
 
-    def __init__(self, port=None, debug=False, *args, **kwargs):
+    def __init__(self, port=None, debug=False, trace=None, *args, **kwargs):
         Cmd.__init__(self, *args, **kwargs)
+        self.trace = trace
         self.__connect(port=port, debug=debug)
+        if self.trace is not None and self.arm is not None:
+            self.arm.enable_tracer()
+
+    def __dump_trace(self):
+        if self.trace is not None and self.arm is not None and self.arm.tracer is not None:
+            count = self.arm.tracer.dump(self.trace)
+            print("{} trace spans written to {}".format(count, self.trace))
 
     def __is_connected(self):
         if self.arm is None:
@@ -101,6 +109,7 @@ class UArmCmd(Cmd):
         disconnect, Release uarm port.
         """
         if self.arm is not None:
+            self.__dump_trace()
             if self.arm.connection_state:
                 self.arm.disconnect()
 
@@ -305,6 +314,37 @@ class UArmCmd(Cmd):
                            ]
         return completions
 
+    def do_stats(self, arg):
+        """
+        stats
+        Show the link metrics: bytes, queue, timeouts and round trip time per command.
+        eg.
+        >>> stats
+        bytes in: 2310, bytes out: 1187, queue depth: 0 (max 3), in flight: 0
+        timeouts: 0, unmatched replies: 0, coalesced: 0
+        command   sent  timeouts  errors  p50 ms  p99 ms  max ms
+        P220        42         0       0    7.68   17.41   17.83
+        """
+        if self.__is_connected():
+            m = self.arm.metrics()
+            print("bytes in: {}, bytes out: {}, queue depth: {} (max {}), in flight: {}".format(
+                m['bytes_in'], m['bytes_out'], m['queue_depth'], m['queue_depth_max'], m['in_flight']))
+            print("timeouts: {}, unmatched replies: {}, coalesced: {}".format(
+                m['timeouts'], m['unmatched_replies'], m['coalesced']))
+            if m['report_interval']['count'] > 0:
+                print("report interval p50: {:.2f} ms, max: {:.2f} ms".format(
+                    m['report_interval']['p50'] * 1000, m['report_interval']['max'] * 1000))
+            print("{:<8}{:>6}{:>10}{:>8}{:>8}{:>8}{:>8}".format(
+                'command', 'sent', 'timeouts', 'errors', 'p50 ms', 'p99 ms', 'max ms'))
+            for code in sorted(m['commands']):
+                c = m['commands'][code]
+                rtt = c['rtt']
+                if rtt['count'] > 0:
+                    times = "{:>8.2f}{:>8.2f}{:>8.2f}".format(rtt['p50'] * 1000, rtt['p99'] * 1000, rtt['max'] * 1000)
+                else:
+                    times = "{:>8}{:>8}{:>8}".format('-', '-', '-')
+                print("{:<8}{:>6}{:>10}{:>8}".format(code, c['sent'], c['timeouts'], c['errors']) + times)
+
     def do_serial(self, arg):
         """
         Raw Serial Mode
@@ -331,6 +371,7 @@ class UArmCmd(Cmd):
         Quit, if uarm is connected, will disconnect before quit
         """
         if self.arm is not None:
+            self.__dump_trace()
             if self.arm.connection_state:
                 self.arm.disconnect()
         print("Quiting")
@@ -383,7 +424,7 @@ def main(args):
 
     """
     try:
-        uarm_cmd = UArmCmd(port=args.port, debug=args.debug)
+        uarm_cmd = UArmCmd(port=args.port, debug=args.debug, trace=getattr(args, 'trace', None))
         uarm_cmd.cmdloop()
     except KeyboardInterrupt:
         print("KeyboardInterrupt")
@@ -395,5 +436,6 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("-p", "--port", help="specify port number")
     parser.add_argument("-d", "--debug", help="Open Debug Message")
+    parser.add_argument("--trace", help="write a Chrome trace JSON of all commands to this file on quit")
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,71 @@
+"""
+pyuarm.tools.reachability
+Sweep the uArm workspace with simulation queries and save the reachability map.
+The map is stored per hardware version in the uArm assistant folder, see ``pyuarm.reachability``.
+"""
+
+
+from __future__ import print_function
+import sys
+
+from ..uarm import UArm
+from ..log import printf, ERROR
+from ..util import progressbar
+from .. import reachability
+from .list_uarms import get_uarm_port_cli
+
+
+def main(args):
+    """
+    ::
+
+        $ uarmcli reach --step 10
+        pyuarm - INFO - pyuarm version: 2.4.0.12
+        pyuarm - INFO - Connecting from port - /dev/cu.usbserial-A600CRJU...
+        Sweeping: [==================================================] 100.00%
+        pyuarm - INFO - 61245 of 104796 points reachable
+        pyuarm - INFO - Saved to /Users/alex/uarm/assistant/reachability-3.2.1.npz
+
+    """
+    if args.port:
+        port_name = args.port
+    else:
+        port_name = get_uarm_port_cli()
+
+    uarm = UArm(port_name=port_name, debug=args.debug)
+    uarm.connect()
+    if not uarm.connection_state:
+        printf("uArm is not connected", ERROR)
+        return
+    try:
+        bounds = (tuple(args.x), tuple(args.y), tuple(args.z))
+        reach_map = reachability.sweep(uarm, bounds=bounds, step=args.step,
+                                       progress=lambda cur, total: progressbar("Sweeping: ", cur, total))
+        print("")
+        printf("{} of {} points reachable".format(int(reach_map.volume.sum()), reach_map.volume.size))
+        if reach_map.missing > 0:
+            printf("Map not saved, {} points got no response".format(reach_map.missing), ERROR)
+            sys.exit(1)
+        printf("Saved to {}".format(reach_map.save(args.output)))
+    finally:
+        uarm.disconnect()
+
+
+def add_arguments(parser):
+    parser.add_argument("-p", "--port", help="specify port number")
+    parser.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    parser.add_argument("--x", help="x range, unit mm", nargs=2, type=float,
+                        default=reachability.DEFAULT_BOUNDS[0], metavar=("MIN", "MAX"))
+    parser.add_argument("--y", help="y range, unit mm", nargs=2, type=float,
+                        default=reachability.DEFAULT_BOUNDS[1], metavar=("MIN", "MAX"))
+    parser.add_argument("--z", help="z range, unit mm", nargs=2, type=float,
+                        default=reachability.DEFAULT_BOUNDS[2], metavar=("MIN", "MAX"))
+    parser.add_argument("--step", help="grid spacing, unit mm", type=float, default=reachability.DEFAULT_STEP)
+    parser.add_argument("-o", "--output", help="map file path, default in the uArm assistant folder")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -1,6 +1,7 @@
 import argparse
 
-from . import miniterm, list_uarms, calibrate, firmware
+from . import miniterm, list_uarms, calibrate, firmware, gcode, reachability, diag, serve
+from .. import protocol
 from ..version import __version__
 
 
@@ -13,6 +14,7 @@ def main():
     pm = subparsers.add_parser("miniterm")
     pm.add_argument("-p", "--port", help="specify port number")
     pm.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    pm.add_argument("--trace", help="write a Chrome trace JSON of all commands to this file on quit")
 
     pc = subparsers.add_parser("calibrate")
     pc.add_argument("-p", "--port", help="specify port number")
@@ -20,6 +22,7 @@ def main():
     pc.add_argument("-c", "--check", help="Check the calibrate offset values", action="store_true")
 
     pl = subparsers.add_parser("list")
+    pl.add_argument("--json", help="print the ports as JSON records", action="store_true")
 
     pf = subparsers.add_parser("firmware")
     pf.add_argument("-p", "--port", help="specify port number")
@@ -27,6 +30,22 @@ def main():
     pf.add_argument("--debug", help="Turn on Debug Mode", action="store_true")
     pf.add_argument("-d", "--download", help="download firmware online", action="store_true")
 
+    pg = subparsers.add_parser("gcode")
+    pg.add_argument("file", help="G-code file path")
+    pg.add_argument("-p", "--port", help="specify port number")
+    pg.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    pg.add_argument("--rx-buffer", help="firmware receive buffer size in bytes", type=int,
+                    default=protocol.RX_BUFFER_SIZE)
+
+    pr = subparsers.add_parser("reach")
+    reachability.add_arguments(pr)
+
+    pd = subparsers.add_parser("diag")
+    diag.add_arguments(pd)
+
+    ps = subparsers.add_parser("serve")
+    serve.add_arguments(ps)
+
     args = parser.parse_args()
 
     if args.cmd:
@@ -35,9 +54,17 @@ def main():
         elif args.cmd == 'calibrate':
             calibrate.main(args)
         elif args.cmd == 'list':
-            list_uarms.main()
+            list_uarms.main(args)
         elif args.cmd == 'firmware':
             firmware.main(args)
+        elif args.cmd == 'gcode':
+            gcode.main(args)
+        elif args.cmd == 'reach':
+            reachability.main(args)
+        elif args.cmd == 'diag':
+            diag.main(args)
+        elif args.cmd == 'serve':
+            serve.main(args)
 
 if __name__ == '__main__':
     main()
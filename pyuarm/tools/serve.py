@@ -0,0 +1,73 @@
+"""
+pyuarm.tools.serve
+Share uArms between processes over a Unix domain socket, see ``pyuarm.server``.
+"""
+
+
+from __future__ import print_function
+import time
+
+from ..uarm import UArm
+from ..server import UArmServer, DEFAULT_SOCKET
+from ..log import printf, ERROR
+from .list_uarms import uarm_ports
+
+
+def main(args):
+    """
+    ::
+
+        $ uarmcli serve
+        uArm server serving 1 arms on /run/user/1000/uarmd.sock
+
+    Clients connect with ``UArmClient()`` or ``UArm(port_name='uarmd:///run/user/1000/uarmd.sock')``,
+    the default socket is ``pyuarm.server.DEFAULT_SOCKET``.
+    """
+    ports = args.port or uarm_ports()
+    if not ports:
+        printf("No uArm is connected", ERROR)
+        return
+    arms = []
+    for port_name in ports:
+        uarm = UArm(port_name=port_name, debug=args.debug, low_latency=args.low_latency)
+        uarm.connect()
+        if not uarm.connection_state:
+            printf("uArm on {} is not connected".format(port_name), ERROR)
+            continue
+        uarm.enable_hotplug()
+        arms.append(uarm)
+    if not arms:
+        return
+    server = UArmServer(arms, args.socket)
+    try:
+        server.start()
+    except (IOError, OSError) as e:
+        printf("uArm server not started, {}".format(e), ERROR)
+        for uarm in arms:
+            uarm.disconnect()
+        return
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        for uarm in arms:
+            uarm.disconnect()
+
+
+def add_arguments(parser):
+    parser.add_argument("-p", "--port", help="specify port number, repeat to serve several arms, "
+                                             "default all connected uArms", action="append")
+    parser.add_argument("-d", "--debug", help="Turn on Debug Mode", action="store_true")
+    parser.add_argument("--socket", help="Unix domain socket path, default {}".format(DEFAULT_SOCKET),
+                        default=DEFAULT_SOCKET)
+    parser.add_argument("--low-latency", help="tune the serial ports for latency", action="store_true")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    main(parser.parse_args())
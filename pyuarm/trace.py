@@ -0,0 +1,141 @@
+"""
+pyuarm.trace
+Opt-in command lifecycle tracer, exported as Chrome trace / Perfetto JSON.
+For every ``#id`` three spans are recorded:
+1. queue, from ``UArm.submit`` to the serial write
+2. wire, from the serial write to the ``$id`` reply (or the deadline)
+3. motion, from the reply to the end of the move, for moves with ``wait=True``
+When no tracer is enabled, ``UArm`` skips all tracing code.
+
+.. raw:python
+>>> with trace(uarm, 'uarm_trace.json'):
+...     uarm.set_position(0, 150, 150, wait=True)
+
+Open the file in chrome://tracing or https://ui.perfetto.dev
+"""
+from __future__ import division
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_CAPACITY = 100000
+PHASE_TIDS = {'queue': 1, 'wire': 2, 'motion': 3}
+
+
+class Tracer(object):
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        :param capacity: maximum number of spans kept, older spans are dropped first
+        """
+        self.capacity = capacity
+        self.spans = deque(maxlen=capacity)
+        self.__open = OrderedDict()
+        self.__trace_ids = itertools.count(1)  # unlike ``#id``, never wraps around
+        self.__last_trace_id = {}  # ``#id`` to the trace id of its latest command
+        self.__lock = threading.Lock()
+
+    def __entry(self, msg_id, msg, new=False):
+        """
+        :param new: if True, start a new command even if ``msg_id`` is still open, the id wrapped around
+        """
+        entry = self.__open.get(msg_id)
+        if entry is None or new:
+            self.__open.pop(msg_id, None)
+            trace_id = self.__last_trace_id[msg_id] = next(self.__trace_ids)
+            entry = self.__open[msg_id] = {'msg': msg, 'trace_id': trace_id}
+            if len(self.__open) > self.capacity:
+                self.__open.popitem(last=False)
+        return entry
+
+    def enqueue(self, msg_id, msg, t=None):
+        with self.__lock:
+            self.__entry(msg_id, msg, new=True)['enqueue'] = t if t is not None else time.time()
+
+    def write(self, msg_id, msg, t=None):
+        with self.__lock:
+            self.__entry(msg_id, msg)['write'] = t if t is not None else time.time()
+
+    def ack(self, msg_id, status, t=None):
+        """
+        Close the spans of a command.
+        :param status: first word of the reply, eg. ``OK``, or ``TIMEOUT``
+        """
+        t = t if t is not None else time.time()
+        with self.__lock:
+            entry = self.__open.pop(msg_id, None)
+            if entry is None:
+                return
+            code = entry['msg'].split(' ', 1)[0]
+            args = {'id': msg_id, 'cmd': entry['msg'], 'status': status}
+            if 'enqueue' in entry:
+                self.spans.append(('queue', code, entry['trace_id'], entry['enqueue'], entry.get('write', t), args))
+            if 'write' in entry:
+                self.spans.append(('wire', code, entry['trace_id'], entry['write'], t, args))
+
+    def motion(self, msg_id, msg, start, end=None):
+        with self.__lock:
+            trace_id = self.__last_trace_id.get(msg_id)
+            if trace_id is None:
+                trace_id = next(self.__trace_ids)
+            args = {'id': msg_id, 'cmd': msg}
+            self.spans.append(('motion', msg.split(' ', 1)[0], trace_id, start,
+                               end if end is not None else time.time(), args))
+
+    def to_chrome(self):
+        """
+        :return: dict in Chrome trace event format, the spans of a command are async events sharing one id,
+        its ``#id`` is in ``args``, since ``#id`` wraps around at 65535
+        """
+        with self.__lock:
+            spans = list(self.spans)
+        events = []
+        pid = os.getpid()
+        for phase, code, trace_id, start, end, args in spans:
+            name = '{} {}'.format(code, phase)
+            common = {'name': name, 'cat': phase, 'id': trace_id, 'pid': pid, 'tid': PHASE_TIDS[phase]}
+            begin = dict(common, ph='b', ts=start * 1e6, args=args)
+            finish = dict(common, ph='e', ts=end * 1e6)
+            events.append(begin)
+            events.append(finish)
+        events.sort(key=lambda e: e['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        """
+        Write the trace as JSON.
+        :param path: file path
+        :return: number of spans written
+        """
+        data = self.to_chrome()
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False))
+        return len(data['traceEvents']) // 2
+
+    def clear(self):
+        with self.__lock:
+            self.spans.clear()
+            self.__open.clear()
+            self.__last_trace_id.clear()
+
+
+@contextmanager
+def trace(arm, path=None, capacity=DEFAULT_CAPACITY):
+    """
+    Trace all commands of ``arm`` inside the block, and dump the trace at the end.
+    :param arm: UArm instance
+    :param path: JSON file path, if None, nothing is written
+    :param capacity: maximum number of spans kept
+    :return: Tracer
+    """
+    tracer = arm.enable_tracer(capacity)
+    try:
+        yield tracer
+    finally:
+        arm.disable_tracer()
+        if path is not None:
+            tracer.dump(path)
@@ -0,0 +1,58 @@
+"""
+pyuarm.transport
+Open the link to a uArm. ``UArm(port_name=...)`` takes a device name or any URL of ``serial.serial_for_url``:
+
+- ``/dev/ttyUSB0``, ``COM3``, a serial device
+- ``socket://host:port``, raw TCP, eg. ser2net
+- ``rfc2217://host:port``, RFC 2217 serial server
+- ``uarmd://<socket path>``, an arm shared by ``uarmcli serve``, see ``pyuarm.server``
+- ``emu://``, the in process firmware emulator, see ``pyuarm.emulator``
+
+The send thread already writes each window of commands in one call, so network transports only need
+Nagle's algorithm off, otherwise every write waits for the ACK of the previous one.
+"""
+import socket
+import serial
+from . import urlhandler  # noqa: F401, registers the pyuarm URL schemes
+
+BAUDRATE = 115200
+TCP_SCHEME = 'socket://'
+
+
+def is_url(port_name):
+    """
+    :return: True if ``port_name`` is a URL, not a device name
+    """
+    return '://' in port_name
+
+
+def create(port_name, timeout=0.1):
+    """
+    :param port_name: device name or URL
+    :param timeout: read timeout in seconds
+    :return: serial port instance, not opened yet
+    """
+    return serial.serial_for_url(port_name, baudrate=BAUDRATE, timeout=timeout, do_not_open=True)
+
+
+def tune(port):
+    """
+    Set ``TCP_NODELAY`` on ``socket://`` transports, call after ``open``.
+    | ``rfc2217://`` ports do not expose their socket and are left as they are.
+    :param port: serial port instance
+    :return: True if set
+    """
+    if not str(port.port).startswith(TCP_SCHEME):
+        return False
+    try:
+        # a duplicate of the port descriptor, the option applies to the connection itself
+        sock = socket.fromfd(port.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    except (AttributeError, ValueError, OSError, socket.error):
+        return False
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, socket.error):
+        return False
+    finally:
+        sock.close()
+    return True
@@ -1,16 +1,33 @@
 from __future__ import print_function
 import serial
 from . import protocol
-from .log import DEBUG, INFO, ERROR, printf, init_logger, set_default_logger, close_logger
+from .log import DEBUG, INFO, WARNING, ERROR, printf, init_logger, set_default_logger, close_logger
 from . import PY3
 import time
 import threading
-from .tools.list_uarms import uarm_ports, get_port_property
+import itertools
+from collections import deque, namedtuple
+from .gcode import read_gcode
+from . import planning
+from .future import UArmFuture
+from .shadow import UArmShadow
+from .metrics import LinkMetrics, RTOEstimator
+from .flow import RxWindow
+from .trace import Tracer, DEFAULT_CAPACITY
+from . import capability
+from .hotplug import HotplugMonitor
+from . import posering
+from . import latency
+from .tools.list_uarms import uarm_ports, get_port_property, UArmPort
+from . import transport
 
 if PY3:
-    from queue import Queue, LifoQueue, Empty
+    from queue import Queue, LifoQueue, PriorityQueue, Empty
 else:
-    from Queue import Queue, LifoQueue, Empty
+    from Queue import Queue, LifoQueue, PriorityQueue, Empty
+
+LOW_LATENCY_PROBES = 10  # round trips measured before and after enabling low latency mode
+EXPIRE_INTERVAL = 0.01  # seconds between deadline checks of the receive thread
 
 # ################################### Exception ################################
 
@@ -19,6 +36,9 @@ def catch_exception(func):
     def decorator(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except UArmUnsupportedException:
+            # the caller asked for something the firmware cannot do, a None would look like a lost reply
+            raise
         except Exception as e:
             printf("{} - {} - {}".format(type(e).__name__, func.__name__, e), ERROR)
     return decorator
@@ -53,13 +73,86 @@ class UArmConnectException(Exception):
         return repr(self.error + "-" + self.message)
 
 
+class UArmUnsupportedException(Exception):
+    def __init__(self, code, firmware_version=None):
+        """
+        uArm Unsupported Command Exception, see ``pyuarm.capability``
+        :param code: command code, eg. ``M222``
+        :param firmware_version: String firmware version of the connected uArm
+        """
+        self.code = code
+        self.firmware_version = firmware_version
+        self.error = "Command {} is not supported by firmware {}".format(code, firmware_version)
+
+    def __str__(self):
+        return repr(self.error)
+
+
+UArmState = namedtuple('UArmState', ['timestamp', 'position', 'servo_angle', 'is_moving', 'tip_sensor', 'pump'])
+UArmState.__doc__ = """
+Immutable uArm status snapshot returned by ``UArm.get_state``.
+``timestamp`` is the ``time.time()`` when the queries were issued, fields which are not requested are None.
+"""
+
+
+class UArmBatch(object):
+    def __init__(self, arm, wait=True, timeout=None):
+        """
+        Buffer commands and flush them to uArm together, use ``UArm.batch``.
+        :param arm: UArm instance
+        :param wait: if True, flush will block until all replies are collected or timeout
+        :param timeout: deadline in seconds for each command, if None, decided by ``UArm.command_timeout``
+        """
+        self.arm = arm
+        self.wait = wait
+        self.timeout = timeout
+        self.commands = []
+        self.futures = []
+        self.responses = None
+        self.success = None
+
+    def send(self, msg):
+        """
+        Buffer one command.
+        :param msg: String Serial Command
+        :return: Integer index of the command in this batch
+        """
+        self.commands.append(msg)
+        return len(self.commands) - 1
+
+    def flush(self):
+        """
+        Write all buffered commands in one go, in as few writes as the firmware receive buffer allows.
+        | If ``wait`` is True, collect the replies and set ``responses`` and ``success``.
+        :return: True if all commands succeed, False if any failed or got no response, None if not waiting
+        """
+        if self.commands:
+            self.futures.extend(self.arm.submit_many(self.commands, timeout=self.timeout))
+            self.commands = []
+        if self.wait:
+            self.responses = [f.result() for f in self.futures]
+            self.success = all(r is not None and len(r) > 0 and r[0].startswith(protocol.OK)
+                               for r in self.responses)
+        return self.success
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
 class UArm(object):
-    def __init__(self, port_name=None, timeout=2, debug=False, logger=None):
+    def __init__(self, port_name=None, timeout=2, debug=False, logger=None, low_latency=False):
         """
         :param port_name: UArm Serial Port name, if no port provide, will try first port we detect
         :param logger: if no logger provide, will create a logger by default
         :param debug: if Debug is True, create a Debug Logger by default
-        :param timeout: default timeout is 5 sec.
+        :param timeout: default timeout is 2 sec, used for commands without an entry in ``timeouts``,
+                        queries use it until their round trip time is learned, see ``command_timeout``.
+        :param low_latency: if True, tune the serial port for latency on connect, see ``connect``
         :raise UArmConnectException
 
         | if no port provide, we will detect all connected uArm serial devices.
@@ -70,6 +163,24 @@ class UArm(object):
         """
         self.__init_property()
         self.timeout = timeout
+        self.timeouts = {}
+        self.adaptive_timeout = True
+        self.max_retries = 2
+        self.rto = RTOEstimator()
+        self.rx_window = RxWindow(protocol.RX_BUFFER_SIZE)
+        self.write_window = protocol.WRITE_WINDOW
+        self.write_budget = protocol.WRITE_BUDGET
+        self.shadow = None
+        self.tracer = None
+        self.hotplug = None
+        self.position_ring = None
+        self.low_latency = low_latency
+        self.low_latency_report = None
+        self.coalesced_count = 0
+        self.__metrics = LinkMetrics()
+        self.__queries = {}
+        self.__queries_lock = threading.Lock()
+        self.__report_listeners = []
         if port_name is not None:
             self.port_name = port_name
         if logger is None:
@@ -77,6 +188,18 @@ class UArm(object):
         else:
             init_logger(logger)
 
+    @property
+    def rx_buffer_size(self):
+        """
+        Firmware receive buffer size in bytes, the size of ``rx_window``.
+        | Every write path keeps the bytes of unanswered commands below it, see ``pyuarm.flow``.
+        """
+        return self.rx_window.size
+
+    @rx_buffer_size.setter
+    def rx_buffer_size(self, size):
+        self.rx_window.size = size
+
     def __init_property(self):
         self.timeout = None
         self.port_name = None
@@ -85,13 +208,24 @@ class UArm(object):
         self.__menu_button_queue = None
         self.__play_button_queue = None
         self.__send_queue = None
+        self.__send_seq = None
+        self.__flush_count = 0
+        self.__generation = 0
+        self.__attached = {}
+        self.__report_interval = None
+        self.__low_latency_saved = None
+        self.__line_event = None
         self.__firmware_version = None
         self.__hardware_version = None
+        self.capabilities = None
         self.__isReady = None
         self.__receive_thread = None
         self.__send_thread = None
         self.serial_id = None
         self.msg_buff = None
+        self.__pending = None
+        self.__sent = None
+        self.__expired = None
         self.__serial = None
         self.__reader_thread = None
         self.__transport = None
@@ -103,6 +237,12 @@ class UArm(object):
         if PY3:
             from .threaded import UArmSerial, UArmReaderThread
             self.__reader_thread = UArmReaderThread(self.__serial, UArmSerial, self.__data_buf)
+            self.__reader_thread.metrics = self.__metrics
+            # in low latency mode, the receive thread wakes up on every line instead of polling every 1 ms
+            self.__line_event = threading.Event() if self.low_latency else None
+            self.__reader_thread.line_event = self.__line_event
+            self.__reader_thread.write_window = self.write_window
+            self.__reader_thread.write_budget = self.write_budget
             self.__reader_thread.start()
             self.__reader_thread.connect()
             self.__transport, self.__protocol = self.__reader_thread.connect()
@@ -116,11 +256,20 @@ class UArm(object):
             self.__connect_flag = False
 
     @catch_exception
-    def connect(self):
+    def connect(self, low_latency=None):
         """
         This function will open the port immediately. Function will wait for the READY Message for 5 secs.
         | Once received READY message, will finish connection.
-        """
+        | With ``low_latency``, on Linux, ``ASYNC_LOW_LATENCY`` is set and the FTDI ``latency_timer`` is
+        | lowered to 1 ms where permitted, the original settings are restored on ``disconnect`` or when the
+        | link drops. The receive and send threads wake up on each line and command instead of polling every 1 ms,
+        | this also applies to URL ports, which have no serial port settings.
+        | The round trip time is measured before and after, see ``low_latency_report``,
+        | settings which could not be changed are logged as warnings.
+        :param low_latency: if not None, overrides the ``low_latency`` given to the constructor
+        """
+        if low_latency is not None:
+            self.low_latency = low_latency
         if self.port_name is None:
             ports = uarm_ports()
             if len(ports) > 0:
@@ -131,38 +280,135 @@ class UArm(object):
         self.__position_queue = LifoQueue()
         self.__menu_button_queue = LifoQueue()
         self.__play_button_queue = LifoQueue()
-        self.__send_queue = Queue()
+        self.__send_queue = PriorityQueue()
+        self.__send_seq = itertools.count()
         self.__firmware_version = None
         self.__hardware_version = None
+        self.capabilities = None
+        self.serial_id = 1
+        self.msg_buff = {}
+        self.__pending = {}
+        self.__sent = {}
+        self.__expired = {}
+        self.__attached = {}
+        self.__report_interval = None
+        self.__open()
+
+    def __open(self, resume=False):
+        """
+        Open the serial port and start the receive and send threads.
+        :param resume: if True, restore the attach state and report interval before the send queue resumes
+        """
+        self.__generation += 1
+        self.rx_window.clear()
+        # wake up a send thread of the previous link, it exits once it sees the generation changed
+        self.__send_queue.put((-1, next(self.__send_seq), None))
         self.__isReady = False
-        self.port = get_port_property(self.port_name)
+        if transport.is_url(self.port_name):
+            self.port = UArmPort(self.port_name, None, None)
+        elif self.port is None or self.port.device != self.port_name:
+            self.port = get_port_property(self.port_name)
         self.__receive_thread = threading.Thread(target=self.__receive_thread_process)
         self.__send_thread = threading.Thread(target=self.__send_thread_process)
         self.__receive_thread.setDaemon(True)
         self.__send_thread.setDaemon(True)
-        self.serial_id = 1
-        self.msg_buff = {}
-        self.__serial = serial.Serial(baudrate=115200, timeout=0.1)
+        self.__serial = transport.create(self.port.device)
         try:
-            self.__serial.port = self.port.device
             printf("Connecting from port - {0}...".format(self.port.device))
             self.__serial.open()
+            if transport.tune(self.__serial):
+                printf("TCP_NODELAY set on {}", DEBUG, self.port.device)
             self.__init_serial_core()
-            self.__connect()
+            self.__connect(resume)
+            if self.low_latency and self.connection_state:
+                self.__enable_low_latency(measure=not resume)
         except serial.SerialException as e:
             raise UArmConnectException(0, "port: {}, Error: {}".format(self.port.device, e.strerror))
 
-    def __connect(self):
+    def __connect(self, resume=False):
         start_time = time.time()
         while time.time() - start_time < 5:
             if self.connection_state:
                 break
         self.__receive_thread.start()
-        self.__send_thread.start()
         start_time = time.time()
         while time.time() - start_time < self.timeout:
             if self.__isReady:
                 break
+        if resume and self.connection_state:
+            self.__resync()
+        self.__send_thread.start()
+        if self.connection_state and self.capabilities is None:
+            self.capabilities = capability.lookup(self.firmware_version)
+            printf("Firmware capabilities: {}", DEBUG, self.capabilities)
+            if not self.capabilities.known:
+                printf("Firmware version {} unknown, commands are not checked".format(self.firmware_version),
+                       WARNING)
+
+    def __enable_low_latency(self, measure=True):
+        """
+        Tune the serial port for latency, see ``connect``.
+        :param measure: if True, measure the round trip time before and after
+        """
+        device = self.port.device
+        before = latency.measure_rtt(self, LOW_LATENCY_PROBES) if measure else None
+        if transport.is_url(device):
+            warnings = []
+        else:
+            self.__low_latency_saved, warnings = latency.enable_low_latency(device)
+        for warning in warnings:
+            printf(warning, WARNING)
+        after = latency.measure_rtt(self, LOW_LATENCY_PROBES) if measure else None
+        self.low_latency_report = {'device': device, 'warnings': warnings,
+                                   'low_latency': latency.get_low_latency(device),
+                                   'latency_timer': latency.read_latency_timer(device),
+                                   'before': before, 'after': after}
+        if measure and before['rtt']['p50'] is not None and after['rtt']['p50'] is not None:
+            printf("Low latency mode, median round trip {:.2f} ms -> {:.2f} ms".format(
+                before['rtt']['p50'] * 1000, after['rtt']['p50'] * 1000))
+
+    def __restore_low_latency(self):
+        if self.__low_latency_saved is not None:
+            latency.restore_low_latency(self.port.device, self.__low_latency_saved)
+            self.__low_latency_saved = None
+
+    def __resync(self):
+        """
+        Restore the attach state and report interval after a reconnect, ahead of the queued commands.
+        """
+        msgs = [protocol.ATTACH_SERVO.format(n) if attached else protocol.DETACH_SERVO.format(n)
+                for n, attached in sorted(self.__attached.items())]
+        if self.__report_interval:
+            msgs.append(protocol.SET_REPORT_POSITION.format(self.__report_interval))
+        if msgs:
+            self.submit_many(msgs, priority=protocol.PRIORITY_EMERGENCY)
+            printf("Restored {} after reconnect", DEBUG, ', '.join(msgs))
+        if self.shadow is not None:
+            self.shadow.reset()
+
+    @catch_exception
+    def reconnect(self, port_name=None):
+        """
+        Reopen the serial link after it was lost, eg. the USB cable was plugged out and in again.
+        | Unlike ``connect``, the send queue, pending futures, message ids and firmware capabilities are kept,
+        | the last attach state and report interval are restored, then the queued commands are sent.
+        | Commands which were on the wire when the link dropped expire at their deadline.
+        :param port_name: device name of the uArm after it reappeared, if None, use ``port_name``
+        :return: True if reconnected
+        """
+        if self.__send_queue is None:
+            self.connect()
+            return self.connection_state
+        if port_name is not None:
+            self.port_name = port_name
+        self.__low_latency_saved = None  # the replugged adapter starts with its default settings
+        try:
+            self.__close_serial_core()
+            self.__serial.close()
+        except Exception as e:
+            printf("Close lost link {} - {}", DEBUG, type(e).__name__, e)
+        self.__open(resume=True)
+        return self.connection_state
 
     @property
     def connection_state(self):
@@ -186,6 +432,9 @@ class UArm(object):
         """
         Disconnect the serial connection, terminate all queue and thread
         """
+        self.disable_hotplug()
+        self.disable_position_ring()
+        self.__restore_low_latency()
         self.__close_serial_core()
         self.__serial.close()
         printf("Disconnect from {}".format(self.port_name))
@@ -207,18 +456,62 @@ class UArm(object):
         if line is not None:
             if line.startswith("$"):
                 values = line.split(' ')
-                msg_id = int(values[0].replace('$', ''))
-                self.msg_buff[msg_id] = values[1:]
-                printf("MSG Received: {}".format(line), DEBUG)
+                try:
+                    msg_id = int(values[0].replace('$', ''))
+                except ValueError:
+                    self.__metrics.malformed()
+                    printf("Malformed line: {}", DEBUG, line)
+                    return
+                self.rx_window.release(msg_id)
+                if self.tracer is not None:
+                    self.tracer.ack(msg_id, values[1] if len(values) > 1 else '')
+                sent = self.__sent.pop(msg_id, None)
+                if sent is not None:
+                    rtt = time.time() - sent[1]
+                    self.__metrics.replied(sent[0], rtt, len(values) > 1 and values[1] == protocol.OK)
+                    self.rto.update(sent[0], rtt)
+                else:
+                    self.__metrics.unmatched()
+                future = self.__pending.pop(msg_id, None)
+                if future is not None:
+                    response = values[1:]
+                    if not capability.is_complete(future.msg.split(' ', 1)[0], response):
+                        # finish with no response, send_and_receive resends the query at once
+                        self.__metrics.malformed()
+                        printf("Incomplete reply: {}", DEBUG, line)
+                        response = None
+                    future.set_result(response)
+                elif self.__expired.pop(msg_id, None) is not None:
+                    printf("Late reply dropped: {}", DEBUG, line)
+                    return
+                else:
+                    self.msg_buff[msg_id] = values[1:]
+                printf("MSG Received: {}", DEBUG, line)
             elif line.startswith(protocol.READY):
-                printf("Received MSG: {}".format(line), DEBUG)
+                printf("Received MSG: {}", DEBUG, line)
                 self.__isReady = True
             elif line.startswith(protocol.REPORT_POSITION_PREFIX):
-                printf("POSITION REPORT: {}".format(line), DEBUG)
+                printf("POSITION REPORT: {}", DEBUG, line)
+                self.__metrics.report(time.time())
                 values = line.split(' ')
-                pos_array = [float(values[1][1:]), float(values[2][1:]),
-                             float(values[3][1:])]
+                try:
+                    pos_array = [float(values[1][1:]), float(values[2][1:]),
+                                 float(values[3][1:])]
+                except (ValueError, IndexError):
+                    self.__metrics.malformed()
+                    printf("Malformed line: {}", DEBUG, line)
+                    return
                 self.__position_queue.put(pos_array, block=False)
+                if self.shadow is not None:
+                    self.shadow.put('position', pos_array)
+                for listener in self.__report_listeners:
+                    try:
+                        listener(pos_array)
+                    except Exception as e:
+                        printf("Report listener {} - {}".format(type(e).__name__, e), ERROR)
+            elif line and not line.startswith('@'):
+                self.__metrics.malformed()
+                printf("Malformed line: {}", DEBUG, line)
 
     def __receive_thread_process(self):
         """
@@ -227,14 +520,23 @@ class UArm(object):
         | This thread will be finished if serial connection is end.
         .. _pyserial threading: http://pyserial.readthedocs.io/en/latest/pyserial_api.html#module-serial.threaded
         """
-        while self.connection_state:
+        generation = self.__generation
+        line_event = self.__line_event
+        next_expire = 0
+        while self.connection_state and generation == self.__generation:
+            line = None
             try:
-                line = None
+                now = time.time()
+                if now >= next_expire:
+                    self.__expire_overdue(now)
+                    next_expire = now + EXPIRE_INTERVAL
                 if PY3:
                     if len(self.__data_buf) > 0:
-                        line = self.__data_buf.pop().rstrip('\r\n')
+                        line = self.__data_buf.pop(0).rstrip('\r\n')
                 else:
-                    line = self.__serial.readline().rstrip('\r\n')
+                    line = self.__serial.readline()
+                    self.__metrics.bytes_in += len(line)
+                    line = line.rstrip('\r\n')
                     if not line:
                         continue
                 self.__process_line(line)
@@ -244,7 +546,15 @@ class UArm(object):
                     self.__connect_flag = False
             except Exception as e:
                 printf("Receive Process {} - {}".format(type(e).__name__, e), ERROR)
-            time.sleep(0.001)
+            if line_event is None:
+                time.sleep(0.001)
+            elif line is None:
+                line_event.wait(EXPIRE_INTERVAL)
+                line_event.clear()
+        if generation == self.__generation:
+            # the link dropped, put the port settings back while the device may still be there
+            self.__restore_low_latency()
+            self.__abort_pending()
         # Make Sure all queues were release
         self.__position_queue.join()
         self.__play_button_queue.join()
@@ -254,33 +564,167 @@ class UArm(object):
         """
         This function is for sending thread function.
         | All functions which start with ``get_`` and with ``wait=True`` function will send out with this thread.
+        | Commands are pipelined: the thread keeps sending as long as the bytes of all unanswered commands,
+        | from any write path, fit in ``rx_window``, otherwise it waits for replies. A group of commands is
+        | written in one call if it fits, otherwise in several, as far as the free space allows.
         | thread will be finished if serial connection is end.
         """
-        while self.connection_state:
+        generation = self.__generation
+        low_latency = self.__line_event is not None
+
+        def link_changed():
+            return generation != self.__generation or not self.connection_state
+
+        while self.connection_state and generation == self.__generation:
             try:
-                item = self.__send_queue.get()
-                if item is None:
+                priority, seq, futures = self.__send_queue.get()
+                if futures is None:
+                    self.__send_queue.task_done()
+                    if generation != self.__generation:
+                        break
+                    continue
+                if generation != self.__generation:
+                    # the link was reopened meanwhile, leave the entry to the new send thread
+                    self.__send_queue.put((priority, seq, futures))
+                    self.__send_queue.task_done()
                     break
-                msg_id = item['id']
-                msg_content = item['msg']
-                msg = '#{} {}'.format(msg_id, msg_content)
-                if PY3:
-                    self.__protocol.write_line(msg)
-                else:
-                    self.__serial.write(msg)
-                    self.__serial.write('\n')
-                printf("Send {}".format(msg), DEBUG)
-                start_time = time.time()
-                while time.time() - start_time < self.timeout:
-                    if msg_id in self.msg_buff.keys():
+                if not isinstance(futures, list):
+                    futures = [futures]
+                futures = [f for f in futures if not f.done()]
+                msgs = ['#{} {}'.format(f.msg_id, f.msg) for f in futures]
+                sizes = [len(msg) + 2 for msg in msgs]  # terminator
+                start = 0
+                while start < len(futures):
+                    # a group larger than the free window is split, its lines keep their order
+                    if not self.rx_window.acquire(futures[start].msg_id, sizes[start], futures[start].timeout,
+                                                  abort=link_changed):
+                        break
+                    end = start + 1
+                    while end < len(futures) and self.rx_window.acquire(futures[end].msg_id, sizes[end],
+                                                                        futures[end].timeout, timeout=0):
+                        end += 1
+                    if generation != self.__generation:
+                        for future in futures[start:end]:
+                            self.rx_window.release(future.msg_id)
                         break
+                    now = time.time()
+                    for future in futures[start:end]:
+                        future.start(now)
+                    self.__write_lines(msgs[start:end])
+                    for msg in msgs[start:end]:
+                        printf("Send {}", DEBUG, msg)
+                    start = end
+                if start < len(futures):
+                    self.__send_queue.put((priority, seq, futures[start:]))
+                    self.__send_queue.task_done()
+                    break
                 self.__send_queue.task_done()
             except Exception as e:
                 printf("Error: {}".format(e), ERROR)
-            time.sleep(0.001)
+            if not low_latency:
+                time.sleep(0.001)
+        if generation == self.__generation:
+            self.__abort_pending()
         # Make Sure all queues were release
         self.__send_queue.join()
 
+    def __expire_overdue(self, now):
+        """
+        Expire the futures whose deadline passed, whether or not anybody waits on them.
+        """
+        if self.__pending:
+            for future in list(self.__pending.values()):
+                if future.deadline is not None and now >= future.deadline:
+                    future.expire()
+
+    def __abort_pending(self):
+        """
+        The link is lost and will not come back by itself, finish every pending future now.
+        | With hotplug, queued commands are kept for the reconnect instead.
+        """
+        pending = self.__pending
+        if self.hotplug is not None or self.__send_queue is None or pending is None:
+            return
+        self.flush_send_queue(protocol.PRIORITY_EMERGENCY)
+        for future in list(pending.values()):
+            future.expire()
+
+    def __write_line(self, msg, urgent=False):
+        """
+        Write one line to the serial port.
+        :param msg: String, message including the ``#id`` prefix
+        :param urgent: if True, skip write coalescing, see ``set_write_coalescing``
+        """
+        self.__track_sent(msg)
+        if PY3:
+            self.__protocol.write_line(msg, urgent)
+        else:
+            self.__serial.write(msg)
+            self.__serial.write('\n')
+            self.__metrics.bytes_out += len(msg) + 1
+
+    def __write_lines(self, msgs, urgent=False):
+        """
+        Write several lines to the serial port in a single write.
+        :param msgs: list of String messages including the ``#id`` prefix
+        :param urgent: if True, skip write coalescing, see ``set_write_coalescing``
+        """
+        for msg in msgs:
+            self.__track_sent(msg)
+        if PY3:
+            self.__protocol.write_lines(msgs, urgent)
+        else:
+            data = '\n'.join(msgs) + '\n'
+            self.__serial.write(data)
+            self.__metrics.bytes_out += len(data)
+
+    def __track_sent(self, msg):
+        """
+        Remember when a message was written, to measure its round trip time.
+        """
+        head, body = msg.split(' ', 1)
+        code = body.split(' ', 1)[0]
+        now = time.time()
+        if len(self.__sent) > 4096:  # replies of fire-and-forget messages may never come
+            for msg_id in [k for k, v in self.__sent.items() if now - v[1] > 60]:
+                self.__sent.pop(msg_id, None)
+        self.__sent[int(head[1:])] = (code, now)
+        self.__metrics.sent(code)
+        if self.tracer is not None:
+            self.tracer.write(int(head[1:]), body, now)
+
+    def __track_timeout(self, msg_id, msg):
+        self.__sent.pop(msg_id, None)
+        self.rx_window.release(msg_id)
+        now = time.time()
+        if len(self.__expired) > 4096:
+            for expired_id in [k for k, v in self.__expired.items() if now - v > 60]:
+                self.__expired.pop(expired_id, None)
+        # a reply arriving after the deadline is dropped, not left in msg_buff
+        self.__expired[msg_id] = now
+        code = msg.split(' ', 1)[0]
+        self.__metrics.timeout(code)
+        self.rto.backoff(code)
+        if self.tracer is not None:
+            self.tracer.ack(msg_id, 'TIMEOUT')
+
+    def metrics(self):
+        """
+        Snapshot of the link metrics.
+        | ``commands`` holds per command code ``sent``, ``timeouts``, ``errors`` and the ``rtt`` histogram,
+        | histograms are dicts of ``count``, ``min``, ``max``, ``mean``, ``p50``, ``p90``, ``p99`` in seconds.
+        :return: dict
+        """
+        snapshot = self.__metrics.snapshot()
+        snapshot['queue_depth'] = self.__send_queue.qsize() if self.__send_queue is not None else 0
+        snapshot['in_flight'] = len(self.__pending) if self.__pending is not None else 0
+        snapshot['rx_window'] = self.rx_window.used
+        snapshot['coalesced'] = self.coalesced_count
+        snapshot['timeout_estimates'] = self.rto.snapshot()
+        if self.shadow is not None:
+            snapshot['shadow'] = self.shadow.stats()
+        return snapshot
+
     def __gen_serial_id(self):
         """
         Generate a serial id to identify the message.
@@ -292,24 +736,351 @@ class UArm(object):
             self.serial_id += 1
         return self.serial_id
 
-    def send_and_receive(self, msg):
+    @staticmethod
+    def command_priority(msg):
         """
-        This function will block until receive the response message.
+        Get the default send lane of a command.
+        | Stop and detach commands use ``protocol.PRIORITY_EMERGENCY``, moves use ``protocol.PRIORITY_BULK``,
+        | everything else uses ``protocol.PRIORITY_CONTROL``.
         :param msg: String Serial Command
-        :return: (Integer msg_id, String response) and None if no response
+        :return: Integer priority lane
+        """
+        code = msg.split(' ', 1)[0]
+        if code in protocol.EMERGENCY_COMMANDS:
+            return protocol.PRIORITY_EMERGENCY
+        elif code in protocol.BULK_COMMANDS:
+            return protocol.PRIORITY_BULK
+        return protocol.PRIORITY_CONTROL
+
+    def set_write_coalescing(self, window=protocol.WRITE_WINDOW, budget=protocol.WRITE_BUDGET):
+        """
+        Collect commands written back-to-back into fewer, larger writes, see ``UArmReaderThread.write``.
+        | A command after an idle period is written at once. Only the ``protocol.PRIORITY_EMERGENCY`` lane, stop
+        | and detach, bypasses the window, ``PRIORITY_CONTROL`` commands are coalesced like moves and may wait up to
+        | ``window`` seconds behind a burst.
+        :param window: seconds a write waits for more to follow, 0 disables coalescing
+        :param budget: bytes collected at most before a write
+        """
+        self.write_window = window
+        self.write_budget = budget
+        if self.__reader_thread is not None:
+            self.__reader_thread.write_window = window
+            self.__reader_thread.write_budget = budget
+
+    def enable_shadow(self, max_age=0.1):
         """
-        if self.connection_state:
-            msg_id = self.__gen_serial_id()
-            item = {'id': msg_id, 'msg': msg}
-            self.__send_queue.put(item)
-            start_time = time.time()
-            while time.time() - start_time < self.timeout:
-                if msg_id in self.msg_buff.keys():
-                    return msg_id, self.msg_buff[msg_id]
-            # print("duration: {}".format(time.time() - start_time))
-            return None, None
+        Keep a client side copy of the uArm state, see ``pyuarm.shadow``.
+        | ``get_position``, ``get_servo_angle`` and ``get_pump`` are answered from cache within ``max_age``.
+        | Pump, gripper, wrist and attach writes which would not change anything are skipped.
+        | Detach and stop are always sent.
+        :param max_age: freshness window of cached reads in seconds
+        :return: UArmShadow, ``stats()`` returns the hit/miss/suppressed counters
+        """
+        self.shadow = UArmShadow(max_age)
+        return self.shadow
+
+    def disable_shadow(self):
+        self.shadow = None
+
+    def enable_tracer(self, capacity=DEFAULT_CAPACITY):
+        """
+        Record the queue, wire and motion spans of every command, see ``pyuarm.trace``.
+        :param capacity: maximum number of spans kept
+        :return: Tracer, ``dump(path)`` writes Chrome trace JSON
+        """
+        self.tracer = Tracer(capacity)
+        return self.tracer
+
+    def disable_tracer(self):
+        self.tracer = None
+
+    def enable_hotplug(self, interval=0.05):
+        """
+        Reconnect automatically when the uArm with the same serial number is plugged in again,
+        see ``pyuarm.hotplug``. ``disconnect`` stops the monitor.
+        :param interval: seconds between link checks
+        :return: HotplugMonitor
+        """
+        self.disable_hotplug()
+        self.hotplug = HotplugMonitor(self, interval)
+        self.hotplug.start()
+        return self.hotplug
+
+    def disable_hotplug(self):
+        if self.hotplug is not None:
+            self.hotplug.stop()
+            self.hotplug = None
+
+    def enable_position_ring(self, capacity=posering.DEFAULT_CAPACITY, name=None):
+        """
+        Publish position reports in shared memory, for other processes, see ``pyuarm.posering``.
+        | Readers attach with ``PositionReader(serial_number)``, reports must be on, see ``set_report_position``.
+        | ``disconnect`` removes the ring.
+        :param capacity: number of samples kept
+        :param name: segment name, default by the serial number of the arm, see ``posering.segment_name``
+        :return: PositionRing
+        """
+        self.disable_position_ring()
+        if name is None:
+            name = posering.segment_name(getattr(self.port, 'serial_number', None) or
+                                         self.port_name.replace('/', '_'))
+        self.position_ring = posering.PositionRing(name, capacity)
+        self.add_report_listener(self.position_ring.publish)
+        return self.position_ring
+
+    def disable_position_ring(self):
+        if self.position_ring is not None:
+            self.remove_report_listener(self.position_ring.publish)
+            self.position_ring.close()
+            self.position_ring = None
+
+    def add_report_listener(self, listener):
+        """
+        Call ``listener(position)`` on every position report, see ``set_report_position``.
+        | Listeners run on the receive thread and must not block.
+        :param listener: callable taking the [x, y, z] list
+        """
+        if listener not in self.__report_listeners:
+            self.__report_listeners = self.__report_listeners + [listener]
+
+    def remove_report_listener(self, listener):
+        self.__report_listeners = [l for l in self.__report_listeners if l != listener]
+
+    def flush_send_queue(self, priority=protocol.PRIORITY_BULK):
+        """
+        Drop pending commands which are not sent yet, and abort a running stream.
+        | Callers waiting on a dropped command get a None response immediately.
+        :param priority: drop every lane with this priority or lower, default only the bulk lane
+        :return: Integer, number of dropped commands
+        """
+        self.__flush_count += 1
+        keep = []
+        dropped = 0
+        while True:
+            try:
+                entry = self.__send_queue.get_nowait()
+            except Empty:
+                break
+            self.__send_queue.task_done()
+            if entry[2] is not None and entry[0] >= priority:
+                for future in (entry[2] if isinstance(entry[2], list) else [entry[2]]):
+                    future.cancel()
+                    dropped += 1
+            else:
+                keep.append(entry)
+        for entry in keep:
+            self.__send_queue.put(entry)
+        if dropped > 0:
+            printf("Flushed {} pending commands", DEBUG, dropped)
+        return dropped
+
+    def check_supported(self, msg):
+        """
+        Fail fast on commands the connected firmware does not implement.
+        | Nothing is checked before the firmware version is known, see ``pyuarm.capability.lookup``.
+        :param msg: String Serial Command
+        :raise UArmUnsupportedException
+        """
+        if self.capabilities is not None:
+            code = msg.split(' ', 1)[0]
+            if not self.capabilities.supports(code):
+                raise UArmUnsupportedException(code, self.capabilities.firmware_version)
+
+    def command_timeout(self, msg):
+        """
+        Get the deadline of a command in seconds, counted from the write.
+        | Per-command deadlines are looked up in ``timeouts`` by command code, eg. ``{'G0': 5, 'P220': 0.5}``.
+        | Otherwise, if ``adaptive_timeout`` is on, the deadline of a query (``protocol.QUERY_COMMANDS``) is
+        | learned from its round trip times (``rto``, smoothed RTT plus 4 times its variance).
+        | Moves, EEPROM writes and other commands whose ack time depends on their arguments, as well as
+        | queries never answered yet, use ``timeout``.
+        :param msg: String Serial Command
+        :return: Float seconds
+        """
+        code = msg.split(' ', 1)[0]
+        if code in self.timeouts:
+            return self.timeouts[code]
+        if self.adaptive_timeout and code in protocol.QUERY_COMMANDS:
+            rto = self.rto.rto(code)
+            if rto is not None:
+                return rto
+        return self.timeout
+
+    def timeout_estimates(self):
+        """
+        Current adaptive deadlines, see ``command_timeout``.
+        :return: dict of command code to dict of ``srtt``, ``rttvar``, ``rto`` in seconds and ``samples``
+        """
+        return self.rto.snapshot()
+
+    def submit(self, msg, timeout=None, priority=None):
+        """
+        Send the message without blocking and return a future for its response.
+        | Commands are queued in priority lanes, see ``command_priority``.
+        | Emergency commands skip the queue and are written immediately.
+        | The deadline counts from the moment the command is written, time spent in the queue is not included.
+        :param msg: String Serial Command
+        :param timeout: deadline in seconds, if None, decided by ``command_timeout``
+        :param priority: send lane, ``protocol.PRIORITY_EMERGENCY``, ``PRIORITY_CONTROL`` or ``PRIORITY_BULK``,
+        if None, decided by the command
+        :return: UArmFuture, ``result()`` is the response list, None if no response before the deadline
+        """
+        if not self.connection_state:
+            raise UArmConnectException(4)
+        self.check_supported(msg)
+        if priority is None:
+            priority = self.command_priority(msg)
+        if timeout is None:
+            timeout = self.command_timeout(msg)
+        msg_id = self.__gen_serial_id()
+        future = UArmFuture(msg_id, msg, timeout=timeout)
+        if self.tracer is not None:
+            self.tracer.enqueue(msg_id, msg)
+        self.__pending[msg_id] = future
+        future.add_done_callback(self.__forget_future)
+        if priority == protocol.PRIORITY_EMERGENCY:
+            self.__write_urgent([future])
         else:
+            self.__send_queue.put((priority, next(self.__send_seq), future))
+            self.__metrics.queued(self.__send_queue.qsize())
+        return future
+
+    def submit_many(self, msgs, timeout=None, priority=None):
+        """
+        Send several messages in a single write without blocking.
+        | The whole group uses the most urgent lane of its commands. A group larger than the free space of
+        | the firmware receive buffer is split over several writes, in order.
+        :param msgs: list of String Serial Commands
+        :param timeout: deadline in seconds for each command, if None, decided by ``command_timeout``
+        :param priority: send lane, see ``submit``
+        :return: list of UArmFuture, in the same order as ``msgs``
+        """
+        if not self.connection_state:
             raise UArmConnectException(4)
+        for msg in msgs:
+            self.check_supported(msg)
+        if priority is None:
+            priority = min(self.command_priority(msg) for msg in msgs)
+        futures = []
+        for msg in msgs:
+            msg_id = self.__gen_serial_id()
+            future = UArmFuture(msg_id, msg, timeout=timeout if timeout is not None else self.command_timeout(msg))
+            if self.tracer is not None:
+                self.tracer.enqueue(msg_id, msg)
+            self.__pending[msg_id] = future
+            future.add_done_callback(self.__forget_future)
+            futures.append(future)
+        if priority == protocol.PRIORITY_EMERGENCY:
+            self.__write_urgent(futures)
+        else:
+            self.__send_queue.put((priority, next(self.__send_seq), futures))
+            self.__metrics.queued(self.__send_queue.qsize())
+        return futures
+
+    def __write_urgent(self, futures):
+        """
+        Write emergency commands at once, ahead of the send queue.
+        | They may use the ``rx_window`` reserve, which is kept free by the other commands, so the first line
+        | fits at once. Further lines of a group wait for room, a line which cannot be written is cancelled.
+        :param futures: list of UArmFuture
+        """
+        msgs = ['#{} {}'.format(f.msg_id, f.msg) for f in futures]
+        start = 0
+        while start < len(futures):
+            end = start
+            while end < len(futures) and self.rx_window.acquire(
+                    futures[end].msg_id, len(msgs[end]) + 2, futures[end].timeout, urgent=True,
+                    timeout=None if end == start else 0, abort=lambda: not self.connection_state):
+                end += 1
+            if end == start:
+                break
+            now = time.time()
+            for future in futures[start:end]:
+                future.start(now)
+            self.__write_lines(msgs[start:end], urgent=True)
+            printf("Send {}", DEBUG, ' | '.join(msgs[start:end]))
+            start = end
+        for future in futures[start:]:
+            future.cancel()
+
+    def batch(self, wait=True, timeout=None):
+        """
+        Group commands into one write, use as a context manager.
+        | Commands added with ``send`` are buffered and flushed when the block ends,
+        | the replies are collected together into ``success`` and ``responses``.
+        .. raw:python
+        >>> with uarm.batch() as b:
+        ...     b.send(protocol.ATTACH_SERVO.format(0))
+        ...     b.send(protocol.ATTACH_SERVO.format(1))
+        >>> b.success
+        True
+        :param wait: if True, block at the end of the block until all replies are collected or timeout
+        :param timeout: deadline in seconds for each command, if None, decided by ``command_timeout``
+        :return: UArmBatch
+        """
+        return UArmBatch(self, wait=wait, timeout=timeout)
+
+    def __forget_future(self, future):
+        self.__pending.pop(future.msg_id, None)
+        if future.expired():
+            self.__track_timeout(future.msg_id, future.msg)
+
+    def __submit_query(self, msg, timeout=None, priority=None):
+        """
+        Single-flight submit for query commands.
+        | If the same query is already waiting for its reply, share that future instead of sending again.
+        """
+        with self.__queries_lock:
+            future = self.__queries.get(msg)
+            if future is not None and not future.done():
+                self.coalesced_count += 1
+                return future
+            future = self.submit(msg, timeout=timeout, priority=priority)
+            self.__queries[msg] = future
+        future.add_done_callback(self.__forget_query)
+        return future
+
+    def __forget_query(self, future):
+        with self.__queries_lock:
+            if self.__queries.get(future.msg) is future:
+                del self.__queries[future.msg]
+
+    def send_and_receive(self, msg, priority=None):
+        """
+        This function will block until receive the response message.
+        | Concurrent callers asking the same query (``protocol.QUERY_COMMANDS``) share one request,
+        | ``coalesced_count`` counts the shared calls.
+        | A query whose reply is lost is resent with a new id, up to ``max_retries`` times, each attempt with
+        | the deadline of ``command_timeout`` and all of them within ``timeout``. Other commands, eg. moves,
+        | are never resent.
+        :param msg: String Serial Command
+        :param priority: send lane, see ``submit``
+        :return: (Integer msg_id, String response) and None if no response
+        """
+        code = msg.split(' ', 1)[0]
+        if code not in protocol.QUERY_COMMANDS:
+            future = self.submit(msg, priority=priority)
+            response = future.result()
+            if response is None:
+                return None, None
+            return future.msg_id, response
+        attempt_timeout = self.command_timeout(msg)
+        end_time = time.time() + max(self.timeout, attempt_timeout)
+        for attempt in range(self.max_retries + 1):
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            if attempt > 0:
+                self.__metrics.retry(code)
+                attempt_timeout = self.command_timeout(msg)
+                printf("Resend {}, attempt {}", DEBUG, msg, attempt + 1)
+            future = self.__submit_query(msg, timeout=min(attempt_timeout, remaining), priority=priority)
+            response = future.result()
+            if response is not None:
+                return future.msg_id, response
+            if future.cancelled() or not self.connection_state:
+                break
+        return None, None
 
     def send_msg(self, msg):
         """
@@ -318,18 +1089,176 @@ class UArm(object):
         :return:
         """
         if self.connection_state:
+            self.check_supported(msg)
             serial_id = self.__gen_serial_id()
             _msg = '#{} {}'.format(serial_id, msg)
-            if PY3:
-                self.__protocol.write_line(_msg)
-            else:
-                self.__serial.write(_msg)
-                self.__serial.write('\n')
-            printf("Send #{} {}".format(serial_id, msg), DEBUG)
+            lifetime = self.command_timeout(msg)
+            urgent = self.command_priority(msg) == protocol.PRIORITY_EMERGENCY
+            # wait for room in the firmware buffer, shared with the send thread and streams,
+            # emergency commands may use the reserve the others leave free
+            self.rx_window.acquire(serial_id, len(_msg) + 2, lifetime, urgent=urgent,
+                                   abort=lambda: not self.connection_state)
+            self.__write_line(_msg, urgent=urgent)
+            printf("Send #{} {}", DEBUG, serial_id, msg)
             return serial_id
         else:
             raise UArmConnectException(4)
 
+    def __stream_lines(self, lines, rx_buffer_size=protocol.RX_BUFFER_SIZE):
+        """
+        Stream commands with character-counting flow control.
+        | Every line is wrapped in ``#id``, and the bytes of all unacknowledged lines, together with
+        | everything else in ``rx_window``, are kept below ``rx_buffer_size``, so the firmware receive buffer
+        | stays full but never overflows.
+        | A line is released from the window once its ``$id`` reply arrives, or after ``timeout``.
+        :param lines: iterable of String commands, consumed lazily
+        :param rx_buffer_size: firmware receive buffer size in bytes
+        :return: dict of stream statistics
+        """
+        if not self.connection_state:
+            raise UArmConnectException(4)
+        if self.shadow is not None:
+            self.shadow.reset()
+        in_flight = deque()
+        stats = {'lines': 0, 'bytes': 0, 'errors': 0, 'timeouts': 0, 'stall_time': 0.0, 'first_id': None}
+
+        def release_head():
+            msg_id, sent_time, line = in_flight[0]
+            response = self.msg_buff.pop(msg_id, None)
+            if response is not None:
+                if len(response) == 0 or response[0] != protocol.OK:
+                    stats['errors'] += 1
+                    printf("Stream line #{} failed: {}".format(msg_id, ' '.join(response)), ERROR)
+            elif time.time() - sent_time > self.timeout:
+                stats['timeouts'] += 1
+                self.__track_timeout(msg_id, line)
+                printf("No Message response {}".format(msg_id), ERROR)
+            else:
+                return False
+            in_flight.popleft()
+            return True
+
+        flush_count = self.__flush_count
+
+        def aborted():
+            return self.__flush_count != flush_count or not self.connection_state
+
+        start_time = time.time()
+        for line in lines:
+            if aborted():
+                printf("Stream aborted after {} lines".format(stats['lines']), ERROR)
+                break
+            msg_id = self.__gen_serial_id()
+            msg = '#{} {}'.format(msg_id, line)
+            size = len(msg) + 2  # terminator
+            if not self.rx_window.acquire(msg_id, size, self.timeout, limit=rx_buffer_size, timeout=0):
+                stall_start = time.time()
+                acquired = self.rx_window.acquire(msg_id, size, self.timeout, limit=rx_buffer_size, abort=aborted)
+                stats['stall_time'] += time.time() - stall_start
+                if not acquired:
+                    printf("Stream aborted after {} lines".format(stats['lines']), ERROR)
+                    break
+            self.__write_line(msg)
+            printf("Send {}", DEBUG, msg)
+            if stats['first_id'] is None:
+                stats['first_id'] = msg_id
+            in_flight.append((msg_id, time.time(), line))
+            stats['lines'] += 1
+            stats['bytes'] += size
+            while in_flight and release_head():
+                pass
+        while in_flight:
+            if not release_head():
+                time.sleep(0.001)
+        stats['elapsed'] = time.time() - start_time
+        stats['lines_per_sec'] = stats['lines'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        return stats
+
+    def stream_gcode(self, source, rx_buffer_size=protocol.RX_BUFFER_SIZE):
+        """
+        Stream a G-code program to uArm, keeping the firmware receive buffer full.
+        The source is read lazily, comments and blank lines are skipped.
+        :param source: file path, opened file object or iterable of G-code lines
+        :param rx_buffer_size: firmware receive buffer size in bytes, default ``protocol.RX_BUFFER_SIZE``
+        :return: dict with ``lines``, ``bytes``, ``errors``, ``timeouts``, ``elapsed``, ``lines_per_sec``,
+        ``stall_time`` (seconds spent waiting for buffer space) and ``first_id`` (serial id of the first line)
+        """
+        return self.__stream_lines(read_gcode(source), rx_buffer_size)
+
+    def stream_servo_angles(self, angles, tolerance=0.0, rx_buffer_size=None):
+        """
+        Stream a joint-space trajectory with ``protocol.SET_SERVO_ANGLE``, skipping the Cartesian solver.
+        | Each row is sent as interleaved per-servo commands. A joint which moved no more than ``tolerance``
+        | since its last command is not sent again. Commands are streamed with character-counting flow control.
+        :param angles: (N, 4) rows of [servo 0, servo 1, servo 2, servo 3] angles in degrees, list or numpy array
+        :param tolerance: minimum angle change in degrees to send a joint again
+        :param rx_buffer_size: firmware receive buffer size in bytes, if None, use ``rx_buffer_size``
+        :return: dict of stream statistics, see ``stream_gcode``, plus ``joint_updates``, ``skipped``
+        and ``joint_updates_per_sec``
+        """
+        last = [None, None, None, None]
+        counts = {'skipped': 0}
+
+        def commands():
+            for row in angles:
+                if len(row) != 4:
+                    raise ValueError("Each row needs 4 servo angles, got {}".format(len(row)))
+                for servo_number in range(4):
+                    angle = round(float(row[servo_number]), 2)
+                    if last[servo_number] is not None and abs(angle - last[servo_number]) <= tolerance:
+                        counts['skipped'] += 1
+                        continue
+                    last[servo_number] = angle
+                    yield protocol.SET_SERVO_ANGLE.format(servo_number, angle)
+
+        if rx_buffer_size is None:
+            rx_buffer_size = self.rx_buffer_size
+        stats = self.__stream_lines(commands(), rx_buffer_size)
+        stats['joint_updates'] = stats['lines']
+        stats['skipped'] = counts['skipped']
+        stats['joint_updates_per_sec'] = stats['lines_per_sec']
+        return stats
+
+    @catch_exception
+    def follow_path(self, points, speed=100, acceleration=planning.DEFAULT_ACCELERATION,
+                    tolerance=planning.DEFAULT_TOLERANCE, lookahead=planning.DEFAULT_LOOKAHEAD,
+                    profile=planning.PROFILE_TRAPEZOID, wait=False):
+        """
+        Move along a polyline with blended corners and planned speeds, see ``pyuarm.planning``.
+        | The path starts from the current position. Segments are streamed with flow control.
+        | The firmware plans every segment from rest, the blended corners stop in small steps rather than not
+        | at all, and ``finish_time`` is a lower bound, see ``pyuarm.planning``.
+        :param points: list of [x, y, z]
+        :param speed: maximum speed, unit mm/sec
+        :param acceleration: maximum acceleration, unit mm/sec^2
+        :param tolerance: corner tolerance, unit mm
+        :param lookahead: number of segments the planner looks ahead
+        :param profile: ``planning.PROFILE_TRAPEZOID`` or ``planning.PROFILE_S_CURVE``
+        :param wait: if True, sleep until the predicted finish time, then wait until uArm stops moving
+        :return: list of PlannedSegment, ``finish_time`` is the predicted time after the start of the path,
+        at the earliest
+        """
+        start = self.get_position()
+        if start is None:
+            return None
+        segments = planning.plan([start] + list(points), speed=speed, acceleration=acceleration,
+                                 tolerance=tolerance, lookahead=lookahead, profile=profile)
+        start_time = time.time()
+        stats = self.__stream_lines(planning.to_commands(segments), self.rx_buffer_size)
+        if self.shadow is not None and segments:
+            self.shadow.move(segments[-1].end)
+        if wait and segments:
+            motion_start = time.time()
+            remaining = start_time + segments[-1].finish_time - motion_start
+            if remaining > 0:
+                time.sleep(remaining)
+            while self.get_is_moving():
+                time.sleep(0.01)
+            if self.tracer is not None and stats['first_id'] is not None:
+                # the span belongs to the first move of the path, not to the last id, a status poll
+                self.tracer.motion(stats['first_id'], 'path {} segments'.format(len(segments)), motion_start)
+        return segments
+
 # -------------------------------------------------------- Commands ---------------------------------------------------#
 
     def reset(self):
@@ -339,14 +1268,29 @@ class UArm(object):
         - Move to default position (0, 150, 150) with speed 100mm/min
         - Turn off Pump/Gripper
         - Set Wrist Servo to Angle 90
+        | With a shadow, the pump, gripper and wrist states are recorded, and forgotten again if not acknowledged.
         :return:
         """
         self.set_servo_attach()
         time.sleep(0.1)
         self.set_position(0, 150, 150, speed=100, wait=True)
-        self.set_pump(False)
-        self.set_gripper(False)
-        self.set_wrist(90)
+        with self.batch(wait=False) as b:
+            b.send(protocol.SET_PUMP.format(0))
+            b.send(protocol.SET_GRIPPER.format(0))
+            b.send(protocol.SET_SERVO_ANGLE.format(protocol.SERVO_HAND, 90))
+        if self.shadow is not None:
+            self.shadow.invalidate('pump', 'servo_angle')
+            for key, value, future in zip(('pump', 'gripper', 'wrist'), (False, False, 90.0), b.futures):
+                self.shadow.command(key, value)
+                future.add_done_callback(lambda f, key=key: self.__forget_failed_command(key, f))
+
+    def __forget_failed_command(self, key, future):
+        """
+        Forget the commanded state of an actuator if its command was not acknowledged.
+        """
+        response = future.result(0)
+        if self.shadow is not None and (response is None or response[0] != protocol.OK):
+            self.shadow.command(key, None)
 
 # -------------------------------------------------------- Get Commands -----------------------------------------------#
     @property
@@ -360,9 +1304,9 @@ class UArm(object):
         if self.__firmware_version is not None:
             return self.__firmware_version
         else:
+            cmd = protocol.GET_FIRMWARE_VERSION
+            serial_id, response = self.send_and_receive(cmd)
             try:
-                cmd = protocol.GET_FIRMWARE_VERSION
-                serial_id, response = self.send_and_receive(cmd)
                 if response is not None:
                     if response[0] == protocol.OK:
                         self.__firmware_version = response[1].replace('V', '')
@@ -382,9 +1326,9 @@ class UArm(object):
         if self.__hardware_version is not None:
             return self.__hardware_version
         else:
+            cmd = protocol.GET_HARDWARE_VERSION
+            serial_id, response = self.send_and_receive(cmd)
             try:
-                cmd = protocol.GET_HARDWARE_VERSION
-                serial_id, response = self.send_and_receive(cmd)
                 if response is not None:
                     if response[0] == protocol.OK:
                         self.__hardware_version = response[1].replace('V', '')
@@ -393,23 +1337,199 @@ class UArm(object):
             except Exception as e:
                 printf("Error: {}".format(e), ERROR)
 
+    @staticmethod
+    def parse_position(response):
+        """
+        Parse the response of ``protocol.GET_COOR``.
+        :return: Float Array [x, y, z], None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            x = float(response[1][1:])
+            y = float(response[2][1:])
+            z = float(response[3][1:])
+            return [x, y, z]
+        return None
+
+    @staticmethod
+    def parse_is_moving(response):
+        """
+        Parse the response of ``protocol.GET_IS_MOVE``.
+        :return: Boolean True or False, None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            v = int(response[1][1:])
+            if v == 0:
+                return False
+            elif v == 1:
+                return True
+        return None
+
+    @staticmethod
+    def parse_polar(response):
+        """
+        Parse the response of ``protocol.GET_POLAR``.
+        :return: Float Array [rotation, stretch, height], None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            stretch = float(response[1][1:])
+            rotation = float(response[2][1:])
+            height = float(response[3][1:])
+            return [rotation, stretch, height]
+        return None
+
+    @staticmethod
+    def parse_tip_sensor(response):
+        """
+        Parse the response of ``protocol.GET_TIP_SENSOR``.
+        :return: True On/ False Off, None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            if response[1] == 'V0':
+                return True
+            elif response[1] == 'V1':
+                return False
+        return None
+
+    @staticmethod
+    def parse_servo_angle(response):
+        """
+        Parse the response of ``protocol.GET_SERVO_ANGLE``.
+        :return: Float Array [servo 0, servo 1, servo 2, servo 3], None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            return [float(response[1][1:]), float(response[2][1:]),
+                    float(response[3][1:]), float(response[4][1:])]
+        return None
+
+    @staticmethod
+    def parse_pump(response):
+        """
+        Parse the response of ``protocol.GET_PUMP``.
+        :return: True On/ False Off, None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            return int(response[1][1:]) != 0
+        return None
+
+    @staticmethod
+    def parse_simulation(response):
+        """
+        Parse the response of ``protocol.GET_SIMULATION``.
+        :return: True reachable/ False unreachable, None if failed
+        """
+        if response is not None and response[0] == protocol.OK:
+            return response[1] == 'V1'
+        return None
+
+    def get_position_async(self, timeout=None):
+        """
+        Non-blocking ``get_position``.
+        :param timeout: deadline in seconds, if None, decided by ``command_timeout``
+        :return: UArmFuture, ``result()`` is [x, y, z] or None
+        """
+        return self.submit(protocol.GET_COOR, timeout=timeout).then(self.parse_position)
+
+    def get_is_moving_async(self, timeout=None):
+        """
+        Non-blocking ``get_is_moving``.
+        :return: UArmFuture, ``result()`` is True, False or None
+        """
+        return self.submit(protocol.GET_IS_MOVE, timeout=timeout).then(self.parse_is_moving)
+
+    def get_polar_async(self, timeout=None):
+        """
+        Non-blocking ``get_polar``.
+        :return: UArmFuture, ``result()`` is [rotation, stretch, height] or None
+        """
+        return self.submit(protocol.GET_POLAR, timeout=timeout).then(self.parse_polar)
+
+    def get_tip_sensor_async(self, timeout=None):
+        """
+        Non-blocking ``get_tip_sensor``.
+        :return: UArmFuture, ``result()`` is True, False or None
+        """
+        return self.submit(protocol.GET_TIP_SENSOR, timeout=timeout).then(self.parse_tip_sensor)
+
+    def get_servo_angle_async(self, timeout=None):
+        """
+        Non-blocking ``get_servo_angle`` for all servos.
+        :return: UArmFuture, ``result()`` is [servo 0, servo 1, servo 2, servo 3] or None
+        """
+        return self.submit(protocol.GET_SERVO_ANGLE, timeout=timeout).then(self.parse_servo_angle)
+
+    def get_pump_async(self, timeout=None):
+        """
+        Non-blocking ``get_pump``.
+        :return: UArmFuture, ``result()`` is True, False or None
+        """
+        return self.submit(protocol.GET_PUMP, timeout=timeout).then(self.parse_pump)
+
+    def get_simulation_async(self, x, y, z, timeout=None):
+        """
+        Non-blocking ``get_simulation``.
+        :return: UArmFuture, ``result()`` is True, False or None
+        """
+        command = protocol.GET_SIMULATION.format(str(round(x, 2)), str(round(y, 2)), str(round(z, 2)))
+        return self.submit(command, timeout=timeout).then(self.parse_simulation)
+
+    STATE_QUERIES = (
+        ('position', protocol.GET_COOR, 'parse_position'),
+        ('servo_angle', protocol.GET_SERVO_ANGLE, 'parse_servo_angle'),
+        ('is_moving', protocol.GET_IS_MOVE, 'parse_is_moving'),
+        ('tip_sensor', protocol.GET_TIP_SENSOR, 'parse_tip_sensor'),
+        ('pump', protocol.GET_PUMP, 'parse_pump'),
+    )
+
+    def get_state(self, fields=None, timeout=None):
+        """
+        Get a status snapshot in one go.
+        | All queries are issued back-to-back and their replies are gathered by id,
+        | so the snapshot costs about one round trip instead of one per query.
+        :param fields: names of the ``UArmState`` fields to query, if None, query all of them
+        :param timeout: deadline in seconds for each query, if None, decided by ``command_timeout``
+        :return: UArmState, a field is None if its query failed or was not requested
+        :raise ValueError: if a field name is unknown
+        """
+        if fields is None:
+            fields = [q[0] for q in self.STATE_QUERIES]
+        for field in fields:
+            if field not in UArmState._fields[1:]:
+                raise ValueError("Unknown state field: {}".format(field))
+        return self.__get_state(fields, timeout)
+
+    @catch_exception
+    def __get_state(self, fields, timeout):
+        timestamp = time.time()
+        futures = {}
+        for field, cmd, parser in self.STATE_QUERIES:
+            if field in fields:
+                futures[field] = self.submit(cmd, timeout=timeout).then(getattr(self, parser))
+        values = dict((field, future.result()) for field, future in futures.items())
+        return UArmState(timestamp=timestamp,
+                         position=values.get('position'),
+                         servo_angle=values.get('servo_angle'),
+                         is_moving=values.get('is_moving'),
+                         tip_sensor=values.get('tip_sensor'),
+                         pump=values.get('pump'))
+
     @catch_exception
     def get_position(self):
         """
         Get Current uArm position (x,y,z)
         :return: Float Array. Returns an array of the format [x, y, z] of the robots current location
         """
+        if self.shadow is not None:
+            cached = self.shadow.get('position')
+            if cached is not None:
+                return list(cached)
         serial_id, response = self.send_and_receive(protocol.GET_COOR)
         if response is None:
             printf("No Message response {}".format(serial_id), ERROR)
             return None
-        if response[0] == protocol.OK:
-            x = float(response[1][1:])
-            y = float(response[2][1:])
-            z = float(response[3][1:])
-            coordinate = [x, y, z]
-            return coordinate
-        return None
+        coordinate = self.parse_position(response)
+        if self.shadow is not None:
+            self.shadow.put('position', coordinate)
+        return coordinate
 
     @catch_exception
     def get_is_moving(self):
@@ -421,12 +1541,40 @@ class UArm(object):
         if response is None:
             printf("No Message response {}".format(serial_id), ERROR)
             return None
-        if response[0] == protocol.OK:
-            v = int(response[1][1:])
-            if v == 0:
-                return False
-            elif v == 1:
-                return True
+        return self.parse_is_moving(response)
+
+    @catch_exception
+    def get_pump(self):
+        """
+        Get Pump Status
+        :return: True On/ False Off
+        """
+        if self.shadow is not None:
+            cached = self.shadow.get('pump')
+            if cached is not None:
+                return cached
+        serial_id, response = self.send_and_receive(protocol.GET_PUMP)
+        if response is None:
+            printf("No Message response {}".format(serial_id))
+            return
+        pump = self.parse_pump(response)
+        if self.shadow is not None:
+            self.shadow.put('pump', pump)
+        return pump
+
+    @catch_exception
+    def get_simulation(self, x, y, z):
+        """
+        Ask the firmware whether the position (x,y,z) is reachable, uArm will not move.
+        For many points, use ``pyuarm.reachability`` instead.
+        :return: True reachable/ False unreachable
+        """
+        command = protocol.GET_SIMULATION.format(str(round(x, 2)), str(round(y, 2)), str(round(z, 2)))
+        serial_id, response = self.send_and_receive(command)
+        if response is None:
+            printf("No Message response {}".format(serial_id))
+            return
+        return self.parse_simulation(response)
 
     @catch_exception
     def get_polar(self):
@@ -438,14 +1586,7 @@ class UArm(object):
         if response is None:
             printf("No Message response {}".format(serial_id))
             return
-        if response[0] == protocol.OK:
-            stretch = float(response[1][1:])
-            rotation = float(response[2][1:])
-            height = float(response[3][1:])
-            polar = [rotation, stretch, height]
-            return polar
-        else:
-            return None
+        return self.parse_polar(response)
 
     @catch_exception
     def get_tip_sensor(self):
@@ -457,13 +1598,7 @@ class UArm(object):
         if response is None:
             printf("No Message response {}".format(serial_id))
             return
-        if response[0] == protocol.OK:
-            if response[1] == 'V0':
-                return True
-            elif response[1] == 'V1':
-                return False
-        else:
-            return None
+        return self.parse_tip_sensor(response)
 
     @catch_exception
     def get_servo_angle(self, servo_num=None):
@@ -473,28 +1608,21 @@ class UArm(object):
         , servo 1, servo 2, servo 3
         :return:
         """
-        serial_id, response = self.send_and_receive(protocol.GET_SERVO_ANGLE)
-        if response is None:
-            printf("No Message response {}".format(serial_id))
-            return None
-        if response[0] == protocol.OK:
-            servo_0 = float(response[1][1:])
-            servo_1 = float(response[2][1:])
-            servo_2 = float(response[3][1:])
-            servo_3 = float(response[4][1:])
-            servo_array = [servo_0, servo_1, servo_2, servo_3]
-            if servo_num is None:
-                return servo_array
-            elif servo_num == 0:
-                return servo_0
-            elif servo_num == 1:
-                return servo_1
-            elif servo_num == 2:
-                return servo_2
-            elif servo_num == 3:
-                return servo_3
-        else:
-            return None
+        servo_array = None
+        if self.shadow is not None:
+            servo_array = self.shadow.get('servo_angle')
+        if servo_array is None:
+            serial_id, response = self.send_and_receive(protocol.GET_SERVO_ANGLE)
+            if response is None:
+                printf("No Message response {}".format(serial_id))
+                return None
+            servo_array = self.parse_servo_angle(response)
+            if self.shadow is not None:
+                self.shadow.put('servo_angle', servo_array)
+        if servo_array is None or servo_num is None:
+            return servo_array
+        elif 0 <= servo_num <= 3:
+            return servo_array[servo_num]
 
     @catch_exception
     def get_analog(self, pin):
@@ -503,9 +1631,9 @@ class UArm(object):
         :param pin:
         :return:
         """
+        cmd = protocol.GET_ANALOG.format(pin)
+        serial_id, response = self.send_and_receive(cmd)
         try:
-            cmd = protocol.GET_ANALOG.format(pin)
-            serial_id, response = self.send_and_receive(cmd)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return
@@ -525,9 +1653,9 @@ class UArm(object):
         :param pin:
         :return:
         """
+        cmd = protocol.GET_DIGITAL.format(pin)
+        serial_id, response = self.send_and_receive(cmd)
         try:
-            cmd = protocol.GET_DIGITAL.format(pin)
-            serial_id, response = self.send_and_receive(cmd)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return
@@ -550,9 +1678,9 @@ class UArm(object):
         :param data_type: EEPROM_DATA_TYPE_FLOAT, EEPROM_DATA_TYPE_INTEGER, EEPROM_DATA_TYPE_BYTE
         :return:
         """
+        cmd = protocol.GET_EEPROM.format(address, data_type)
+        serial_id, response = self.send_and_receive(cmd)
         try:
-            cmd = protocol.GET_EEPROM.format(address, data_type)
-            serial_id, response = self.send_and_receive(cmd)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return
@@ -569,6 +1697,32 @@ class UArm(object):
 
 # -------------------------------------------------------- Set Commands -----------------------------------------------#
 
+    @catch_exception
+    def stop_moving(self, flush=False, wait=False):
+        """
+        Stop uArm immediately. The stop command skips all queued commands.
+        Protocol Cmd: ``protocol.STOP_MOVING``
+        :param flush: if True, drop all pending bulk commands (moves) which are not sent yet
+        :param wait: if True, will block the thread, until get response or timeout
+        :return: succeed True or Failed False
+        """
+        if flush:
+            self.flush_send_queue(protocol.PRIORITY_BULK)
+        if self.shadow is not None:
+            self.shadow.move(None)
+        command = protocol.STOP_MOVING
+        if wait:
+            serial_id, response = self.send_and_receive(command, priority=protocol.PRIORITY_EMERGENCY)
+            if response is None:
+                printf("No Message response {}".format(serial_id))
+                return None
+            if response[0] == protocol.OK:
+                return True
+            else:
+                return False
+        else:
+            self.send_msg(command)
+
     @catch_exception
     def set_position(self, x=None, y=None, z=None, speed=300, relative=False, wait=False):
         """
@@ -578,8 +1732,8 @@ class UArm(object):
         :param z:
         :param speed:
         :param relative
-        :param wait: if True, will block the thread, until get response or timeout
-        :return:
+        :param wait: if True, will block the thread, until uArm stops moving
+        :return: if wait, True if moved, False if rejected, None if the ack was lost
         """
         if relative:
             if x is None:
@@ -601,15 +1755,29 @@ class UArm(object):
             z = str(round(z, 2))
             s = str(round(speed, 2))
             command = protocol.SET_POSITION.format(x, y, z, s)
+        if self.shadow is not None:
+            self.shadow.move([float(x), float(y), float(z)], relative=relative)
         if wait:
             serial_id, response = self.send_and_receive(command)
+            if response is not None and response[0] != protocol.OK:
+                # the move was rejected, nothing to wait for
+                if self.shadow is not None:
+                    self.shadow.move(None)
+                return False
+            # a lost ack does not mean a lost move, wait until uArm stands still either way
+            motion_start = time.time()
             while self.get_is_moving():
                 time.sleep(0.05)
-            if response is not None:
-                if response[0] == protocol.OK:
-                    return True
-                else:
-                    return False
+            if response is None:
+                printf("No Message response {}".format(command))
+                if self.shadow is not None:
+                    self.shadow.move(None)
+                return None
+            if self.tracer is not None:
+                self.tracer.motion(serial_id, command, motion_start)
+            if self.shadow is not None and self.shadow.commanded_position is not None:
+                self.shadow.put('position', self.shadow.commanded_position)
+            return True
         else:
             self.send_msg(command)
 
@@ -622,8 +1790,16 @@ class UArm(object):
         :return: succeed True or Failed False
         """
         command = protocol.SET_PUMP.format(1 if on else 0)
+        if self.shadow is not None:
+            if self.shadow.is_commanded('pump', bool(on)):
+                return True if wait else None
+            self.shadow.command('pump', bool(on))
+            self.shadow.invalidate('pump')
         if wait:
             serial_id, response = self.send_and_receive(command)
+            if response is None or response[0] != protocol.OK:
+                if self.shadow is not None:
+                    self.shadow.command('pump', None)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return None
@@ -643,8 +1819,15 @@ class UArm(object):
         :return:
         """
         command = protocol.SET_GRIPPER.format(1 if catch else 0)
+        if self.shadow is not None:
+            if self.shadow.is_commanded('gripper', bool(catch)):
+                return True if wait else None
+            self.shadow.command('gripper', bool(catch))
         if wait:
             serial_id, response = self.send_and_receive(command)
+            if response is None or response[0] != protocol.OK:
+                if self.shadow is not None:
+                    self.shadow.command('gripper', None)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return None
@@ -675,8 +1858,19 @@ class UArm(object):
         :return: succeed True or Failed False
         """
         command = protocol.SET_SERVO_ANGLE.format(str(servo_number), str(angle))
+        if self.shadow is not None:
+            if servo_number == protocol.SERVO_HAND:
+                if self.shadow.is_commanded('wrist', float(angle)):
+                    return True if wait else None
+                self.shadow.command('wrist', float(angle))
+                self.shadow.invalidate('servo_angle')
+            else:
+                self.shadow.move(None)
         if wait:
             serial_id, response = self.send_and_receive(command)
+            if (response is None or response[0] != protocol.OK) and self.shadow is not None \
+                    and servo_number == protocol.SERVO_HAND:
+                self.shadow.command('wrist', None)
             if response is None:
                 printf("No Message response {}".format(serial_id))
                 return None
@@ -720,12 +1914,19 @@ class UArm(object):
         :return: succeed True or Failed False
         """
         if servo_number is not None:
+            if self.shadow is not None and self.shadow.is_commanded('attach{}'.format(servo_number), True):
+                return True if wait else None
             if move:
                 pos = self.get_position()
                 self.set_position(pos[0], pos[1], pos[2], speed=100)
             command = protocol.ATTACH_SERVO.format(servo_number)
+            self.__attached[servo_number] = True
+            if self.shadow is not None:
+                self.shadow.command('attach{}'.format(servo_number), True)
             if wait:
                 serial_id, response = self.send_and_receive(command)
+                if (response is None or not response[0].startswith(protocol.OK)) and self.shadow is not None:
+                    self.shadow.command('attach{}'.format(servo_number), None)
                 if response is None:
                     printf("No Message response {}".format(serial_id))
                     return None
@@ -736,22 +1937,21 @@ class UArm(object):
             else:
                 self.send_msg(command)
         else:
-            if move:
-                pos = self.get_position()
-                self.set_position(pos[0], pos[1], pos[2], speed=0)
-            if wait:
-                if self.set_servo_attach(servo_number=0, move=False, wait=True) \
-                        and self.set_servo_attach(servo_number=1, move=False, wait=True) \
-                        and self.set_servo_attach(servo_number=2, move=False, wait=True) \
-                        and self.set_servo_attach(servo_number=3, move=False, wait=True):
-                    return True
-                else:
-                    return False
-            else:
-                self.set_servo_attach(servo_number=0, move=False)
-                self.set_servo_attach(servo_number=1, move=False)
-                self.set_servo_attach(servo_number=2, move=False)
-                self.set_servo_attach(servo_number=3, move=False)
+            if self.shadow is not None and all(self.shadow.commanded('attach{}'.format(n)) for n in range(4)):
+                self.shadow.suppressed += 1
+                return True if wait else None
+            with self.batch(wait=wait) as b:
+                if move:
+                    pos = self.get_position()
+                    b.send(protocol.SET_POSITION.format(str(round(pos[0], 2)), str(round(pos[1], 2)),
+                                                        str(round(pos[2], 2)), 0))
+                for n in range(4):
+                    b.send(protocol.ATTACH_SERVO.format(n))
+                    self.__attached[n] = True
+            if self.shadow is not None:
+                for n in range(4):
+                    self.shadow.command('attach{}'.format(n), True if b.success is not False else None)
+            return b.success
 
     @catch_exception
     def set_servo_detach(self, servo_number=None, wait=False):
@@ -762,6 +1962,12 @@ class UArm(object):
         :param wait: if True, will block the thread, until get response or timeout
         :return: succeed True or Failed False
         """
+        for n in (range(4) if servo_number is None else [servo_number]):
+            self.__attached[n] = False
+        if self.shadow is not None:
+            self.shadow.move(None)
+            for n in (range(4) if servo_number is None else [servo_number]):
+                self.shadow.command('attach{}'.format(n), False)
         if servo_number is not None:
             command = protocol.DETACH_SERVO.format(servo_number)
             if wait:
@@ -776,19 +1982,10 @@ class UArm(object):
             else:
                 self.send_msg(command)
         else:
-            if wait:
-                if self.set_servo_detach(servo_number=0, wait=True) \
-                        and self.set_servo_detach(servo_number=1, wait=True) \
-                        and self.set_servo_detach(servo_number=2, wait=True) \
-                        and self.set_servo_detach(servo_number=3, wait=True):
-                    return True
-                else:
-                    return False
-            else:
-                self.set_servo_detach(servo_number=0)
-                self.set_servo_detach(servo_number=1)
-                self.set_servo_detach(servo_number=2)
-                self.set_servo_detach(servo_number=3)
+            with self.batch(wait=wait) as b:
+                for n in range(4):
+                    b.send(protocol.DETACH_SERVO.format(n))
+            return b.success
 
     @catch_exception
     def set_polar_coordinate(self, rotation, stretch, height, speed=100, wait=False):
@@ -798,18 +1995,27 @@ class UArm(object):
         :param stretch:
         :param height:
         :param speed:
-        :param wait: if True, will block the thread, until get response or timeout
-        :return:
+        :param wait: if True, will block the thread, until uArm stops moving
+        :return: if wait, True if moved, False if rejected, None if the ack was lost
         """
         rotation = str(round(rotation, 2))
         stretch = str(round(stretch, 2))
         height = str(round(height, 2))
         speed = str(round(speed, 2))
         command = protocol.SET_POLAR.format(stretch, rotation, height, speed)
+        if self.shadow is not None:
+            self.shadow.move(None)
         if wait:
-            self.send_msg(command)
+            serial_id, response = self.send_and_receive(command)
+            if response is not None and response[0] != protocol.OK:
+                return False
+            # a lost ack does not mean a lost move, wait until uArm stands still either way
             while self.get_is_moving():
                 time.sleep(0.05)
+            if response is None:
+                printf("No Message response {}".format(command))
+                return None
+            return True
         # if wait:
         #     serial_id, response = self.send_and_receive(command)
         #     if response is None:
@@ -833,6 +2039,7 @@ class UArm(object):
         :return
         """
         interval = str(round(interval, 2))
+        self.__report_interval = interval if float(interval) > 0 else None
         command = protocol.SET_REPORT_POSITION.format(interval)
         if wait:
             serial_id, response = self.send_and_receive(command)
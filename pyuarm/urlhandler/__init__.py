@@ -0,0 +1,12 @@
+"""
+pyuarm.urlhandler
+pyserial URL handlers of pyuarm, so ``UArm(port_name='<scheme>://...')`` works like a serial device:
+
+- ``uarmd://<socket path>[?arm=<serial number or port>]``, an arm shared by the ``uarmcli serve`` daemon,
+  see ``pyuarm.server``
+- ``emu://[?delay=<seconds>]``, the in process firmware emulator, see ``pyuarm.emulator``
+"""
+import serial
+
+if 'pyuarm.urlhandler' not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append('pyuarm.urlhandler')
@@ -0,0 +1,117 @@
+"""
+pyuarm.urlhandler.protocol_emu
+In memory serial port connected to the firmware emulator, see ``pyuarm.emulator``.
+URL format: ``emu://[?delay=<seconds per command>]``.
+"""
+from __future__ import absolute_import
+import threading
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError, Timeout, to_bytes
+from ..emulator import Emulator
+
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+SCHEME = 'emu'
+TERMINATOR = b'\r\n'
+
+
+class Serial(SerialBase):
+    """
+    Bytes written are split in lines and fed to the emulator, its replies are read back.
+    """
+
+    def open(self):
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        delay = self.from_url(self.portstr)
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._cond = threading.Condition()
+        self._cancel = False
+        self.emulator = Emulator(self._receive, delay)
+        self.is_open = True
+        self.emulator.start()
+
+    def from_url(self, url):
+        """
+        :return: Float, seconds of processing per command
+        """
+        parts = urlparse.urlsplit(url)
+        if parts.scheme != SCHEME:
+            raise SerialException('expected "{}://[?delay=<seconds>]", got {!r}'.format(SCHEME, url))
+        delay = 0.0
+        try:
+            for option, values in urlparse.parse_qs(parts.query, True).items():
+                if option == 'delay':
+                    delay = float(values[0])
+                else:
+                    raise ValueError('unknown option: {!r}'.format(option))
+        except ValueError as e:
+            raise SerialException('{}: {}'.format(url, e))
+        return delay
+
+    def _reconfigure_port(self):
+        pass
+
+    def _receive(self, line):
+        with self._cond:
+            self._rx += line.encode('utf-8') + TERMINATOR
+            self._cond.notify_all()
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.emulator.stop()
+            self.cancel_read()
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        return len(self._rx)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        timeout = Timeout(self._timeout)
+        with self._cond:
+            while len(self._rx) < size and not self._cancel and self.is_open:
+                remaining = None if timeout.is_infinite else timeout.time_left()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._cancel = False
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+        return data
+
+    def cancel_read(self):
+        with self._cond:
+            self._cancel = True
+            self._cond.notify_all()
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        data = to_bytes(data)
+        self._tx += data
+        while b'\n' in self._tx:
+            line, _, rest = bytes(self._tx).partition(b'\n')
+            self._tx = bytearray(rest)
+            self.emulator.feed(line.decode('utf-8', 'replace'))
+        return len(data)
+
+    def reset_input_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._cond:
+            del self._rx[:]
+
+    def reset_output_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        del self._tx[:]
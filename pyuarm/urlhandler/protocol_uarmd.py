@@ -0,0 +1,86 @@
+"""
+pyuarm.urlhandler.protocol_uarmd
+Client side of the ``uarmcli serve`` daemon, see ``pyuarm.server``.
+URL format: ``uarmd://<socket path>[?arm=<serial number or port>]``, eg. ``uarmd:///tmp/uarmd.sock?arm=A600CRJU``.
+Without ``arm`` the first arm of the daemon is used.
+"""
+from __future__ import absolute_import
+import socket
+from serial.serialutil import SerialException
+from serial.urlhandler import protocol_socket
+
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+SCHEME = 'uarmd'
+CONNECT_TIMEOUT = 5
+
+
+def from_url(url):
+    """
+    :param url: String ``uarmd://`` URL
+    :return: (socket path, arm), arm is None if not given
+    :raise ValueError: if not a ``uarmd://`` URL
+    """
+    parts = urlparse.urlsplit(url)
+    if parts.scheme != SCHEME:
+        raise ValueError('expected "{}://<socket path>[?arm=<serial>]", got {!r}'.format(SCHEME, url))
+    path = parts.netloc + parts.path
+    if not path:
+        raise ValueError('no socket path in {!r}'.format(url))
+    arm = None
+    for option, values in urlparse.parse_qs(parts.query, True).items():
+        if option == 'arm':
+            arm = values[0] or None
+        else:
+            raise ValueError('unknown option: {!r}'.format(option))
+    return path, arm
+
+
+class Serial(protocol_socket.Serial):
+    """
+    Serial port over the Unix domain socket of the daemon. The daemon answers ``@1`` once the arm is
+    selected, then the line protocol is the same as on the serial port.
+    """
+
+    def open(self):
+        self.logger = None
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        self._socket = None
+        try:
+            path, arm = from_url(self.portstr)
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(CONNECT_TIMEOUT)
+            self._socket.connect(path)
+        except Exception as msg:
+            if self._socket is not None:
+                self._socket.close()
+            self._socket = None
+            raise SerialException("Could not open port {}: {}".format(self.portstr, msg))
+        self._socket.setblocking(False)
+        self.is_open = True
+        self.reset_input_buffer()
+        # select the arm after the input is flushed, so the ``@1`` answer is not lost
+        self.write('!hello{}\n'.format(' ' + arm if arm else '').encode())
+
+    def close(self):
+        if self.is_open:
+            if self._socket:
+                try:
+                    self._socket.shutdown(socket.SHUT_RDWR)
+                    self._socket.close()
+                except (IOError, OSError):
+                    pass
+                self._socket = None
+            self.is_open = False
+
+    def from_url(self, url):
+        try:
+            return from_url(url)
+        except ValueError as e:
+            raise SerialException(str(e))
@@ -0,0 +1,87 @@
+"""
+Fixtures shared by the tests, every arm is backed by the firmware emulator, see ``pyuarm.emulator``.
+"""
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyuarm.uarm import UArm  # noqa: E402
+from pyuarm.emulator import Emulator  # noqa: E402
+
+
+def emulator_of(arm):
+    """
+    :return: Emulator behind an ``emu://`` arm
+    """
+    return arm._UArm__serial.emulator
+
+
+def open_arm(url='emu://', **kwargs):
+    arm = UArm(port_name=url, **kwargs)
+    arm.connect()
+    assert arm.connection_state
+    return arm
+
+
+@pytest.fixture
+def arm():
+    arm = open_arm()
+    yield arm
+    arm.disconnect()
+
+
+@pytest.fixture
+def emulator(arm):
+    return emulator_of(arm)
+
+
+@pytest.fixture
+def tcp_emulator():
+    """
+    An emulator behind a local TCP server, like ser2net.
+    :return: (``socket://`` URL, list of the emulators of the sessions)
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    emulators = []
+
+    def session(conn):
+        emulator = Emulator(lambda line: conn.sendall(line.encode() + b'\r\n'))
+        emulators.append(emulator)
+        emulator.start()
+        buf = b''
+        while True:
+            try:
+                data = conn.recv(4096)
+            except (IOError, OSError):
+                break
+            if not data:
+                break
+            buf += data
+            while b'\n' in buf:
+                line, buf = buf.split(b'\n', 1)
+                emulator.feed(line.decode())
+        emulator.stop()
+        conn.close()
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except (IOError, OSError):
+                break
+            t = threading.Thread(target=session, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    t = threading.Thread(target=accept)
+    t.daemon = True
+    t.start()
+    yield 'socket://127.0.0.1:{}'.format(server.getsockname()[1]), emulators
+    server.close()
@@ -0,0 +1,48 @@
+from pyuarm import protocol
+from conftest import emulator_of, open_arm
+
+
+def test_batch_collects_replies(arm, emulator):
+    with arm.batch() as b:
+        for servo in range(4):
+            b.send(protocol.ATTACH_SERVO.format(servo))
+    assert b.success is True
+    assert len(b.responses) == 4
+    assert list(emulator.history)[-4:] == [protocol.ATTACH_SERVO.format(s) for s in range(4)]
+
+
+def test_batch_reports_failure(arm):
+    with arm.batch() as b:
+        b.send(protocol.ATTACH_SERVO.format(0))
+        b.send('G0 X')
+    assert b.success is False
+    assert b.responses[0][0] == protocol.OK
+
+
+def test_batch_without_wait(arm):
+    with arm.batch(wait=False) as b:
+        b.send(protocol.GET_COOR)
+    assert b.success is None
+    assert b.futures[0].result() is not None
+
+
+def test_batch_larger_than_the_buffer_is_split():
+    arm = open_arm('emu://?delay=0.002')
+    emulator = emulator_of(arm)
+    try:
+        commands = ['G0 X{} Y150 Z150 F1000'.format(100 + i) for i in range(20)]
+        with arm.batch() as b:
+            for cmd in commands:
+                b.send(cmd)
+        assert b.success is True
+        assert emulator.overflows == 0
+        assert emulator.buffered_max <= protocol.RX_BUFFER_SIZE
+        assert list(emulator.history)[-20:] == commands
+    finally:
+        arm.disconnect()
+
+
+def test_submit_many_order(arm, emulator):
+    futures = arm.submit_many([protocol.GET_COOR, protocol.GET_IS_MOVE, protocol.GET_PUMP])
+    assert [f.result()[0] for f in futures] == [protocol.OK] * 3
+    assert list(emulator.history)[-3:] == [protocol.GET_COOR, protocol.GET_IS_MOVE, protocol.GET_PUMP]
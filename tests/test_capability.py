@@ -0,0 +1,71 @@
+import pytest
+
+from pyuarm import capability, protocol
+from pyuarm.capability import lookup, is_complete
+from pyuarm.uarm import UArmUnsupportedException
+from pyuarm import emulator as emulator_module
+from conftest import open_arm
+
+
+def test_lookup_known_line():
+    caps = lookup('2.2.1')
+    assert caps.known
+    assert caps.supports('G0') and caps.supports('P220')
+    assert not caps.supports('G9999')
+
+
+def test_lookup_newer_minor_uses_older_line():
+    assert lookup('2.5.0').commands == capability.FIRMWARE_2_2
+
+
+@pytest.mark.parametrize('version', [None, 'garbage', '3.1.0', '2.1.0', '1.7'])
+def test_lookup_unknown_versions_are_unchecked(version):
+    caps = lookup(version)
+    assert not caps.known
+    assert caps.supports('G0') and caps.supports('P220') and caps.supports('G9999')
+
+
+def test_is_complete():
+    assert is_complete('P220', ['OK', 'X0.00', 'Y150.00', 'Z150.00'])
+    assert not is_complete('P220', ['OK', 'X0.00', 'Y150.00'])
+    assert is_complete('P220', ['E20'])
+    assert is_complete('P220', [])
+    assert is_complete('G0', ['OK'])
+    assert not is_complete('P200', ['OK'])
+
+
+def test_unsupported_command_fails_fast(arm, emulator):
+    received = emulator.received
+    with pytest.raises(UArmUnsupportedException):
+        arm.submit('G9999')
+    with pytest.raises(UArmUnsupportedException):
+        arm.send_msg('G9999')
+    assert emulator.received == received
+
+
+def test_truncated_reply_is_retried(arm, emulator):
+    original = emulator.handle
+    replies = []
+
+    def handle(cmd):
+        reply = original(cmd)
+        if cmd == protocol.GET_COOR and not replies:
+            replies.append(reply)
+            return reply.rsplit(' ', 1)[0]
+        return reply
+
+    emulator.handle = handle
+    assert arm.get_position() == [0.0, 150.0, 150.0]
+    assert replies
+    assert arm.metrics()['malformed_lines'] == 1
+
+
+def test_unknown_firmware_is_not_restricted(monkeypatch):
+    monkeypatch.setattr(emulator_module, 'FIRMWARE_VERSION', '3.1.0')
+    arm = open_arm()
+    try:
+        assert not arm.capabilities.known
+        assert arm.set_position(100, 100, 100, wait=True) is True
+        assert arm.get_position() == [100.0, 100.0, 100.0]
+    finally:
+        arm.disconnect()
@@ -0,0 +1,51 @@
+import threading
+
+from pyuarm import protocol
+from conftest import emulator_of, open_arm
+
+
+def run_threads(target, count):
+    results = [None] * count
+
+    def worker(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_queries_share_one_request():
+    arm = open_arm('emu://?delay=0.05')
+    emulator = emulator_of(arm)
+    try:
+        results = run_threads(arm.get_position, 8)
+        assert results == [[0.0, 150.0, 150.0]] * 8
+        sent = list(emulator.history).count(protocol.GET_COOR)
+        assert sent < 8
+        assert arm.coalesced_count == 8 - sent
+        assert arm.metrics()['coalesced'] == arm.coalesced_count
+    finally:
+        arm.disconnect()
+
+
+def test_moves_are_not_coalesced():
+    arm = open_arm('emu://?delay=0.02')
+    emulator = emulator_of(arm)
+    try:
+        move = 'G0 X100 Y100 Z100 F1000'
+        run_threads(lambda: arm.send_and_receive(move), 4)
+        assert list(emulator.history).count(move) == 4
+        assert arm.coalesced_count == 0
+    finally:
+        arm.disconnect()
+
+
+def test_sequential_queries_are_sent_each_time(arm, emulator):
+    for _ in range(3):
+        arm.get_position()
+    assert list(emulator.history).count(protocol.GET_COOR) == 3
+    assert arm.coalesced_count == 0
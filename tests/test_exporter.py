@@ -0,0 +1,128 @@
+import os
+import re
+import socket
+
+import pytest
+
+from pyuarm import exporter
+from pyuarm.exporter import MetricsExporter, render
+from conftest import open_arm
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*)\} (\S+)$')
+SUFFIXES = {'counter': ('_total',), 'gauge': ('',), 'summary': ('', '_count', '_sum')}
+
+
+def parse(text):
+    """
+    Check the OpenMetrics text structure.
+    :return: dict of family name to (type, list of (sample name, labels, value))
+    """
+    assert text.endswith('# EOF\n')
+    families = {}
+    family = None
+    for line in text.splitlines()[:-1]:
+        if line.startswith('# TYPE '):
+            name, kind = line.split(' ')[2:]
+            assert name not in families, 'family {} declared twice'.format(name)
+            family = families[name] = (kind, [])
+            current = name
+        elif line.startswith('# HELP '):
+            assert line.split(' ')[2] == current
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            kind = family[0]
+            assert name in [current + s for s in SUFFIXES[kind]], line
+            float(value)
+            family[1].append((name, labels, value))
+    return families
+
+
+def test_render_openmetrics(arm):
+    arm.get_position()
+    arm.get_position()
+    families = parse(render([arm]))
+    assert families['uarm_up'][1][0][2] == '1'
+    assert families['uarm_bytes_out'][0] == 'counter'
+    assert families['uarm_bytes_out'][1][0][0] == 'uarm_bytes_out_total'
+    assert 'port="emu://"' in families['uarm_up'][1][0][1]
+    sent = [s for s in families['uarm_commands_sent'][1] if 'command="P220"' in s[1]]
+    assert sent[0][2] == '2'
+    rtt = [s for s in families['uarm_command_rtt_seconds'][1] if 'command="P220"' in s[1]]
+    assert set(s[0] for s in rtt) == {'uarm_command_rtt_seconds', 'uarm_command_rtt_seconds_count',
+                                      'uarm_command_rtt_seconds_sum'}
+    assert [s[2] for s in rtt if s[0].endswith('_count')] == ['2']
+    assert 'uarm_command_timeout_seconds' in families
+
+
+def test_render_several_arms_keeps_families_together():
+    arms = [open_arm(), open_arm('emu://?delay=0.001')]
+    try:
+        for arm in arms:
+            arm.get_position()
+        families = parse(render(arms))
+        assert len(families['uarm_up'][1]) == 2
+        assert len(families['uarm_writes'][1]) == 2
+    finally:
+        for arm in arms:
+            arm.disconnect()
+
+
+def test_label_escaping():
+    assert exporter._labels([('port', 'a"b\\c\nd')]) == '{port="a\\"b\\\\c\\nd"}'
+
+
+def test_http_scrape(arm):
+    with MetricsExporter(arm, port=0) as metrics:
+        response = urlopen('http://127.0.0.1:{}/metrics'.format(metrics.port))
+        assert response.headers['Content-Type'] == exporter.CONTENT_TYPE
+        families = parse(response.read().decode('utf-8'))
+        assert 'uarm_up' in families
+
+
+def unix_scrape(path):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    client.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+    data = b''
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    client.close()
+    return data.decode('utf-8').split('\r\n\r\n', 1)[1]
+
+
+def test_unix_socket_is_not_taken_over(arm, tmpdir):
+    path = str(tmpdir.join('metrics.sock'))
+    with MetricsExporter(arm, unix_socket=path):
+        assert 'uarm_up' in parse(unix_scrape(path))
+        with pytest.raises(IOError):
+            MetricsExporter(arm, unix_socket=path).start()
+        assert 'uarm_up' in parse(unix_scrape(path))
+    assert not os.path.exists(path)
+
+
+def test_unix_socket_keeps_other_files(arm, tmpdir):
+    path = tmpdir.join('metrics.sock')
+    path.write('data')
+    with pytest.raises(IOError):
+        MetricsExporter(arm, unix_socket=str(path)).start()
+    assert path.read() == 'data'
+
+
+def test_stop_leaves_a_newer_socket(arm, tmpdir):
+    path = str(tmpdir.join('metrics.sock'))
+    first = MetricsExporter(arm, unix_socket=path)
+    first.start()
+    os.remove(path)
+    with MetricsExporter(arm, unix_socket=path):
+        first.stop()
+        assert 'uarm_up' in parse(unix_scrape(path))
@@ -0,0 +1,95 @@
+import functools
+
+from pyuarm import protocol
+from pyuarm.future import UArmFuture
+from conftest import emulator_of, open_arm
+from test_threaded import wait_for
+
+
+def test_callback_after_completion_runs_at_once():
+    future = UArmFuture(1, protocol.GET_COOR)
+    future.set_result(['OK'])
+    seen = []
+    future.add_done_callback(seen.append)
+    assert seen == [future]
+
+
+def test_then_after_completion():
+    future = UArmFuture(1, protocol.GET_COOR)
+    future.set_result(['OK', 'X1'])
+    derived = future.then(lambda result: result[1])
+    assert derived.done()
+    assert derived.result(0) == 'X1'
+
+
+def test_then_chains():
+    future = UArmFuture(1, protocol.GET_COOR)
+    derived = future.then(len).then(lambda n: n * 2)
+    assert not derived.done()
+    future.set_result(['OK', 'X1', 'Y2'])
+    assert derived.result(0) == 6
+
+
+def test_cancel_propagates_to_the_parent():
+    future = UArmFuture(1, protocol.GET_COOR)
+    middle = future.then(len)
+    derived = middle.then(str)
+    assert derived.cancel()
+    assert middle.cancelled()
+    assert future.cancelled()
+
+
+def test_cancel_and_expire_pass_down():
+    future = UArmFuture(1, protocol.GET_COOR)
+    derived = future.then(len)
+    future.cancel()
+    assert derived.cancelled()
+    future = UArmFuture(2, protocol.GET_COOR)
+    derived = future.then(len)
+    future.expire()
+    assert derived.expired()
+
+
+def test_derived_future_done_does_not_cancel_the_parent():
+    future = UArmFuture(1, protocol.GET_COOR)
+    derived = future.then(len)
+    future.set_result(['OK'])
+    assert derived.result(0) == 1
+    assert not future.cancelled()
+
+
+def test_exception_in_then_finishes_with_none():
+    future = UArmFuture(1, protocol.GET_COOR)
+    derived = future.then(lambda result: result[5])
+    partial = future.then(functools.partial(int, base=16))
+    future.set_result(['OK'])
+    assert derived.done() and derived.result(0) is None
+    assert partial.done() and partial.result(0) is None
+
+
+def test_exception_in_a_callback_does_not_stop_the_others():
+    future = UArmFuture(1, protocol.GET_COOR)
+    seen = []
+
+    def fail(f):
+        raise ValueError('callback')
+
+    future.add_done_callback(fail)
+    future.add_done_callback(seen.append)
+    assert future.set_result(['OK'])
+    assert seen == [future]
+    assert future.result(0) == ['OK']
+    future.add_done_callback(fail)
+
+
+def test_cancelled_derived_future_skips_the_command():
+    arm = open_arm('emu://?delay=0.05')
+    try:
+        emulator = emulator_of(arm)
+        futures = [arm.submit(protocol.GET_IS_MOVE) for _ in range(8)]
+        derived = arm.submit(protocol.GET_COOR).then(lambda result: result[0])
+        assert derived.cancel()
+        assert wait_for(lambda: all(f.done() for f in futures), 2)
+        assert protocol.GET_COOR not in emulator.history
+    finally:
+        arm.disconnect()
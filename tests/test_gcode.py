@@ -0,0 +1,58 @@
+import io
+
+from pyuarm import protocol
+from pyuarm.gcode import clean_line, read_gcode
+from conftest import emulator_of, open_arm
+
+PROGRAM = u"""; square
+G0 X150 Y0 Z100 F3000 (start)
+G0 X150 Y50 Z100 F3000
+
+G0 X100 Y50 Z100 F3000 ; corner
+G0 X100 Y0 Z100 F3000
+"""
+
+
+def test_clean_line():
+    assert clean_line('G0 X1 (move) Y2 ; comment') == 'G0 X1 Y2'
+    assert clean_line('  ; only a comment') == ''
+    assert clean_line('G0 X1 (unterminated') == 'G0 X1'
+
+
+def test_read_gcode_skips_comments_and_blank_lines(tmpdir):
+    path = tmpdir.join('square.gcode')
+    path.write(PROGRAM)
+    lines = list(read_gcode(str(path)))
+    assert lines == list(read_gcode(io.StringIO(PROGRAM)))
+    assert lines[0] == 'G0 X150 Y0 Z100 F3000'
+    assert len(lines) == 4
+
+
+def test_stream_keeps_firmware_buffer_below_its_size():
+    arm = open_arm('emu://?delay=0.002')
+    emulator = emulator_of(arm)
+    try:
+        lines = ['G0 X{} Y{} Z100 F3000'.format(100 + i % 50, i % 80) for i in range(200)]
+        stats = arm.stream_gcode(lines)
+        assert stats['lines'] == 200
+        assert stats['errors'] == 0
+        assert stats['timeouts'] == 0
+        assert stats['stall_time'] > 0
+        assert emulator.overflows == 0
+        assert 0 < emulator.buffered_max <= protocol.RX_BUFFER_SIZE
+        # more than one line in flight, the buffer is kept full
+        assert emulator.buffered_max > len('#1 ' + lines[0]) + 2
+        assert emulator.position == [149.0, 39.0, 100.0]
+    finally:
+        arm.disconnect()
+
+
+def test_stream_smaller_buffer():
+    arm = open_arm('emu://?delay=0.002')
+    emulator = emulator_of(arm)
+    try:
+        stats = arm.stream_gcode(['G0 X100 Y100 Z100 F3000'] * 20, rx_buffer_size=32)
+        assert stats['lines'] == 20
+        assert emulator.buffered_max <= 32
+    finally:
+        arm.disconnect()
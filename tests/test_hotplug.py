@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from pyuarm import hotplug, protocol
+from conftest import emulator_of, open_arm
+from test_threaded import wait_for
+
+URL = 'emu://?delay=0.05'
+
+
+@pytest.fixture
+def slow_arm():
+    arm = open_arm(URL)
+    yield arm
+    arm.disconnect()
+
+
+def unplug(arm):
+    arm._UArm__serial.close()
+    assert wait_for(lambda: not arm.connection_state)
+
+
+def submit_burst(arm, count=10):
+    # the window holds a few of them, the others wait in the send queue
+    return [arm.submit(protocol.GET_IS_MOVE, timeout=0.3) for _ in range(count)]
+
+
+def test_reconnect_keeps_the_queue_and_resyncs(slow_arm, monkeypatch):
+    plugged = {'device': None}
+    monkeypatch.setattr(hotplug, 'find_device', lambda serial_number, device=None: plugged['device'])
+    slow_arm.set_servo_attach(0, move=False, wait=True)
+    slow_arm.set_servo_detach(1, wait=True)
+    slow_arm.set_report_position(0.5, wait=True)
+    monitor = slow_arm.enable_hotplug(0.01)
+    futures = submit_burst(slow_arm)
+    unplug(slow_arm)
+    time.sleep(0.1)
+    # nothing is aborted while the cable is out, the queued commands wait for the reconnect
+    assert not any(f.expired() for f in futures)
+    queued = [f for f in futures if not f.done()]
+    assert len(queued) >= 5
+    plugged['device'] = URL
+    assert wait_for(lambda: monitor.reconnects == 1, 2)
+    assert monitor.last_downtime > 0.05
+    assert slow_arm.connection_state
+    emulator = emulator_of(slow_arm)
+    assert wait_for(lambda: len(emulator.history) >= 3)
+    assert list(emulator.history)[:3] == ['M201 N0', 'M202 N1', 'M120 V0.5']
+    assert wait_for(lambda: all(f.done() for f in futures), 2)
+    # the tail of the queue was never written to the old link, it goes out on the new one
+    for future in queued[-5:]:
+        assert future.result(0)[0] == protocol.OK
+    assert slow_arm.get_position() is not None
+
+
+def test_lines_on_the_wire_expire_after_reconnect(slow_arm, monkeypatch):
+    monkeypatch.setattr(hotplug, 'find_device', lambda serial_number, device=None: URL)
+    slow_arm.enable_hotplug(0.01)
+    emulator = emulator_of(slow_arm)
+    futures = submit_burst(slow_arm, 3)
+    assert wait_for(lambda: emulator.received >= 3)
+    unplug(slow_arm)
+    assert wait_for(lambda: slow_arm.hotplug.reconnects == 1, 2)
+    assert wait_for(lambda: all(f.done() for f in futures), 1)
+    assert any(f.expired() for f in futures)
+    assert not slow_arm.rx_window.used
+
+
+def test_without_hotplug_pending_futures_are_aborted(slow_arm):
+    futures = submit_burst(slow_arm)
+    unplug(slow_arm)
+    assert wait_for(lambda: all(f.done() for f in futures), 0.5)
+    assert futures[-1].cancelled()
@@ -0,0 +1,105 @@
+import errno
+import os
+import threading
+
+import pytest
+
+from pyuarm import latency
+from conftest import open_arm
+from test_threaded import open_reader, wait_for
+
+
+class CountingEvent(threading.Event):
+    def __init__(self):
+        threading.Event.__init__(self)
+        self.count = 0
+
+    def set(self):
+        self.count += 1
+        threading.Event.set(self)
+
+
+def test_line_event_is_set_on_every_line():
+    event = CountingEvent()
+    reader, lines = open_reader(line_event=event)
+    try:
+        for i in range(10):
+            reader.protocol.write_line('#{} P220'.format(i))
+        assert wait_for(lambda: len(lines) == 11)  # @1 and 10 replies
+        assert event.count == 11
+    finally:
+        reader.close()
+
+
+def test_low_latency_arm_wakes_on_lines():
+    arm = open_arm('emu://', low_latency=True)
+    try:
+        assert arm.get_position() == [0.0, 150.0, 150.0]
+        assert arm.low_latency_report is not None
+        futures = [arm.get_position_async() for _ in range(50)]
+        assert all(f.result() is not None for f in futures)
+    finally:
+        arm.disconnect()
+
+
+@pytest.fixture
+def pty_device():
+    master, slave = os.openpty()
+    yield os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+def test_enable_on_a_tty_without_serial_driver(pty_device):
+    saved, warnings = latency.enable_low_latency(pty_device)
+    assert saved == {'low_latency': None, 'latency_timer': None}
+    assert len(warnings) == 1 and 'does not support' in warnings[0]
+    latency.restore_low_latency(pty_device, saved)
+    assert latency.get_low_latency(pty_device) is None
+    assert latency.read_latency_timer(pty_device) is None
+
+
+def test_enable_without_permission(monkeypatch, tmpdir):
+    device = tmpdir.join('ttyUSB0')
+    device.write('')
+    sysfs = tmpdir.mkdir('sysfs')
+    sysfs.mkdir('ttyUSB0').join('latency_timer').write('16\n')
+    monkeypatch.setattr(latency, 'USB_SERIAL_SYSFS', str(sysfs))
+
+    def denied(*args):
+        raise OSError(errno.EPERM, 'Operation not permitted')
+
+    monkeypatch.setattr(latency, 'set_low_latency', denied)
+    monkeypatch.setattr(latency, 'write_latency_timer', lambda device, ms: denied())
+    saved, warnings = latency.enable_low_latency(str(device))
+    assert saved == {'low_latency': None, 'latency_timer': None}
+    assert len(warnings) == 2
+    assert 'ASYNC_LOW_LATENCY' in warnings[0]
+    assert 'from 16 ms' in warnings[1]
+
+
+def test_enable_and_restore_latency_timer(monkeypatch, tmpdir):
+    device = tmpdir.join('ttyUSB0')
+    device.write('')
+    timer = tmpdir.mkdir('sysfs').mkdir('ttyUSB0').join('latency_timer')
+    timer.write('16\n')
+    monkeypatch.setattr(latency, 'USB_SERIAL_SYSFS', str(tmpdir.join('sysfs')))
+    monkeypatch.setattr(latency, 'set_low_latency', lambda device, on=True: None)
+    saved, warnings = latency.enable_low_latency(str(device))
+    assert timer.read() == '1'
+    assert saved['latency_timer'] == 16
+    latency.restore_low_latency(str(device), saved)
+    assert timer.read() == '16'
+    # the device is gone, restoring must not raise
+    timer.remove()
+    latency.restore_low_latency(str(device), saved)
+
+
+def test_recommendations():
+    report = {'device': '/dev/ttyUSB0', 'latency_timer': 16, 'low_latency': False,
+              'rtt': {'lost': 0, 'rtt': {'p50': 0.016}}, 'throughput': {'lost': 0, 'utilization': 0.9},
+              'malformed_lines': 0}
+    advices = latency.recommendations(report)
+    assert len(advices) == 3
+    report.update(latency_timer=1, low_latency=True, rtt={'lost': 0, 'rtt': {'p50': 0.0004}})
+    assert latency.recommendations(report) == []
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+from serial.tools import list_ports
+from serial.tools.list_ports_common import ListPortInfo
+
+from pyuarm.tools import list_uarms
+from pyuarm.tools.list_uarms import UArmPort, discover_uarms, get_port_property
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text + '\n')
+
+
+def add_tty(root, name, vid, pid, serial=None, bus='1-1'):
+    """
+    Lay out a ttyUSB device like the kernel does, ``/sys/class/tty/<name>/device`` links into the USB tree.
+    """
+    usb_device = os.path.join(str(root), 'devices', bus)
+    interface = os.path.join(usb_device, bus + ':1.0')
+    os.makedirs(os.path.join(interface, name))
+    write(os.path.join(usb_device, 'idVendor'), vid)
+    write(os.path.join(usb_device, 'idProduct'), pid)
+    if serial is not None:
+        write(os.path.join(usb_device, 'serial'), serial)
+    tty = os.path.join(str(root), 'class', 'tty', name)
+    os.makedirs(tty)
+    os.symlink(os.path.join(interface, name), os.path.join(tty, 'device'))
+
+
+@pytest.fixture
+def sysfs(tmpdir, monkeypatch):
+    tty = tmpdir.join('class', 'tty')
+    tty.ensure(dir=True)
+    dev = tmpdir.mkdir('dev')
+    monkeypatch.setattr(list_uarms, 'SYSFS_TTY', str(tty))
+    monkeypatch.setattr(list_uarms, 'DEV_DIR', str(dev))
+    list_uarms.invalidate_cache()
+    yield tmpdir
+    list_uarms.invalidate_cache()
+
+
+def test_sysfs_ports(sysfs):
+    add_tty(sysfs, 'ttyUSB0', '0403', '6001', 'A600CRJU', bus='1-1.2')
+    add_tty(sysfs, 'ttyUSB1', '10c4', 'ea60', 'OTHER', bus='1-1.3')
+    add_tty(sysfs, 'ttyUSB2', '0403', '6001', bus='1-1.4')
+    sysfs.join('class', 'tty', 'ttyS0').ensure(dir=True)
+    dev = list_uarms.DEV_DIR
+    assert list_uarms._sysfs_ports() == [
+        UArmPort(os.path.join(dev, 'ttyUSB0'), 'A600CRJU', '1-1.2:1.0'),
+        UArmPort(os.path.join(dev, 'ttyUSB2'), None, '1-1.4:1.0')]
+
+
+def count_scans(monkeypatch):
+    scans = []
+
+    def scan():
+        scans.append(1)
+        return [UArmPort('/dev/ttyUSB0', 'A600CRJU', '1-1:1.0')]
+
+    monkeypatch.setattr(list_uarms, '_sysfs_ports', scan)
+    monkeypatch.setattr(list_uarms, '_comports', scan)
+    return scans
+
+
+def test_cache_follows_dev_mtime(sysfs, monkeypatch):
+    scans = count_scans(monkeypatch)
+    dev = list_uarms.DEV_DIR
+    assert discover_uarms() == discover_uarms()
+    assert len(scans) == 1
+    # a device node appears
+    open(os.path.join(dev, 'ttyUSB0'), 'w').close()
+    os.utime(dev, (1, 1))
+    discover_uarms()
+    discover_uarms()
+    assert len(scans) == 2
+    discover_uarms(refresh=True)
+    assert len(scans) == 3
+    list_uarms.invalidate_cache()
+    discover_uarms()
+    assert len(scans) == 4
+
+
+def test_cache_is_bypassed_without_dev(sysfs, monkeypatch):
+    scans = count_scans(monkeypatch)
+    monkeypatch.setattr(list_uarms, 'DEV_DIR', str(sysfs.join('missing')))
+    discover_uarms()
+    discover_uarms()
+    assert len(scans) == 2
+
+
+def test_cached_list_is_a_copy(sysfs, monkeypatch):
+    count_scans(monkeypatch)
+    discover_uarms().append(None)
+    assert None not in discover_uarms()
+
+
+def test_get_port_property_returns_list_ports_entries(monkeypatch):
+    entry = ListPortInfo('/dev/ttyUSB9')
+    entry.serial_number = 'A600CRJU'
+    monkeypatch.setattr(list_ports, 'comports', lambda: [entry])
+    monkeypatch.setattr(list_uarms, '_sysfs_port_info', lambda port_name: None)
+    port = get_port_property('/dev/ttyUSB9')
+    assert port is entry
+    assert (port.device, port.serial_number) == ('/dev/ttyUSB9', 'A600CRJU')
+    assert get_port_property('/dev/ttyUSB8') is None
+
+
+def test_get_port_property_of_a_non_usb_device():
+    # not a USB serial device, read from sysfs nothing, scanned as before
+    assert list_uarms._sysfs_port_info('/dev/tty0') is None
+    assert list_uarms._sysfs_port_info('/dev/does-not-exist') is None
@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+
+from pyuarm import log
+
+
+@pytest.fixture
+def logger(monkeypatch):
+    """
+    A separate logger installed as the pyuarm logger, the global state is restored afterwards.
+    """
+    monkeypatch.setattr(log, 'listeners', [])
+    monkeypatch.setattr(log, 'stream_logger', None)
+    monkeypatch.setattr(log, 'pylogger', None)
+    logger = logging.getLogger('pyuarm.test_log')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+def test_close_logger_stops_listeners_and_closes_handlers(logger, tmpdir):
+    path = str(tmpdir.join('pyuarm.log'))
+    file_handler = logging.FileHandler(path)
+    stream_handler = logging.StreamHandler()
+    logger.addHandler(log._async_handler(file_handler))
+    logger.addHandler(log._async_handler(stream_handler))
+    listeners = list(log.listeners)
+    log.init_logger(logger)
+    for n in range(100):
+        log.printf("line {}", log.INFO, n)
+    log.close_logger()
+    assert not log.listeners
+    assert all(listener._thread is None for listener in listeners)
+    assert file_handler.stream is None
+    assert logger.handlers == []
+    with open(path) as f:
+        lines = f.read().splitlines()
+    # every record queued before close is written
+    assert lines[-1] == 'line 99'
+    assert len(lines) == 101
+
+
+def test_close_logger_closes_the_stream_logger(logger, monkeypatch):
+    closed = []
+    log.init_logger(logger)
+    log.set_stream_logger()
+    stream_logger = log.stream_logger
+    assert stream_logger.handlers
+    wrapped = log.listeners[0].handlers[0]
+    monkeypatch.setattr(wrapped, 'close', lambda: closed.append(wrapped))
+    log.close_logger()
+    assert stream_logger.handlers == []
+    assert closed == [wrapped]
+    assert not log.listeners
+
+
+def test_stop_listeners_keeps_the_handlers_open(logger, tmpdir):
+    file_handler = logging.FileHandler(str(tmpdir.join('pyuarm.log')))
+    logger.addHandler(log._async_handler(file_handler))
+    log.stop_listeners()
+    assert not log.listeners
+    assert file_handler.stream is not None
+    file_handler.close()
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from pyuarm.metrics import Histogram, RTOEstimator, SUB_BUCKETS, UNIT, MIN_RTO
+
+# the middle of a bucket is at most half a bucket away, a bucket is 1 / SUB_BUCKETS of its lowest value
+MAX_ERROR = 1.0 / SUB_BUCKETS
+
+
+def record_us(histogram, values):
+    for value in values:
+        histogram.record((value + 0.5) * UNIT)
+
+
+def test_small_values_are_exact():
+    for value in range(2 * SUB_BUCKETS):
+        assert Histogram.bucket(value) == (0, value)
+
+
+@pytest.mark.parametrize('value,bucket', [
+    (32, (1, 16)), (33, (1, 16)), (34, (1, 17)), (63, (1, 31)),
+    (64, (2, 16)), (67, (2, 16)), (68, (2, 17)), (1 << 20, (16, 16))])
+def test_bucket_boundaries(value, bucket):
+    assert Histogram.bucket(value) == bucket
+
+
+def test_buckets_cover_every_value_in_order():
+    previous = None
+    for value in range(100000):
+        shift, mantissa = Histogram.bucket(value)
+        assert mantissa << shift <= value < (mantissa + 1) << shift
+        assert SUB_BUCKETS <= mantissa < 2 * SUB_BUCKETS or shift == 0
+        assert previous is None or (shift, mantissa) >= previous
+        previous = (shift, mantissa)
+
+
+def test_percentile_error_bound():
+    rng = random.Random(1)
+    values = [int(10 ** rng.uniform(0, 7)) for _ in range(5000)]  # 1 us to 10 s
+    histogram = Histogram()
+    record_us(histogram, values)
+    values.sort()
+    for p in (1, 10, 25, 50, 75, 90, 99, 99.9, 100):
+        exact = values[max(int(-(-p * len(values) // 100)), 1) - 1]
+        estimate = histogram.percentile(p) / UNIT
+        assert abs(estimate - exact) <= exact * MAX_ERROR + 0.5, p
+
+
+def test_percentile_is_clamped_to_the_recorded_range():
+    histogram = Histogram()
+    record_us(histogram, [1000])
+    for p in (0, 50, 100):
+        assert histogram.percentile(p) == pytest.approx(1000 * UNIT)
+
+
+def test_empty_and_negative():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+    assert histogram.snapshot()['p99'] is None
+    histogram.record(-1)
+    assert histogram.snapshot()['min'] == 0
+    assert histogram.percentile(50) == 0
+
+
+def test_snapshot():
+    histogram = Histogram()
+    record_us(histogram, [10, 20, 30])
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 3
+    assert snapshot['min'] == pytest.approx(10 * UNIT)
+    assert snapshot['max'] == pytest.approx(30 * UNIT)
+    assert snapshot['mean'] == pytest.approx(20 * UNIT)
+    assert snapshot['p50'] == pytest.approx(20 * UNIT)
+
+
+def test_rto_custom_bounds():
+    rto = RTOEstimator(floor=0.2, ceiling=0.5)
+    rto.update('P220', 0.01)
+    assert rto.rto('P220') == 0.2
+    rto.update('M200', 1)
+    assert rto.rto('M200') == 0.5
+    rto.backoff('P220')
+    assert rto.rto('P220') == 0.4
+    rto.backoff('P220')
+    assert rto.rto('P220') == 0.5
+
+
+def test_rto_backoff_of_an_unknown_command():
+    rto = RTOEstimator()
+    rto.backoff('P220')
+    assert rto.rto('P220') is None
+    assert rto.snapshot() == {}
+
+
+def test_rto_sample_ends_the_backoff():
+    rto = RTOEstimator()
+    rto.update('P220', 0.1)
+    learned = rto.rto('P220')
+    for _ in range(3):
+        rto.backoff('P220')
+    assert rto.rto('P220') == pytest.approx(8 * learned)
+    rto.update('P220', 0.1)
+    assert rto.rto('P220') < learned
+    assert rto.rto('P220') >= MIN_RTO
+
+
+def test_rto_global_srtt():
+    rto = RTOEstimator()
+    assert rto.srtt is None
+    rto.update('P220', 0.1)
+    rto.update('M200', 0.2)
+    assert rto.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    rto.reset()
+    assert rto.srtt is None
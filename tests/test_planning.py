@@ -0,0 +1,93 @@
+from __future__ import division
+import math
+
+import pytest
+
+from pyuarm import planning
+from pyuarm.planning import blend_corners, junction_speed, segment_timing, plan, to_commands
+
+SQUARE = [[0, 0, 0], [100, 0, 0], [100, 100, 0], [0, 100, 0]]
+
+
+def distance(a, b):
+    return math.sqrt(sum((a[k] - b[k]) ** 2 for k in range(3)))
+
+
+@pytest.mark.parametrize('tolerance', [0.1, 1.0, 5.0])
+def test_blend_stays_within_tolerance(tolerance):
+    points = blend_corners(SQUARE, tolerance)
+    for corner in SQUARE[1:-1]:
+        assert corner not in points
+        closest = min(distance(p, corner) for p in points)
+        assert closest == pytest.approx(tolerance, rel=1e-6)
+    assert points[0] == [0.0, 0.0, 0.0] and points[-1] == [0.0, 100.0, 0.0]
+
+
+def test_blend_uses_at_most_half_a_segment():
+    points = blend_corners([[0, 0, 0], [2, 0, 0], [2, 2, 0]], tolerance=100)
+    assert points[1] == pytest.approx([1.0, 0.0, 0.0])
+    assert points[-2] == pytest.approx([2.0, 1.0, 0.0])
+
+
+def test_blend_drops_collinear_and_duplicate_points():
+    assert blend_corners([[0, 0, 0], [0, 0, 0], [1, 0, 0], [2, 0, 0]]) == [[0.0, 0.0, 0.0], [2.0, 0.0, 0.0]]
+    assert blend_corners(SQUARE, 0) == [[float(c) for c in p] for p in SQUARE]
+
+
+def test_junction_speed():
+    x, y = [1, 0, 0], [0, 1, 0]
+    assert junction_speed(x, [-1, 0, 0], 1000, 1) == 0.0
+    assert junction_speed(x, x, 1000, 1) == float('inf')
+    right = junction_speed(x, y, 1000, 1)
+    shallow = junction_speed(x, [math.cos(0.3), math.sin(0.3), 0], 1000, 1)
+    assert 0 < right < shallow
+    # sqrt(a * d * sin(theta / 2) / (1 - sin(theta / 2))), theta = 90 degrees
+    s = math.sqrt(0.5)
+    assert right == pytest.approx(math.sqrt(1000 * s / (1 - s)))
+
+
+def test_segment_timing():
+    # long enough to cruise: accelerate, cruise, brake
+    peak, duration = segment_timing(100, 0, 0, 50, 1000)
+    assert peak == 50
+    assert duration == pytest.approx(50 / 1000 * 2 + (100 - 2 * 50 ** 2 / 2000) / 50)
+    # too short to reach the speed: triangle profile
+    peak, duration = segment_timing(1, 0, 0, 50, 1000)
+    assert peak == pytest.approx(math.sqrt(1000))
+    assert duration == pytest.approx(2 * peak / 1000)
+
+
+def test_plan_starts_and_ends_at_rest():
+    segments = plan(SQUARE, speed=80)
+    assert segments[0].entry_speed == 0
+    assert segments[-1].exit_speed == 0
+    assert all(s.peak_speed <= 80 + 1e-9 for s in segments)
+    for a, b in zip(segments, segments[1:]):
+        assert a.exit_speed == b.entry_speed
+        assert b.finish_time > a.finish_time
+    assert segments[-1].finish_time == pytest.approx(sum(s.duration for s in segments))
+
+
+def test_plan_reversal_stops():
+    segments = plan([[0, 0, 0], [50, 0, 0], [0, 0, 0]], tolerance=0)
+    assert len(segments) == 2
+    assert segments[0].exit_speed == 0
+
+
+def test_plan_s_curve_is_slower():
+    trapezoid = plan(SQUARE)[-1].finish_time
+    assert plan(SQUARE, profile=planning.PROFILE_S_CURVE)[-1].finish_time > trapezoid
+    with pytest.raises(ValueError):
+        plan(SQUARE, profile='nope')
+    assert plan([[0, 0, 0]]) == []
+
+
+def test_to_commands():
+    segments = plan([[0, 0, 0], [100, 0, 0]], speed=50)
+    assert to_commands(segments) == ['G0 X100.0 Y0.0 Z0.0 F{}'.format(round(100 / segments[0].duration, 2))]
+
+
+def test_follow_path(arm, emulator):
+    segments = arm.follow_path([[100, 150, 150], [100, 100, 150]], speed=200, wait=True)
+    assert segments[-1].end == [100.0, 100.0, 150.0]
+    assert emulator.position == [100.0, 100.0, 150.0]
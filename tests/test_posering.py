@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+import pytest
+
+from pyuarm import posering
+from pyuarm.posering import PositionRing, PositionReader
+
+pytestmark = pytest.mark.skipif(posering.shared_memory is None, reason='needs multiprocessing.shared_memory')
+
+
+def ring_name(tag):
+    return 'uarm-pos-test-{}-{}'.format(os.getpid(), tag)
+
+
+def test_latest_and_history():
+    ring = PositionRing(ring_name('history'), capacity=4)
+    try:
+        with PositionReader(name=ring.name) as reader:
+            assert reader.latest() is None
+            for n in range(6):
+                ring.publish([n, n + 1, n + 2], timestamp=100 + n)
+            assert reader.count == 6
+            assert reader.latest() == (105, 5, 6, 7)
+            assert [s[1] for s in reader.history()] == [2, 3, 4, 5]
+            assert [s[1] for s in reader.history(2)] == [4, 5]
+    finally:
+        ring.close()
+
+
+def test_slot_being_written_is_not_read():
+    ring = PositionRing(ring_name('torn'), capacity=4)
+    try:
+        ring.publish([1, 2, 3], timestamp=1)
+        shm = posering._attach(ring.name)
+        try:
+            # sample 0 half written again, as the writer leaves it between its two stores
+            posering.SEQ.pack_into(shm.buf, posering.SLOTS_OFFSET, 1)
+            with PositionReader(name=ring.name) as reader:
+                assert reader.latest() is None
+                assert reader.history() == []
+        finally:
+            shm.close()
+    finally:
+        ring.close()
+
+
+def test_concurrent_reader_never_sees_a_torn_sample():
+    ring = PositionRing(ring_name('concurrent'), capacity=8)
+    done = threading.Event()
+
+    def writer():
+        n = 0
+        while not done.is_set():
+            ring.publish([n, n, n], timestamp=n)
+            n += 1
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        with PositionReader(name=ring.name) as reader:
+            end = time.time() + 0.5
+            while time.time() < end:
+                for sample in reader.history() + [reader.latest()]:
+                    if sample is not None:
+                        assert sample[0] == sample[1] == sample[2] == sample[3]
+    finally:
+        done.set()
+        t.join()
+        ring.close()
+
+
+def test_reader_rejects_other_segments():
+    ring = PositionRing(ring_name('magic'))
+    try:
+        shm = posering._attach(ring.name)
+        shm.buf[:4] = b'XXXX'
+        shm.close()
+        with pytest.raises(IOError):
+            PositionReader(name=ring.name)
+    finally:
+        ring.close()
+
+
+def test_arm_publishes_reports(arm, emulator):
+    ring = arm.enable_position_ring(name=ring_name('arm'))
+    with PositionReader(name=ring.name) as reader:
+        arm.set_report_position(0.01)
+        arm.set_position(120, 80, 60, wait=True)
+        end = time.time() + 1
+        while time.time() < end and (reader.latest() is None or reader.latest()[1:] != (120, 80, 60)):
+            time.sleep(0.01)
+        assert reader.latest()[1:] == (120.0, 80.0, 60.0)
+        arm.close_report_position()
+    arm.disable_position_ring()
+    with pytest.raises((IOError, OSError)):
+        PositionReader(name=ring.name)
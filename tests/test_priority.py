@@ -0,0 +1,84 @@
+import time
+
+from pyuarm import protocol
+from pyuarm.uarm import UArm
+from conftest import emulator_of, open_arm
+
+MOVE = 'G0 X100 Y100 Z100 F1000'
+
+
+def codes(emulator):
+    return [line.split(' ')[0] for line in emulator.history]
+
+
+def test_command_priority():
+    assert UArm.command_priority(protocol.STOP_MOVING) == protocol.PRIORITY_EMERGENCY
+    assert UArm.command_priority(protocol.DETACH_SERVO.format(0)) == protocol.PRIORITY_EMERGENCY
+    assert UArm.command_priority(MOVE) == protocol.PRIORITY_BULK
+    assert UArm.command_priority(protocol.GET_COOR) == protocol.PRIORITY_CONTROL
+
+
+def test_control_overtakes_queued_moves():
+    arm = open_arm('emu://?delay=0.01')
+    emulator = emulator_of(arm)
+    try:
+        moves = [arm.submit(MOVE) for _ in range(15)]
+        query = arm.submit(protocol.GET_COOR)
+        assert query.result() is not None
+        sent = codes(emulator)
+        # only the moves already in the firmware buffer are ahead of the query
+        assert sent.index('P220') < 5
+        assert all(m.result() is not None for m in moves)
+        assert codes(emulator).count('G0') == 15
+    finally:
+        arm.disconnect()
+
+
+def test_stop_skips_the_queue():
+    arm = open_arm('emu://?delay=0.05')
+    emulator = emulator_of(arm)
+    try:
+        moves = [arm.submit(MOVE) for _ in range(15)]
+        time.sleep(0.02)
+        # the moves fill the window up to the reserve
+        assert arm.rx_window.used > protocol.RX_BUFFER_SIZE - protocol.EMERGENCY_RESERVE - len(MOVE)
+        start = time.time()
+        arm.stop_moving(flush=True)
+        # written at once, into the reserve, not after a reply made room
+        assert time.time() - start < 0.02
+        time.sleep(0.3)
+        sent = codes(emulator)
+        assert sent.index(protocol.STOP_MOVING) < 5
+        assert emulator.overflows == 0
+        cancelled = [m for m in moves if m.cancelled()]
+        assert len(cancelled) > 5
+        assert sent.count('G0') == 15 - len(cancelled)
+    finally:
+        arm.disconnect()
+
+
+def test_detach_group_waits_for_room():
+    arm = open_arm('emu://?delay=0.02')
+    emulator = emulator_of(arm)
+    try:
+        for _ in range(10):
+            arm.submit(MOVE)
+        time.sleep(0.02)
+        futures = arm.submit_many([protocol.DETACH_SERVO.format(n) for n in range(4)])
+        assert all(f.result() == [protocol.OK] for f in futures)
+        assert emulator.overflows == 0
+    finally:
+        arm.disconnect()
+
+
+def test_flush_keeps_control_lane():
+    arm = open_arm('emu://?delay=0.01')
+    try:
+        moves = [arm.submit(MOVE) for _ in range(10)]
+        query = arm.submit(protocol.GET_COOR)
+        dropped = arm.flush_send_queue(protocol.PRIORITY_BULK)
+        assert dropped > 0
+        assert query.result() is not None
+        assert len([m for m in moves if m.cancelled()]) == dropped
+    finally:
+        arm.disconnect()
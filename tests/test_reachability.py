@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pyuarm import protocol, reachability  # noqa: E402
+from pyuarm.reachability import ReachabilityMap, sweep  # noqa: E402
+from conftest import emulator_of  # noqa: E402
+
+BOUNDS = ((-20, 20), (0, 20), (0, 10))
+STEP = 10
+
+
+def reachable(x, y, z):
+    return x >= 0
+
+
+@pytest.fixture
+def workspace(arm, emulator, monkeypatch):
+    """
+    The emulator answers the simulation queries like ``reachable``.
+    """
+    handle = emulator.handle
+
+    def simulate(cmd):
+        if cmd.startswith(protocol.GET_SIMULATION.split(' ')[0]):
+            params = dict((p[0], float(p[1:])) for p in cmd.split(' ')[1:4])
+            return 'OK V1' if reachable(params['X'], params['Y'], params['Z']) else 'OK V0'
+        return handle(cmd)
+
+    monkeypatch.setattr(emulator, 'handle', simulate)
+    return arm
+
+
+def simulations(arm):
+    return [cmd for cmd in emulator_of(arm).history if cmd.startswith('M222')]
+
+
+def expected_volume():
+    xs, ys, zs = ReachabilityMap.grid(BOUNDS, STEP)
+    return np.array([[[reachable(x, y, z) for z in zs] for y in ys] for x in xs])
+
+
+def test_sweep_in_chunks(workspace, monkeypatch):
+    monkeypatch.setattr(reachability, 'SWEEP_CHUNK', 4)
+    progress = []
+    reach_map = sweep(workspace, BOUNDS, STEP, progress=lambda done, total: progress.append((done, total)))
+    total = 5 * 3 * 2
+    assert progress == [(n, total) for n in range(4, total, 4)] + [(total, total)]
+    assert len(simulations(workspace)) == total
+    assert reach_map.missing == 0
+    assert reach_map.hardware_version == '3.2.1'
+    assert np.array_equal(reach_map.volume, expected_volume())
+    assert tuple(reach_map.origin) == (-20, 0, 0)
+
+
+def test_lost_points_are_asked_again(workspace):
+    workspace.timeout = 0.2
+    emulator_of(workspace).drop_replies = 2
+    reach_map = sweep(workspace, BOUNDS, STEP)
+    assert reach_map.missing == 0
+    assert len(simulations(workspace)) == 30 + 2
+    assert np.array_equal(reach_map.volume, expected_volume())
+
+
+def test_points_without_an_answer_are_missing(workspace, emulator, monkeypatch):
+    handle = emulator.handle
+    monkeypatch.setattr(emulator, 'handle', lambda cmd: 'E20' if cmd.startswith('M222 X20.0 Y20.0') else handle(cmd))
+    workspace.max_retries = 0
+    reach_map = sweep(workspace, BOUNDS, STEP)
+    assert reach_map.missing == 2
+    assert not reach_map.volume[4, 2].any()
+    with pytest.raises(ValueError):
+        reach_map.save()
+
+
+def test_save_and_load(tmpdir):
+    volume = np.random.RandomState(1).rand(5, 3, 7) > 0.5
+    reach_map = ReachabilityMap(volume, (-20, 0, 0), STEP, '3.2.1')
+    path = reach_map.save(str(tmpdir.join('map.npz')))
+    loaded = ReachabilityMap.load(path)
+    assert np.array_equal(loaded.volume, volume)
+    assert tuple(loaded.origin) == (-20, 0, 0)
+    assert loaded.step == STEP
+    assert loaded.hardware_version == '3.2.1'
+
+
+def test_default_path(tmpdir, monkeypatch):
+    monkeypatch.setattr(reachability, 'ua_dir', str(tmpdir))
+    volume = np.ones((2, 2, 2), dtype=bool)
+    assert ReachabilityMap(volume, (0, 0, 0), STEP, '3.2.1').save() == str(tmpdir.join('reachability-3.2.1.npz'))
+    path = ReachabilityMap(volume, (0, 0, 0), STEP).save()
+    assert os.path.basename(path) == 'reachability.npz'
+    assert ReachabilityMap.load().hardware_version is None
+    assert ReachabilityMap.load(hardware_version='3.2.1').hardware_version == '3.2.1'
+
+
+def test_trilinear_interpolation():
+    volume = np.zeros((2, 2, 2), dtype=bool)
+    volume[1] = True
+    reach_map = ReachabilityMap(volume, (0, 0, 0), STEP)
+    assert reach_map.reachability([[0, 0, 0], [10, 10, 10], [2.5, 5, 5], [7.5, 0, 10]]) == \
+        pytest.approx([0, 1, 0.25, 0.75])
+    volume = np.zeros((2, 2, 2), dtype=bool)
+    volume[1, 1, 1] = True
+    reach_map = ReachabilityMap(volume, (0, 0, 0), STEP)
+    assert reach_map.reachability([5, 5, 5]) == pytest.approx([0.125])
+    assert reach_map.reachability([5, 10, 10]) == pytest.approx([0.5])
+
+
+def test_outside_the_grid_is_unreachable():
+    reach_map = ReachabilityMap(np.ones((3, 3, 3), dtype=bool), (0, 0, 0), STEP)
+    assert list(reach_map.is_reachable([[0, 0, 0], [20, 20, 20], [-0.1, 5, 5], [5, 5, 20.1]])) == \
+        [True, True, False, False]
+    assert list(reach_map.is_reachable([[10, 10, 10]], threshold=1.01)) == [False]
@@ -0,0 +1,48 @@
+import time
+
+from pyuarm import protocol
+
+MOVE = 'G0 X100 Y100 Z100 F1000'
+
+
+def learn(arm):
+    for _ in range(5):
+        assert arm.get_position() is not None
+
+
+def test_lost_query_reply_is_resent(arm, emulator):
+    learn(arm)
+    emulator.drop_replies = 1
+    assert arm.get_position() == [0.0, 150.0, 150.0]
+    commands = arm.metrics()['commands']['P220']
+    assert commands['retries'] == 1
+    assert commands['timeouts'] == 1
+    assert list(emulator.history).count(protocol.GET_COOR) == 7
+
+
+def test_retries_are_bounded(arm, emulator):
+    learn(arm)
+    arm.max_retries = 2
+    emulator.drop_replies = 10
+    assert arm.send_and_receive(protocol.GET_COOR) == (None, None)
+    assert arm.metrics()['commands']['P220']['retries'] == 2
+    assert list(emulator.history).count(protocol.GET_COOR) == 8
+
+
+def test_moves_are_not_resent(arm, emulator):
+    arm.timeout = 0.2
+    emulator.drop_replies = 1
+    assert arm.send_and_receive(MOVE) == (None, None)
+    assert list(emulator.history).count(MOVE) == 1
+    assert arm.metrics()['retries'] == 0
+
+
+def test_late_reply_is_dropped(arm, emulator):
+    learn(arm)
+    arm.max_retries = 0
+    emulator.delay = 0.2
+    assert arm.send_and_receive(protocol.GET_COOR) == (None, None)
+    emulator.delay = 0
+    time.sleep(0.3)
+    assert not arm.msg_buff
+    assert arm.get_position() is not None
@@ -0,0 +1,55 @@
+import os
+import socket
+import stat
+
+import pytest
+
+from pyuarm import server
+from pyuarm.server import UArmServer, UArmClient
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join('uarmd.sock'))
+
+
+def test_client_through_daemon(arm, path):
+    with UArmServer(arm, path):
+        assert stat.S_IMODE(os.stat(path).st_mode) == server.SOCKET_MODE
+        client = UArmClient(path)
+        client.connect()
+        try:
+            assert client.get_position() == [0.0, 150.0, 150.0]
+        finally:
+            client.disconnect()
+    assert not os.path.exists(path)
+
+
+def test_live_daemon_socket_is_kept(arm, path):
+    with UArmServer(arm, path):
+        with pytest.raises(IOError):
+            UArmServer(arm, path).start()
+        assert stat.S_ISSOCK(os.lstat(path).st_mode)
+
+
+def test_stale_socket_is_replaced(arm, path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    with UArmServer(arm, path):
+        assert stat.S_ISSOCK(os.lstat(path).st_mode)
+
+
+def test_other_files_are_kept(arm, path):
+    with open(path, 'w') as f:
+        f.write('data')
+    with pytest.raises(IOError):
+        UArmServer(arm, path).start()
+    assert open(path).read() == 'data'
+
+
+def test_default_socket(monkeypatch, tmpdir):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmpdir))
+    assert server.default_socket() == str(tmpdir.join('uarmd.sock'))
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    assert os.path.dirname(server.default_socket()) == server._private_directory()
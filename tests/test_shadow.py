@@ -0,0 +1,81 @@
+import time
+
+from pyuarm import protocol
+from pyuarm.shadow import UArmShadow
+
+
+def wait_for(condition, timeout=1):
+    end = time.time() + timeout
+    while time.time() < end and not condition():
+        time.sleep(0.01)
+    return condition()
+
+
+def test_cached_reads_expire():
+    shadow = UArmShadow(max_age=0.05)
+    shadow.put('position', [1, 2, 3])
+    assert shadow.get('position') == [1, 2, 3]
+    time.sleep(0.06)
+    assert shadow.get('position') is None
+    assert shadow.stats()['hits'] == 1 and shadow.stats()['misses'] == 1
+
+
+def test_commanded_states():
+    shadow = UArmShadow()
+    assert not shadow.is_commanded('pump', True)
+    shadow.command('pump', True)
+    assert shadow.is_commanded('pump', True)
+    assert not shadow.is_commanded('pump', False)
+    shadow.command('pump', None)
+    assert shadow.commanded('pump') is None
+    assert shadow.stats()['suppressed'] == 1
+
+
+def test_move_drops_pose_reads():
+    shadow = UArmShadow()
+    shadow.put('position', [1, 2, 3])
+    shadow.put('pump', True)
+    shadow.move([0, 150, 150])
+    shadow.move([1, 1, 1], relative=True)
+    assert shadow.commanded_position == [1, 151, 151]
+    assert shadow.get('position') is None
+    assert shadow.get('pump') is True
+
+
+def test_redundant_writes_are_skipped(arm, emulator):
+    arm.enable_shadow()
+    assert arm.set_pump(True, wait=True) is True
+    assert arm.set_pump(True, wait=True) is True
+    assert list(emulator.history).count(protocol.SET_PUMP.format(1)) == 1
+    assert arm.shadow.stats()['suppressed'] == 1
+
+
+def test_reset_updates_the_shadow(arm, emulator):
+    arm.enable_shadow()
+    arm.set_pump(True, wait=True)
+    arm.set_wrist(45, wait=True)
+    arm.get_pump()
+    arm.reset()
+    assert arm.shadow.commanded('pump') is False
+    assert arm.shadow.commanded('gripper') is False
+    assert arm.shadow.commanded('wrist') == 90.0
+    assert arm.shadow.get('pump') is None
+    assert wait_for(lambda: list(emulator.history)[-1] == protocol.SET_SERVO_ANGLE.format(protocol.SERVO_HAND, 90))
+    arm.set_pump(True, wait=True)
+    assert list(emulator.history).count(protocol.SET_PUMP.format(1)) == 2
+
+
+def test_reset_forgets_unacknowledged_states(arm, emulator):
+    arm.enable_shadow()
+    original = emulator.handle
+
+    def handle(cmd):
+        if cmd == protocol.SET_PUMP.format(0):
+            return 'E21'
+        return original(cmd)
+
+    # the firmware rejects the pump command of the reset batch
+    emulator.handle = handle
+    arm.reset()
+    assert wait_for(lambda: arm.shadow.commanded('pump') is None)
+    assert arm.shadow.commanded('gripper') is False
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from pyuarm import protocol
+from pyuarm.flow import RxWindow
+from conftest import emulator_of, open_arm
+
+
+def test_get_state(arm, emulator):
+    received = emulator.received
+    state = arm.get_state()
+    assert state.position == [0.0, 150.0, 150.0]
+    assert state.servo_angle == [90.0, 90.0, 90.0, 90.0]
+    assert state.is_moving is False
+    assert state.tip_sensor is not None
+    assert state.pump is not None
+    assert emulator.received - received == 5
+
+
+def test_get_state_fields(arm):
+    state = arm.get_state(['position'])
+    assert state.position == [0.0, 150.0, 150.0]
+    assert state.servo_angle is None
+    assert state.pump is None
+
+
+def test_get_state_unknown_field(arm):
+    with pytest.raises(ValueError):
+        arm.get_state(['position', 'nope'])
+
+
+def test_window_acquire_release():
+    window = RxWindow(64, reserve=0)
+    assert window.acquire(1, 40, 1)
+    assert not window.acquire(2, 40, 1, timeout=0)
+    assert window.release(1)
+    assert not window.release(1)
+    assert window.acquire(2, 40, 1, timeout=0)
+    assert window.used == 40 and len(window) == 1
+    window.clear()
+    assert window.used == 0
+
+
+def test_window_oversized_line_goes_alone():
+    window = RxWindow(64, reserve=0)
+    assert window.acquire(1, 100, 1, timeout=0)
+    assert not window.acquire(2, 1, 1, timeout=0)
+
+
+def test_window_lifetime_and_abort():
+    window = RxWindow(64, reserve=0)
+    assert window.acquire(1, 64, 0.05)
+    assert not window.acquire(2, 10, 1, abort=lambda: True)
+    start = time.time()
+    assert window.acquire(2, 10, 1, timeout=1)
+    assert time.time() - start < 0.5
+    assert window.used == 10
+
+
+def test_window_reserve_is_left_to_urgent_lines():
+    window = RxWindow(64, reserve=17)
+    assert window.acquire(1, 40, 1)
+    assert not window.acquire(2, 10, 1, timeout=0)
+    assert not window.acquire(2, 10, 1, limit=1000, timeout=0)
+    assert window.acquire(2, 17, 1, urgent=True, timeout=0)
+    assert window.used == 57
+    assert not window.acquire(3, 17, 1, urgent=True, timeout=0)
+
+
+def test_all_write_paths_share_the_window():
+    arm = open_arm('emu://?delay=0.002')
+    emulator = emulator_of(arm)
+    try:
+        def moves():
+            for i in range(50):
+                arm.set_position(i, 150, 150, speed=100)
+
+        def stream():
+            arm.stream_gcode(['G0 X{} Y150 Z150 F100'.format(i) for i in range(50)])
+
+        threads = [threading.Thread(target=moves), threading.Thread(target=stream)]
+        for t in threads:
+            t.start()
+        futures = [arm.submit(protocol.GET_COOR) for _ in range(50)]
+        assert all(f.result() is not None for f in futures)
+        for t in threads:
+            t.join()
+        time.sleep(0.2)
+        assert emulator.overflows == 0
+        assert emulator.buffered_max <= protocol.RX_BUFFER_SIZE
+        assert arm.rx_window.used == 0
+        assert arm.metrics()['rx_window'] == 0
+    finally:
+        arm.disconnect()
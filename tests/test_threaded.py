@@ -0,0 +1,45 @@
+import time
+
+from pyuarm import transport
+from pyuarm.threaded import UArmReaderThread, UArmSerial
+
+
+def open_reader(url='emu://', line_event=None):
+    port = transport.create(url)
+    port.open()
+    lines = []
+    reader = UArmReaderThread(port, UArmSerial, lines)
+    reader.line_event = line_event
+    reader.start()
+    reader.connect()
+    return reader, lines
+
+
+def wait_for(condition, timeout=1):
+    end = time.time() + timeout
+    while time.time() < end and not condition():
+        time.sleep(0.005)
+    return condition()
+
+
+def test_close_returns_promptly():
+    reader, lines = open_reader()
+    reader.write_window = 1
+    reader.protocol.write_line('#1 P220')
+    reader.protocol.write_line('#2 P220')
+    assert reader._flusher is not None
+    start = time.time()
+    reader.close()
+    assert time.time() - start < 1
+    assert not reader.is_alive()
+    assert wait_for(lambda: reader._flusher is None)
+
+
+def test_close_flushes_collected_writes():
+    reader, lines = open_reader()
+    emulator = reader.serial.emulator
+    reader.write_window = 1
+    reader.protocol.write_line('#1 P220')
+    reader.protocol.write_line('#2 P220')
+    reader.close()
+    assert wait_for(lambda: emulator.received == 2)
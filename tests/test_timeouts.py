@@ -0,0 +1,70 @@
+import pytest
+
+from pyuarm import protocol
+from pyuarm.metrics import RTOEstimator, MIN_RTO, MAX_RTO
+
+MOVE = 'G0 X100 Y100 Z100 F1000'
+
+
+def test_first_sample():
+    rto = RTOEstimator(floor=0)
+    assert rto.rto('P220') is None
+    rto.update('P220', 0.1)
+    e = rto.snapshot()['P220']
+    assert e['srtt'] == pytest.approx(0.1)
+    assert e['rttvar'] == pytest.approx(0.05)
+    assert e['rto'] == pytest.approx(0.1 + 4 * 0.05)
+    assert e['samples'] == 1
+
+
+def test_smoothing():
+    rto = RTOEstimator(floor=0)
+    rto.update('P220', 0.1)
+    rto.update('P220', 0.2)
+    e = rto.snapshot()['P220']
+    assert e['rttvar'] == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert e['srtt'] == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    assert e['rto'] == pytest.approx(e['srtt'] + 4 * e['rttvar'])
+
+
+def test_bounds_and_backoff():
+    rto = RTOEstimator()
+    rto.update('P220', 0.001)
+    assert rto.rto('P220') == MIN_RTO
+    rto.backoff('P220')
+    assert rto.rto('P220') == 2 * MIN_RTO
+    for _ in range(20):
+        rto.backoff('P220')
+    assert rto.rto('P220') == MAX_RTO
+    rto.update('P220', 0.001)
+    assert rto.rto('P220') < MAX_RTO
+    rto.reset()
+    assert rto.rto('P220') is None
+
+
+def test_command_timeout(arm):
+    arm.timeout = 2
+    assert arm.command_timeout(protocol.GET_COOR) == 2
+    for _ in range(5):
+        assert arm.get_position() is not None
+    assert arm.command_timeout(protocol.GET_COOR) == arm.rto.rto('P220')
+    assert arm.command_timeout(protocol.GET_COOR) < 2
+    assert 'P220' in arm.timeout_estimates()
+
+
+def test_adaptive_deadlines_only_for_queries(arm):
+    arm.timeout = 2
+    for _ in range(5):
+        assert arm.send_and_receive(MOVE)[1] is not None
+    assert arm.rto.rto('G0') is not None
+    assert arm.command_timeout(MOVE) == 2
+
+
+def test_per_command_timeouts_win(arm):
+    arm.get_position()
+    arm.timeouts = {'P220': 0.7, 'G0': 5}
+    assert arm.command_timeout(protocol.GET_COOR) == 0.7
+    assert arm.command_timeout(MOVE) == 5
+    arm.timeouts = {}
+    arm.adaptive_timeout = False
+    assert arm.command_timeout(protocol.GET_COOR) == arm.timeout
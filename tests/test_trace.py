@@ -0,0 +1,60 @@
+import json
+
+from pyuarm import protocol
+from pyuarm.trace import Tracer, trace
+
+
+def command(tracer, msg_id, msg, t):
+    tracer.enqueue(msg_id, msg, t)
+    tracer.write(msg_id, msg, t + 1)
+    tracer.ack(msg_id, 'OK', t + 2)
+
+
+def async_ids(data):
+    ids = {}
+    for event in data['traceEvents']:
+        if event['ph'] == 'b':
+            ids.setdefault(event['id'], []).append((event['cat'], event['args']['id'], event['args']['cmd']))
+    return ids
+
+
+def test_reused_msg_id_gets_a_new_trace_id():
+    tracer = Tracer()
+    command(tracer, 7, protocol.GET_COOR, 0)
+    command(tracer, 7, protocol.GET_IS_MOVE, 10)
+    ids = async_ids(tracer.to_chrome())
+    assert sorted(ids.values()) == [
+        [('queue', 7, protocol.GET_IS_MOVE), ('wire', 7, protocol.GET_IS_MOVE)],
+        [('queue', 7, protocol.GET_COOR), ('wire', 7, protocol.GET_COOR)]]
+
+
+def test_open_msg_id_reused_after_wrap_around():
+    tracer = Tracer()
+    tracer.enqueue(7, protocol.GET_COOR, 0)  # never answered
+    command(tracer, 7, protocol.GET_IS_MOVE, 10)
+    ids = async_ids(tracer.to_chrome())
+    assert list(ids.values()) == [[('queue', 7, protocol.GET_IS_MOVE), ('wire', 7, protocol.GET_IS_MOVE)]]
+
+
+def test_motion_shares_the_trace_id_of_its_command():
+    tracer = Tracer()
+    command(tracer, 7, protocol.GET_COOR, 0)
+    command(tracer, 7, 'G0 X0 Y150 Z150 F100', 10)
+    tracer.motion(7, 'G0 X0 Y150 Z150 F100', 12, 20)
+    tracer.motion(8, 'G0 X0 Y150 Z150 F100', 20, 30)
+    ids = async_ids(tracer.to_chrome())
+    assert len(ids) == 3
+    assert sorted(len(spans) for spans in ids.values()) == [1, 2, 3]
+
+
+def test_trace_ids_survive_the_msg_id_wrap(arm, tmpdir):
+    arm.serial_id = 65530
+    path = str(tmpdir.join('trace.json'))
+    with trace(arm, path):
+        for _ in range(10):
+            assert arm.get_position() is not None
+    with open(path) as f:
+        ids = async_ids(json.load(f))
+    assert len(ids) == 10
+    assert sorted(spans[0][1] for spans in ids.values()) == [1, 2, 3, 4, 5, 65531, 65532, 65533, 65534, 65535]
+    assert all(len(spans) == 2 for spans in ids.values())
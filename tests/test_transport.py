@@ -0,0 +1,79 @@
+import socket
+
+import serial
+
+from pyuarm import transport
+from conftest import open_arm
+
+
+def nodelay(port):
+    sock = socket.fromfd(port.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        return sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    finally:
+        sock.close()
+
+
+def test_is_url():
+    assert transport.is_url('emu://')
+    assert transport.is_url('socket://127.0.0.1:2000')
+    assert not transport.is_url('/dev/ttyUSB0')
+    assert not transport.is_url('COM3')
+
+
+def test_tune_emu_is_left_alone():
+    port = transport.create('emu://')
+    port.open()
+    try:
+        assert transport.tune(port) is False
+    finally:
+        port.close()
+
+
+def test_tune_socket_sets_nodelay(tcp_emulator):
+    url, _ = tcp_emulator
+    port = transport.create(url)
+    port.open()
+    try:
+        assert nodelay(port) == 0
+        assert transport.tune(port) is True
+        assert nodelay(port) != 0
+    finally:
+        port.close()
+
+
+def test_tune_closed_socket_port(tcp_emulator):
+    url, _ = tcp_emulator
+    port = transport.create(url)
+    port.open()
+    port.close()
+    assert transport.tune(port) is False
+
+
+def test_arm_over_emu():
+    arm = open_arm('emu://')
+    try:
+        assert arm.get_position() == [0.0, 150.0, 150.0]
+        assert arm.firmware_version == '2.2.1'
+    finally:
+        arm.disconnect()
+
+
+def test_arm_over_socket(tcp_emulator):
+    url, emulators = tcp_emulator
+    arm = open_arm(url)
+    try:
+        assert nodelay(arm._UArm__serial) != 0
+        assert arm.set_position(100, 100, 100, wait=True) is True
+        assert arm.get_position() == [100.0, 100.0, 100.0]
+        assert emulators[0].received > 0
+    finally:
+        arm.disconnect()
+
+
+def test_unknown_url_scheme():
+    try:
+        transport.create('nosuchscheme://x')
+    except (ValueError, serial.SerialException):
+        return
+    assert False, 'unknown scheme accepted'
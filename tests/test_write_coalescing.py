@@ -0,0 +1,58 @@
+import time
+
+from pyuarm import protocol
+
+MOVE = 'G0 X100 Y100 Z100 F1000'
+QUERY = protocol.GET_IS_MOVE
+
+
+def burst(arm, count):
+    writes = arm.metrics()['writes']
+    ids = [arm.send_msg(QUERY) for _ in range(count)]
+    time.sleep(0.1)
+    return ids, arm.metrics()['writes'] - writes
+
+
+def test_back_to_back_writes_are_coalesced(arm, emulator):
+    arm.set_write_coalescing(0.005)
+    ids, writes = burst(arm, 10)
+    assert writes < 10
+    assert list(emulator.history).count(QUERY) == 10
+    assert all(arm.msg_buff.get(i) is not None for i in ids)
+
+
+def test_no_coalescing_without_window(arm):
+    arm.set_write_coalescing(0)
+    _, writes = burst(arm, 10)
+    assert writes == 10
+
+
+def test_write_after_idle_is_not_delayed(arm, emulator):
+    arm.set_write_coalescing(0.2)
+    time.sleep(0.3)
+    received = emulator.received
+    arm.send_msg(protocol.GET_COOR)
+    time.sleep(0.05)
+    assert emulator.received == received + 1
+
+
+def test_emergency_is_not_delayed(arm, emulator):
+    arm.set_write_coalescing(1)
+    arm.send_msg(MOVE)
+    arm.send_msg(MOVE)  # collected, waits for the window
+    arm.stop_moving()
+    time.sleep(0.05)
+    assert list(emulator.history)[-3:] == [MOVE, MOVE, protocol.STOP_MOVING]
+
+
+def test_flusher_ends_when_the_link_drops(arm):
+    arm.set_write_coalescing(1)
+    arm.send_msg(MOVE)
+    arm.send_msg(MOVE)
+    reader = arm._UArm__reader_thread
+    assert reader._flusher is not None
+    arm._UArm__serial.close()
+    end = time.time() + 2
+    while time.time() < end and reader._flusher is not None:
+        time.sleep(0.01)
+    assert reader._flusher is None